@@ -0,0 +1,45 @@
+"""
+ETags for list views of users' versioned collections (see locations.versions).
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from rest_framework.renderers import JSONRenderer
+
+from locations.versions import get_versions
+
+
+class CollectionETagMixin:
+    """
+    Mixin for list views, which sets an ETag header on JSON list responses,
+    derived from the requesting user, the versions of the collections the
+    list is made from (see get_etag_collections) and the request's query
+    string. Requests with a matching 'If-None-Match' header get a 304 (not
+    modified) response, before any entries are loaded.
+    """
+    def get_etag_collections(self):
+        """
+        Returns the (collection, owner ID) tuples of the collections that
+        the view's lists are made from.
+        """
+        raise NotImplementedError
+
+    def get_etag(self, request):
+        versions = get_versions(self.get_etag_collections())
+        key = f'{request.user.id}:{versions}:{request.get_full_path()}'
+        return '"' + hashlib.md5(key.encode()).hexdigest() + '"'
+
+    def get(self, request, *args, **kwargs):
+        # other formats, eg the browsable API, hold more than the list
+        if type(request.accepted_renderer) is not JSONRenderer:
+            return super().get(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        # lists differ between users, who are told apart by their tokens
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,150 @@
+"""
+Serializer-free read path for list views, see FastListMixin.
+
+Instead of building model instances and running a serializer for each
+of them, rows are fetched as tuples with .values_list(), holding exactly
+the serializer's fields, and encoded as JSON with per-field encoders that
+produce the same bytes as the serializer's representation rendered by
+rest_framework.renderers.JSONRenderer.
+"""
+import json
+
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from django.http import HttpResponse
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+# strings are escaped the same way as by JSONRenderer
+encode_str = encode_basestring_ascii if JSONRenderer.ensure_ascii else encode_basestring
+
+
+def encode_json(value):
+    return json.dumps(
+        value,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict,
+        separators=(',', ':')
+    )
+
+
+def encode_int(value):
+    return 'null' if value is None else str(int(value))
+
+
+def encode_char(value):
+    return 'null' if value is None else encode_str(str(value))
+
+
+def decimal_encoder(field):
+    """
+    Returns a function encoding Decimal values as JSON strings, the same
+    way as a serializer DecimalField (coercing to strings) represents them.
+    """
+    to_representation = field.to_representation
+    places = field.decimal_places
+
+    def encode(value):
+        if value is None:
+            return 'null'
+        # values loaded from decimal columns already have the field's number
+        # of decimal places, so that quantizing them can be skipped
+        formatted = format(value, 'f')
+        if places is not None and len(formatted) - formatted.find('.') - 1 == places:
+            return '"' + formatted + '"'
+        return '"' + to_representation(value) + '"'
+    return encode
+
+
+def field_encoder(field):
+    """
+    Returns a function encoding a model field's value as JSON, the same way
+    as JSONRenderer renders a serializer field's representation of it.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # .values_list() returns the primary keys of related entries
+        return encode_int
+    if isinstance(field, serializers.RelatedField):
+        raise ValueError(f'Unsupported related field: {field.field_name}.')
+    if isinstance(field, serializers.IntegerField):
+        return encode_int
+    if type(field) is serializers.CharField:
+        return encode_char
+    to_representation = field.to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if isinstance(field, serializers.DecimalField) and coerce_to_string:
+        return decimal_encoder(field)
+    return lambda value: 'null' if value is None else encode_json(to_representation(value))
+
+
+class RowEncoder:
+    """
+    Encodes rows of a serializer's fields, as returned by .values_list()
+    for the encoder's 'sources', as a JSON array of objects.
+    """
+    def __init__(self, serializer_class):
+        fields = [field for field in serializer_class().fields.values() if not field.write_only]
+        for field in fields:
+            if field.source == '*' or '.' in field.source:
+                raise ValueError(f'Unsupported field source: {field.source}.')
+        self.sources = [field.source for field in fields]
+        self.encoders = [field_encoder(field) for field in fields]
+        self.template = '{' + ','.join(
+            encode_str(field.field_name).replace('%', '%%') + ':%s' for field in fields
+        ) + '}'
+
+    def encode(self, rows):
+        template = self.template
+        encoders = self.encoders
+        body = '[' + ','.join(
+            template % tuple([encode(value) for encode, value in zip(encoders, row)])
+            for row in rows
+        ) + ']'
+        # as escaped by JSONRenderer
+        return body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+_row_encoders = {}
+
+
+def row_encoder(serializer_class):
+    if serializer_class not in _row_encoders:
+        _row_encoders[serializer_class] = RowEncoder(serializer_class)
+    return _row_encoders[serializer_class]
+
+
+class FastListMixin:
+    """
+    Mixin for list views, which serves unpaginated lists rendered as
+    compact JSON through a RowEncoder, instead of the view's serializer.
+    Other responses (eg paginated ones, or for the browsable API) are
+    served as usual.
+    """
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        if not self.can_list_fast(request):
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+        encoder = row_encoder(self.get_serializer_class())
+        return HttpResponse(
+            encoder.encode(queryset.values_list(*encoder.sources)),
+            content_type=JSONRenderer.media_type
+        )
+
+    @staticmethod
+    def can_list_fast(request):
+        renderer = request.accepted_renderer
+        return (
+            type(renderer) is JSONRenderer
+            and renderer.compact
+            and renderer.get_indent(request.accepted_media_type, {}) is None
+        )
@@ -0,0 +1,110 @@
+import json
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, F
+from django.db.models.expressions import RawSQL
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class LocationKeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination for locations, ordered by place name
+    (with locations without place names last) and ID. Pages are fetched by
+    seeking past the previous page's last (place_name, id) pair, which
+    the locations table has an index for (per owner), so deep pages
+    cost the same as the first page.
+
+    Pagination is only used if the request includes a 'page_size' or 'cursor'
+    query parameter. Paginated responses are objects with a 'results' array,
+    and a 'next' URL (or null, on the last page).
+    """
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(params.get(self.cursor_query_param))
+
+        queryset = queryset.order_by(F('place_name').asc(nulls_last=True), 'id')
+        if position is None:
+            results = list(queryset[:self.page_size + 1])
+        elif position[0] is not None:
+            results = list(queryset.filter(self.after_q(queryset.model, position))[:self.page_size + 1])
+            # locations without place names come after all others
+            if len(results) <= self.page_size:
+                results += queryset.filter(place_name__isnull=True)[:self.page_size + 1 - len(results)]
+        else:
+            results = list(queryset.filter(place_name__isnull=True, id__gt=position[1])[:self.page_size + 1])
+
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = (results[-1].place_name, results[-1].id) if results else None
+        return results
+
+    @staticmethod
+    def after_q(model, position):
+        """
+        Returns a filter expression matching rows whose (place_name, id) pair
+        comes after 'position', written as a row value comparison so that
+        the database can seek directly to it in the index.
+        """
+        table = connection.ops.quote_name(model._meta.db_table)
+        return RawSQL(
+            f'({table}.{connection.ops.quote_name("place_name")}, '
+            f'{table}.{connection.ops.quote_name("id")}) > (%s, %s)',
+            position,
+            output_field=BooleanField()
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.LOCATIONS_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.LOCATIONS_PAGE_SIZE
+        return min(max(page_size, 1), settings.LOCATIONS_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, encoded):
+        if encoded is None:
+            return None
+        try:
+            place_name, pk = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (BinasciiError, TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(pk, int) or not (place_name is None or isinstance(place_name, str)):
+            raise NotFound(self.invalid_cursor_message)
+        return place_name, pk
+
+    def encode_cursor(self, position):
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
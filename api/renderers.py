@@ -0,0 +1,20 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline delimited JSON, ie one JSON value per line. Views
+    which support this format stream their responses themselves (see
+    views.ForecastPointList), so this is only used for rendering eg error
+    responses, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
@@ -1,4 +1,4 @@
-from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, CharField
+from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, CharField, FloatField
 
 from locations.models import (
     Location, 
@@ -6,12 +6,39 @@ from locations.models import (
     MarkerSignificance
 )
 
+from locations.references import reference_ids
 from weather.models import ForecastPoint
 
 
+class CachedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Primary key related field which validates primary keys against a set
+    of valid keys returned by its parent serializer's get_reference_ids
+    method (under 'ids_key'), instead of querying the database for each
+    value. Validated values are unsaved instances with only their primary
+    keys set, which is all that's needed for saving references to them.
+    """
+    def __init__(self, ids_key, **kwargs):
+        self.ids_key = ids_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.parent.get_reference_ids()[self.ids_key]:
+            self.fail('does_not_exist', pk_value=data)
+        return self.get_queryset().model(pk=pk)
+
+
 class LocationSerializer(ModelSerializer):
-    icon = PrimaryKeyRelatedField(many=False, read_only=False, queryset=MarkerIcon.objects.all())
-    significance = PrimaryKeyRelatedField(many=False, read_only=False, queryset=MarkerSignificance.objects.all())
+    # icons and significances are validated against the cached sets of
+    # the requesting user's valid IDs (see locations.references)
+    icon = CachedPrimaryKeyRelatedField('icon', queryset=MarkerIcon.objects.all())
+    significance = CachedPrimaryKeyRelatedField('significance', queryset=MarkerSignificance.objects.all())
 
     class Meta:
         model = Location
@@ -27,6 +54,17 @@ class LocationSerializer(ModelSerializer):
             'icon',
         ]
 
+    def get_reference_ids(self):
+        """
+        Returns the valid icon and significance IDs, as passed in the context
+        (under 'reference_ids'), or else those of the context's requesting
+        user (or only the default significances, without a request).
+        """
+        if 'reference_ids' not in self.context:
+            request = self.context.get('request')
+            self.context['reference_ids'] = reference_ids(request.user.id if request else None)
+        return self.context['reference_ids']
+
 
 class MarkerIconSerializer(ModelSerializer):
     class Meta:
@@ -59,6 +97,15 @@ class MarkerSignificanceSerializer(ModelSerializer):
 
 
 class ForecastPointSerializer(ModelSerializer):
+    # temperatures are stored as tenths of a degree, but exposed as floats
+    t_0h = FloatField()
+    t_1h = FloatField()
+    t_2h = FloatField()
+    t_3h = FloatField()
+    t_4h = FloatField()
+    t_5h = FloatField()
+    t_6h = FloatField()
+
     class Meta:
         model = ForecastPoint
         fields = [
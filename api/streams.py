@@ -0,0 +1,116 @@
+"""
+Server-sent events (SSE) stream of forecast updates, served as a plain ASGI
+application (see config.asgi) rather than a DRF view, so that connections
+can be kept open without tying up a worker thread each.
+
+Clients first register the coordinates they are interested in with
+views.ForecastSubscription, which returns a signed subscription token, and
+then connect to STREAM_PATH with the token as the 'token' query parameter.
+Whenever new forecast data are stored for a point within the grid cells
+of the registered coordinates, a 'forecast' event is sent, with the point's
+JSON payload as data.
+"""
+import asyncio
+
+from urllib.parse import parse_qs, urlencode
+
+from django.conf import settings
+from django.core import signing
+
+from weather.spatial import grid_key
+from weather.updates import BROKER, ensure_listener
+
+STREAM_PATH = '/api/forecasts/stream/'
+
+SUBSCRIPTION_SALT = 'api.streams.subscription'
+
+
+def create_subscription_token(user, coord_ls):
+    """
+    Returns a signed token holding the user's ID and the keys of the grid
+    cells containing the passed coordinates.
+    :param user: The subscribing user.
+    :param coord_ls: A list of 2-element float tuples, where the first
+    value represents a latitude, and the second a longitude.
+    """
+    cells = sorted({grid_key(lat, lon) for lat, lon in coord_ls})
+    return signing.dumps({'user': user.pk, 'cells': cells}, salt=SUBSCRIPTION_SALT, compress=True)
+
+
+def stream_url(token):
+    return STREAM_PATH + '?' + urlencode({'token': token})
+
+
+def load_subscription_token(token):
+    """
+    :return: list - The grid cell keys of a subscription token, or None if
+    the token is invalid or has expired.
+    """
+    try:
+        data = signing.loads(token, salt=SUBSCRIPTION_SALT, max_age=settings.FORECAST_SUBSCRIPTION_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data['cells']
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def forecast_stream(scope, receive, send):
+    """
+    ASGI application streaming forecast updates for the grid cells of a
+    subscription token.
+    """
+    token = parse_qs(scope['query_string'].decode()).get('token', [''])[0]
+    cells = load_subscription_token(token)
+    if cells is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 403,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Invalid or expired subscription token.'})
+        return
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    # the broker calls back from other threads
+    subscription = BROKER.subscribe(
+        cells, lambda cell, payload: loop.call_soon_threadsafe(queue.put_nowait, payload)
+    )
+    ensure_listener()
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # keep proxies from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': subscribed\n\n', 'more_body': True})
+        while True:
+            next_payload = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {next_payload, disconnect},
+                timeout=settings.FORECAST_STREAM_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect in done:
+                next_payload.cancel()
+                break
+            if next_payload in done:
+                event = f'event: forecast\ndata: {next_payload.result()}\n\n'
+            else:
+                next_payload.cancel()
+                # comment lines keep idle connections from being closed
+                event = ': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+    finally:
+        BROKER.unsubscribe(subscription)
+        disconnect.cancel()
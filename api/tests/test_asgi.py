@@ -0,0 +1,45 @@
+from asgiref.testing import ApplicationCommunicator
+
+from django.test import SimpleTestCase
+
+from config.asgi import application
+
+
+class ASGIApplicationTestCase(SimpleTestCase):
+    """
+    Tests of the routing of the ASGI application (see config.asgi), which
+    only serves the forecast update stream.
+    """
+    async def request(self, path, query_string=b''):
+        """
+        Makes a GET request to the ASGI application, and returns the
+        response's status code and body.
+        """
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [(b'host', b'testserver')],
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(5)
+        body = await communicator.receive_output(5)
+        await communicator.wait(5)
+        return start['status'], body['body']
+
+    async def test_stream(self):
+        """
+        The stream path is served by the forecast update stream.
+        """
+        status, content = await self.request('/api/forecasts/stream/', b'token=invalid')
+        self.assertEqual(status, 403)
+        self.assertEqual(content, b'Invalid or expired subscription token.')
+
+    async def test_other_paths(self):
+        """
+        Django views aren't served through ASGI (see config.wsgi).
+        """
+        status, _ = await self.request('/api/forecasts/')
+        self.assertEqual(status, 404)
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+
+from ..util.format import parse_coord_batch, round_coords
+
+
+class ParseCoordBatchTestCase(SimpleTestCase):
+    """
+    Tests of batch parsing of coordinate objects.
+    """
+    def test_rounds_and_dedupes(self):
+        """
+        Coordinates are rounded to 4 decimals, duplicates (after rounding)
+        are removed and the index maps passed objects to distinct coordinates.
+        """
+        coord_ls, index = parse_coord_batch([
+            {'lat': '57.70001', 'lon': 11.9667},
+            {'lat': -5.81, 'lon': '-3'},
+            {'lat': 57.7, 'lon': '11.96671'},
+        ])
+        self.assertEqual(len(coord_ls), 2)
+        self.assertEqual([coord_ls[i] for i in index], [(57.7, 11.9667), (-5.81, -3.0), (57.7, 11.9667)])
+
+    def test_rounds_like_round_coords(self):
+        """
+        Values halfway between are rounded like round_coords does, so
+        that they give the same forecast cells.
+        """
+        coord_objs = [{'lat': 2.67565, 'lon': 11.96665}, {'lat': '2.6757', 'lon': 11.9666}]
+        coord_ls, index = parse_coord_batch(coord_objs)
+        self.assertEqual(coord_ls, [round_coords((2.67565, 11.96665))])
+        self.assertEqual(index, [0, 0])
+
+    def test_invalid_coords(self):
+        """
+        Objects without lat/lon properties, non-numeric or out of range
+        values and too large batches are rejected.
+        """
+        for coord_objs in (
+            [{'lat': 1}],
+            ['1,2'],
+            [{'lat': 'north', 'lon': 2}],
+            [{'lat': 1, 'lon': 2}, {'lat': 90.01, 'lon': 2}],
+            [{'lat': 1, 'lon': 'nan'}],
+        ):
+            with self.assertRaises(ValueError):
+                parse_coord_batch(coord_objs)
+        with self.assertRaises(ValueError):
+            parse_coord_batch([{'lat': 1, 'lon': 2}] * 3, max_size=2)
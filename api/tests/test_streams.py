@@ -0,0 +1,59 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+
+from weather.spatial import grid_key
+from weather.updates import BROKER
+
+from ..streams import create_subscription_token, forecast_stream
+
+
+@override_settings(FORECAST_STREAM_KEEPALIVE=0.05)
+class ForecastStreamTestCase(SimpleTestCase):
+    """
+    Tests of the forecast update stream ASGI application.
+    """
+    async def run_stream(self, token, publish=()):
+        """
+        Runs the stream until it has sent a few messages, publishing the
+        passed (cell, payload) tuples once it has started, and returns
+        the sent messages.
+        """
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 2:
+                for cell, payload in publish:
+                    BROKER.dispatch(cell, payload)
+            if len(sent) >= 4 or (message['type'] == 'http.response.body' and not message.get('more_body')):
+                disconnected.set()
+
+        scope = {'type': 'http', 'path': '/api/forecasts/stream/', 'query_string': f'token={token}'.encode()}
+        await asyncio.wait_for(forecast_stream(scope, receive, send), 1)
+        return sent
+
+    async def test_stream_updates(self):
+        """
+        Updates for the subscribed cells are sent as 'forecast' events,
+        and keepalive comments are sent while idle.
+        """
+        user = get_user_model()(pk=1)
+        token = create_subscription_token(user, [(57.7, 11.9667)])
+        sent = await self.run_stream(token, publish=[
+            (grid_key(0, 0), '{"id":1}'),
+            (grid_key(57.7, 11.9667), '{"id":2}'),
+        ])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[2]['body'], b'event: forecast\ndata: {"id":2}\n\n')
+        self.assertEqual(sent[3]['body'], b': keepalive\n\n')
+
+    async def test_invalid_token(self):
+        sent = await self.run_stream('invalid')
+        self.assertEqual(sent[0]['status'], 403)
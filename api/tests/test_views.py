@@ -1,14 +1,21 @@
 import json
+import shutil
+import tempfile
 
-from django.test import TestCase
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
 from django.urls import reverse_lazy
 from django.contrib.auth import get_user_model
 
 from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from api.serializers import LocationSerializer, MarkerIconSerializer, MarkerSignificanceSerializer
 from locations.models import Location, MarkerSignificance, MarkerIcon
 from weather.models import ForecastPoint
+from weather.tests.test_models import fake_get_forecast
 
 class CreateUserTestCase(TestCase):
     """
@@ -157,8 +164,181 @@ class ActAsUserTestCase(TestCase):
         # locations owned by the user in the database
         self.assertEqual(
             Location.objects.filter(owner=self.test_user).count(),
-            len(resp.data)
+            len(resp.json())
+        )
+
+    def test_get_locations_paginated(self):
+        """
+        Paging through the locations list with a page size returns all
+        of the user's locations exactly once, ordered by place name (with
+        unnamed locations last) and ID.
+        """
+        for place_name in ('b', None, 'a', 'b', None, 'c'):
+            Location.objects.create(
+                place_name=place_name,
+                address='Somewhere',
+                latitude=1,
+                longitude=1,
+                significance=self.test_user_significance,
+                icon=MarkerIcon.objects.all()[0],
+                owner=self.test_user
+            )
+        expected = [
+            loc.id for loc in sorted(
+                Location.objects.filter(owner=self.test_user),
+                key=lambda loc: (loc.place_name is None, loc.place_name or '', loc.id)
+            )
+        ]
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = str(reverse_lazy('api:locations-lc')) + '?page_size=2'
+        ids = []
+        while url:
+            resp = self.c.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.data['results']), 2)
+            ids += [loc['id'] for loc in resp.data['results']]
+            url = resp.data['next']
+        self.assertEqual(ids, expected)
+
+    def test_get_locations_bbox(self):
+        """
+        Passing a bounding box only returns the user's locations within it,
+        also for boxes crossing the antimeridian, and passing a limit
+        returns a truncated list.
+        """
+        for lat, lon in ((10, 10), (10, 20), (50, 10), (10, 179), (10, -179)):
+            Location.objects.create(
+                place_name=f'{lat},{lon}',
+                latitude=lat,
+                longitude=lon,
+                significance=self.test_user_significance,
+                icon=MarkerIcon.objects.all()[0],
+                owner=self.test_user
+            )
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = str(reverse_lazy('api:locations-lc'))
+
+        resp = self.c.get(url, {'bbox': '5,5,25,15'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual({loc['place_name'] for loc in resp.json()}, {'10,10', '10,20'})
+
+        resp = self.c.get(url, {'bbox': '170,5,-170,15'})
+        self.assertEqual({loc['place_name'] for loc in resp.json()}, {'10,179', '10,-179'})
+
+        resp = self.c.get(url, {'bbox': '5,5,25,15', 'limit': 1})
+        self.assertTrue(resp.data['truncated'])
+        self.assertEqual(len(resp.data['results']), 1)
+        resp = self.c.get(url, {'bbox': '5,5,25,15', 'limit': 2})
+        self.assertFalse(resp.data['truncated'])
+
+        resp = self.c.get(url, {'bbox': '5,15,25,5'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_get_location_clusters(self):
+        """
+        Clusters are returned for zoomed out maps, and individual locations
+        at the highest zoom level.
+        """
+        # leaves out the user's preexisting locations
+        Location.objects.filter(owner=self.test_user).delete()
+        for lat, lon in ((10, 10), (10.1, 10.1), (50, 10)):
+            Location.objects.create(
+                place_name=f'{lat},{lon}',
+                latitude=lat,
+                longitude=lon,
+                significance=self.test_user_significance,
+                icon=MarkerIcon.objects.all()[0],
+                owner=self.test_user
+            )
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = reverse_lazy('api:locations-clusters')
+
+        resp = self.c.get(url, {'zoom': 4})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(c['count'] for c in resp.data['clusters']), [1, 2])
+        self.assertEqual(resp.data['clusters'][0]['significance'], self.test_user_significance.id)
+
+        resp = self.c.get(url, {'zoom': 4, 'bbox': '0,0,20,20'})
+        self.assertEqual([c['count'] for c in resp.data['clusters']], [2])
+
+        with override_settings(LOCATION_CLUSTER_MAX_ZOOM=16):
+            resp = self.c.get(url, {'zoom': 16, 'bbox': '0,0,20,20'})
+        self.assertEqual(resp.data['clusters'], [])
+        self.assertEqual(len(resp.data['locations']), 2)
+
+        self.assertEqual(self.c.get(url).status_code, 400)
+
+    def test_fast_lists_match_serializers(self):
+        """
+        List responses are byte for byte the same as rendering the views'
+        serializers' output with JSONRenderer.
+        """
+        Location.objects.create(
+            place_name='Caf\u00e9 "Quoted" \\ \u2028 %s',
+            address=None,
+            latitude='-12.3456789',
+            longitude=1,
+            description='\u65e5\u672c\n\t',
+            significance=self.test_user_significance,
+            icon=MarkerIcon.objects.all()[0],
+            owner=self.test_user
         )
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        lists = [
+            ('api:locations-lc', LocationSerializer, Location.objects.filter(owner=self.test_user)),
+            ('api:markericons-l', MarkerIconSerializer, MarkerIcon.objects.all()),
+            (
+                'api:markersignificances-lc',
+                MarkerSignificanceSerializer,
+                MarkerSignificance.objects.filter(Q(owner=self.test_user) | Q(owner__isnull=True))
+            ),
+        ]
+        for url_name, serializer_class, queryset in lists:
+            resp = self.c.get(reverse_lazy(url_name))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp['Content-Type'], 'application/json')
+            self.assertEqual(resp.content, JSONRenderer().render(serializer_class(queryset, many=True).data))
+
+    def test_get_locations_etag(self):
+        """
+        Location lists carry an ETag, and requests with a matching
+        If-None-Match header get a 304 response without loading any
+        locations, until the user's locations change.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = reverse_lazy('api:locations-lc')
+        resp = self.c.get(url)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+
+        # the token and collection version lookups
+        with self.assertNumQueries(2):
+            resp = self.c.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+        # other query strings, and other users, get other ETags
+        self.assertNotEqual(self.c.get(url, {'bbox': '0,0,10,10'})['ETag'], etag)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_2_token.key)
+        self.assertNotEqual(self.c.get(url)['ETag'], etag)
+
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c.post(url, self.add_loc)
+        resp = self.c.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_get_significances_etag(self):
+        """
+        Significance lists' ETags change when the user's significances do.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = reverse_lazy('api:markersignificances-lc')
+        etag = self.c.get(url)['ETag']
+        self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c.post(url, self.add_sig)
+        self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
 
     def test_get_locations_no_credentials(self):
         """
@@ -230,6 +410,18 @@ class ActAsUserTestCase(TestCase):
             Location.objects.filter(place_name=self.add_loc['place_name']).exists()
         )
 
+    def test_create_location_other_users_significance(self):
+        """
+        Locations can't refer to significances of other users.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:locations-lc'),
+            {**self.add_loc, 'significance': self.test_user_2_significance.id}
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('significance', resp.data)
+
     def test_delete_location_valid_credentials(self):
         """
         Deleting a location with valid credentials updates
@@ -290,6 +482,89 @@ class ActAsUserTestCase(TestCase):
             Location.objects.filter(description=updated_loc['description']).exists()
         )
 
+    def test_bulk_locations(self):
+        """
+        Bulk writes create, update and delete locations in one go.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = reverse_lazy('api:locations-bulk')
+        updated = Location.objects.filter(owner=self.test_user)[0]
+        deleted = Location.objects.create(
+            place_name='To be deleted',
+            latitude=1,
+            longitude=1,
+            significance=self.test_user_significance,
+            icon=MarkerIcon.objects.all()[0],
+            owner=self.test_user
+        )
+        data = {
+            'create': [self.add_loc, {**self.add_loc, 'place_name': 'Another place'}],
+            'update': [{'id': updated.id, 'place_name': 'Updated place'}],
+            'delete': [deleted.id],
+        }
+        deleted_ids = []
+        def record_delete(sender, instance, **kwargs):
+            deleted_ids.append(instance.id)
+        post_delete.connect(record_delete, sender=Location)
+        self.addCleanup(post_delete.disconnect, record_delete, sender=Location)
+        resp = self.c.post(url, data, format='json')
+        self.assertEqual(resp.status_code, 200)
+        # deletes send signals, eg for bumping the collection version
+        self.assertEqual(deleted_ids, [deleted.id])
+        self.assertEqual(
+            [loc['place_name'] for loc in resp.data['create']],
+            ['Jaroslav Jezek Memorial', 'Another place']
+        )
+        self.assertTrue(Location.objects.filter(id=resp.data['create'][0]['id'], owner=self.test_user).exists())
+        self.assertEqual(Location.objects.get(id=updated.id).place_name, 'Updated place')
+        self.assertFalse(Location.objects.filter(id=deleted.id).exists())
+
+    def test_bulk_locations_invalid(self):
+        """
+        If any item of a bulk write is invalid, nothing is written, and
+        errors are returned per item.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        url = reverse_lazy('api:locations-bulk')
+        num_locations = Location.objects.count()
+        other_users_location = Location.objects.filter(owner=self.test_user_2)[0]
+        data = {
+            'create': [
+                self.add_loc,
+                # significances of other users can't be used
+                {**self.add_loc, 'significance': self.test_user_2_significance.id},
+            ],
+            'delete': [other_users_location.id],
+        }
+        resp = self.c.post(url, data, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['create'][0], {})
+        self.assertIn('significance', resp.data['create'][1])
+        self.assertIn('id', resp.data['delete'][0])
+        self.assertEqual(Location.objects.count(), num_locations)
+
+        # IDs passed twice, or both updated and deleted
+        loc_1 = Location.objects.filter(owner=self.test_user)[0]
+        loc_2 = Location.objects.create(
+            place_name='Another place',
+            latitude=1,
+            longitude=1,
+            significance=self.test_user_significance,
+            icon=MarkerIcon.objects.all()[0],
+            owner=self.test_user
+        )
+        resp = self.c.post(url, {
+            'update': [{'id': loc_1.id}, {'id': loc_1.id}, {'id': loc_2.id}],
+            'delete': [loc_2.id],
+        }, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([bool(e) for e in resp.data['update']], [True, True, True])
+        self.assertIn('id', resp.data['delete'][0])
+
+        # bodies which aren't objects
+        resp = self.c.post(url, [], format='json')
+        self.assertEqual(resp.status_code, 400)
+
     def test_get_icons_valid_credentials(self):
         """
         Visiting the icons list endpoint with
@@ -305,7 +580,7 @@ class ActAsUserTestCase(TestCase):
         # locations owned by the user in the database
         self.assertEqual(
             MarkerIcon.objects.count(),
-            len(resp.data)
+            len(resp.json())
         )
     
     def test_get_significances_valid_credentials(self):
@@ -325,7 +600,7 @@ class ActAsUserTestCase(TestCase):
         self.assertEqual(
             MarkerSignificance.objects.filter(owner=self.test_user).count() +
             MarkerSignificance.objects.filter(owner__isnull=True).count(),
-            len(resp.data)
+            len(resp.json())
         )
 
     def test_create_significance_valid_credentials(self):
@@ -473,6 +748,135 @@ class ForecastPointListTestCase(TestCase):
     def tearDown(self):
         self.c.credentials()
     
+    def test_duplicate_coords_keep_order(self):
+        """
+        Each passed coordinate object gets an element in the response, in
+        the passed order, also when coordinates are equal after rounding.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:forecasts-l'),
+            data=json.dumps({'coords': [{'lat': 57.7, 'lon': 11.9666666667}] * 2}),
+            content_type='application/json'
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual([p['id'] for p in json.loads(resp.content)], [fp.id, fp.id])
+
+    def test_symbol_codes(self):
+        """
+        With 'symbols=codes', weather symbols are sent as codes, along
+        with a dictionary mapping them to names.
+        """
+        ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            str(reverse_lazy('api:forecasts-l')) + '?symbols=codes',
+            data=json.dumps({'coords': [{'lat': 57.7, 'lon': 11.9667}]}),
+            content_type='application/json'
+        )
+        data = json.loads(resp.content)
+        point = data['points'][0]
+        self.assertNotIn('symbol_name_0h', point)
+        self.assertEqual(data['symbols'][str(point['symbol_0h'])], 'partlycloudy_day')
+
+    def test_columnar_layout(self):
+        """
+        With 'layout=columns', hourly temperatures (as numbers) and symbols
+        are sent as arrays.
+        """
+        ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            str(reverse_lazy('api:forecasts-l')) + '?layout=columns',
+            data=json.dumps({'coords': [{'lat': 57.7, 'lon': 11.9667}]}),
+            content_type='application/json'
+        )
+        point = json.loads(resp.content)[0]
+        self.assertNotIn('t_0h', point)
+        self.assertEqual(point['t'], [10.3, 9.3, 8.3, 7.3, 6.3, 5.3, 4.3])
+        self.assertEqual(point['symbol'], ['partlycloudy_day'] * 7)
+
+    def test_invalid_coords(self):
+        """
+        Out of range coordinates and too large batches are rejected.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:forecasts-l'),
+            data=json.dumps({'coords': [{'lat': 91, 'lon': 0}]}),
+            content_type='application/json'
+        )
+        self.assertEqual(resp.status_code, 400)
+        with self.settings(FORECAST_MAX_BATCH_SIZE=1):
+            resp = self.c.post(
+                reverse_lazy('api:forecasts-l'),
+                data=json.dumps(self.retrieve_coords),
+                content_type='application/json'
+            )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_stream_ndjson(self):
+        """
+        With an 'application/x-ndjson' Accept header, points are streamed
+        as newline delimited JSON, with the indices of the passed
+        coordinate objects they belong to.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:forecasts-l'),
+            data=json.dumps({'coords': [{'lat': 57.7, 'lon': 11.9666666667}, {'lat': 57.7, 'lon': 11.9667}]}),
+            content_type='application/json',
+            HTTP_ACCEPT='application/x-ndjson'
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], fp.id)
+        self.assertEqual(json.loads(lines[0])['indices'], [0, 1])
+
+    def test_route(self):
+        """
+        Samples along a route get the forecast of their grid cell, and
+        the forecast hour closest to when they are passed.
+        """
+        fp = ForecastPoint.create_with_api(57.705, 11.965, api_getter=fake_get_forecast)
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:forecasts-route'),
+            # (57.7011, 11.9611) -> (57.7049, 11.9649), encoded
+            data=json.dumps({
+                'polyline': '{vd_J{c_hAwVwV',
+                'spacing': 500,
+                'speed': 0.5,
+                'departure': '2021-05-21T12:00:00Z',
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(resp.status_code, 201)
+        samples = json.loads(resp.content)
+        self.assertEqual(len(samples), 2)
+        self.assertTrue(all(sample['forecast']['id'] == fp.id for sample in samples))
+        self.assertEqual(samples[0]['hour'], 0)
+        # the route is ~480m, which takes ~58 minutes at 0.5km/h
+        self.assertEqual(samples[1]['eta'][:13], '2021-05-21T12')
+        self.assertEqual(samples[1]['hour'], 1)
+
+    def test_subscribe(self):
+        """
+        Subscribing returns a token, and the URL of the update stream.
+        """
+        self.c.credentials(HTTP_AUTHORIZATION='Token ' + self.test_user_token.key)
+        resp = self.c.post(
+            reverse_lazy('api:forecasts-subscribe'),
+            data=json.dumps(self.retrieve_coords),
+            content_type='application/json'
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn('/api/forecasts/stream/?token=', resp.data['url'])
+
     # DISABLED usually, to avoid making unnecessary calls to weather API
     # def test_get_weather_data(self):
     #     """
@@ -492,3 +896,41 @@ class ForecastPointListTestCase(TestCase):
     #     self.assertEqual(resp.status_code, 201)
     #     post_num_forecastpoints = ForecastPoint.objects.count()
     #     self.assertEqual(pre_num_forecastpoints + len(self.retrieve_coords['coords']), post_num_forecastpoints)
+
+
+
+class MetricsTestCase(TestCase):
+    """
+    Tests for the Metrics view.
+    """
+    def setUp(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        settings_override = override_settings(METRICS_DIR=metrics_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.c = APIClient()
+        self.admin_user = get_user_model().objects.create_user(
+            username='admin', password='111django111', is_staff=True
+        )
+        self.regular_user = get_user_model().objects.get(username='regular')
+
+    def test_get_metrics_admin(self):
+        """
+        Admin users get metrics in Prometheus text format, including
+        per-view database query counts.
+        """
+        self.c.force_authenticate(user=self.admin_user)
+        self.c.get(reverse_lazy('api:markericons-l'))
+        resp = self.c.get(reverse_lazy('api:metrics'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain'))
+        self.assertIn('mapback_db_queries_total{view="api:markericons-l"}', resp.content.decode())
+
+    def test_get_metrics_regular_user(self):
+        """
+        Regular users get an error response.
+        """
+        self.c.force_authenticate(user=self.regular_user)
+        resp = self.c.get(reverse_lazy('api:metrics'))
+        self.assertEqual(resp.status_code, 403)
@@ -21,6 +21,16 @@ urlpatterns = [
         views.LocationsListCreate.as_view(), 
         name='locations-lc'
     ),
+    path(
+        'locations/bulk/',
+        views.LocationsBulk.as_view(),
+        name='locations-bulk'
+    ),
+    path(
+        'locations/clusters/',
+        views.LocationClusters.as_view(),
+        name='locations-clusters'
+    ),
     path(
         'locations/<int:pk>/', 
         views.LocationsRetrieveUpdateDestroy.as_view(), 
@@ -45,5 +55,20 @@ urlpatterns = [
         'forecasts/',
         views.ForecastPointList.as_view(),
         name='forecasts-l'
+    ),
+    path(
+        'forecasts/route/',
+        views.ForecastRoute.as_view(),
+        name='forecasts-route'
+    ),
+    path(
+        'forecasts/subscriptions/',
+        views.ForecastSubscription.as_view(),
+        name='forecasts-subscribe'
+    ),
+    path(
+        'metrics/',
+        views.Metrics.as_view(),
+        name='metrics'
     )
 ]
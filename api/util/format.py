@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def parse_float_round(dec_str, num_dec=4):
     """
     Parses a passed string, rounds the resulting value to a specified (default 4)
@@ -14,4 +17,50 @@ def round_coords(coord_tup, num_dec=4):
     """
     first_val = parse_float_round(coord_tup[0], num_dec)
     second_val = parse_float_round(coord_tup[1], num_dec)
-    return (first_val, second_val)
\ No newline at end of file
+    return (first_val, second_val)
+
+
+def parse_coord_batch(coord_objs, num_dec=4, max_size=None):
+    """
+    Validates, parses and rounds a whole batch of coordinate objects at once,
+    and removes duplicates among the rounded coordinates.
+    :param coord_objs: list - Objects in the format {'lat': 12.3456, 'lon': 12.3456},
+    where values may be numbers or strings holding decimal/float values.
+    :param num_dec: int - Number of decimals to round to (defaults to 4).
+    :param max_size: (optional) int - Maximum number of coordinate objects.
+    :return: tuple - A (coord_ls, index) tuple, where coord_ls is a list of
+    distinct 2-element float tuples of rounded latitudes/longitudes (in
+    the order they are first passed), and
+    index is a list mapping each passed coordinate object to the position
+    of its rounded coordinates in coord_ls.
+    :raises ValueError: If the batch is too large, or any object is invalid.
+    """
+    if max_size is not None and len(coord_objs) > max_size:
+        raise ValueError(f'At most {max_size} coordinates may be passed at once.')
+    if not coord_objs:
+        return [], []
+    try:
+        pairs = [(coord['lat'], coord['lon']) for coord in coord_objs]
+    except (KeyError, TypeError):
+        raise ValueError("All coordinate objects must have 'lat' and 'lon' properties")
+    try:
+        coords = np.array(pairs, dtype=float)
+    except (TypeError, ValueError):
+        coords = None
+    if coords is None or coords.shape != (len(pairs), 2):
+        raise ValueError('Coordinate values must be numbers.')
+
+    invalid = ~np.isfinite(coords).all(axis=1) | (np.abs(coords) > (90, 180)).any(axis=1)
+    if invalid.any():
+        lat, lon = pairs[np.flatnonzero(invalid)[0]]
+        raise ValueError(f'Invalid coordinates: ({lat}, {lon})')
+
+    # rounded with the built-in round, like round_coords, since NumPy's
+    # rounding gives different results for some values halfway between
+    # (eg 2.67565), which would then be separate forecast cells
+    positions = {}
+    index = [
+        positions.setdefault((round(lat, num_dec), round(lon, num_dec)), len(positions))
+        for lat, lon in coords.tolist()
+    ]
+    return list(positions), index
@@ -1,7 +1,18 @@
 import json
+import time
 
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from rest_framework import authentication
 from rest_framework.authtoken.models import Token
@@ -11,8 +22,8 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView, 
     ListCreateAPIView
 )
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -20,13 +31,30 @@ from .serializers import (
     LocationSerializer, 
     MarkerIconSerializer, 
     MarkerSignificanceSerializer,
-    ForecastPointSerializer
 )
-from locations.models import Location, MarkerIcon, MarkerSignificance
-from weather.models import ForecastPoint
+from instrumentation.metrics import render_prometheus
+from locations.clustering import bbox_contains, cached_clusters
+from locations.references import reference_ids
+from locations.versions import LOCATIONS, SIGNIFICANCES, bump_version
+from locations.models import Location, MarkerIcon, MarkerSignificance, VisitedGeoPosition
+from weather.api_request_functions.yr_api import hedge_delay
+from weather.models import ForecastPoint, WeatherSymbol
+from weather.routes import decode_polyline, forecast_hour, path_distances, sample_cells, sample_path
+from weather.serialization import (
+    add_payload_flags,
+    format_datetime,
+    format_decimal,
+    render_placeholder_payload,
+    NUM_HOURS,
+)
 
+from .etags import CollectionETagMixin
+from .fastlist import FastListMixin
+from .pagination import LocationKeysetPagination
+from .renderers import NDJSONRenderer
+from .streams import create_subscription_token, stream_url
 from .util import colornames
-from .util.format import round_coords
+from .util.format import parse_coord_batch
 
 class CreateUser(APIView):
     """
@@ -68,10 +96,71 @@ class CreateUser(APIView):
         return Response({'message': 'User created!', 'token': user_token.key}, status=201)
 
 
-class LocationsListCreate(ListCreateAPIView):
+def parse_bbox_param(request):
+    """
+    Parses a request's 'bbox' query parameter, in the format
+    'minlon,minlat,maxlon,maxlat'. A minimum longitude greater than the
+    maximum longitude means that the box crosses the antimeridian.
+    :return: tuple - A (minlon, minlat, maxlon, maxlat) tuple of floats,
+    or None if the parameter isn't included.
+    """
+    bbox = request.query_params.get('bbox')
+    if bbox is None:
+        return None
+    try:
+        minlon, minlat, maxlon, maxlat = (float(v) for v in bbox.split(','))
+    except ValueError:
+        raise ValidationError('bbox must be in the format minlon,minlat,maxlon,maxlat.')
+    if not (-180 <= minlon <= 180 and -180 <= maxlon <= 180 and -90 <= minlat <= maxlat <= 90):
+        raise ValidationError('bbox has invalid coordinates.')
+    return minlon, minlat, maxlon, maxlat
+
+
+def filter_bbox(queryset, bbox):
+    """
+    Filters a queryset of locations by a bounding box (see parse_bbox_param),
+    if it isn't None.
+    """
+    if bbox is None:
+        return queryset
+    minlon, minlat, maxlon, maxlat = bbox
+    queryset = queryset.filter(latitude__range=(minlat, maxlat))
+    if minlon <= maxlon:
+        return queryset.filter(longitude__range=(minlon, maxlon))
+    return queryset.filter(Q(longitude__gte=minlon) | Q(longitude__lte=maxlon))
+
+
+def parse_limit_param(request):
+    """
+    :return: int - A request's 'limit' query parameter, or None if it
+    isn't included.
+    """
+    limit = request.query_params.get('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError('limit must be an integer.')
+    if limit < 1:
+        raise ValidationError('limit must be at least 1.')
+    return limit
+
+
+class LocationsListCreate(CollectionETagMixin, FastListMixin, ListCreateAPIView):
     """
     View to list all of the user's locations, or
-    create new user-bound location.
+    create new user-bound location. Lists can be paginated, by passing
+    a 'page_size' query parameter, see api.pagination.LocationKeysetPagination.
+
+    Lists can be restricted to the locations within a map viewport, by
+    passing a 'bbox' query parameter in the format
+    'minlon,minlat,maxlon,maxlat'. If a 'limit' query parameter is passed,
+    at most that many locations are returned, in an object as its 'results'
+    property, next to a 'truncated' property telling if there were more.
+
+    Lists carry an ETag, which changes whenever the user's locations do,
+    see api.etags.CollectionETagMixin.
 
     * Requires token authentication.
     """
@@ -79,13 +168,206 @@ class LocationsListCreate(ListCreateAPIView):
     serializer_class = LocationSerializer
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = LocationKeysetPagination
 
     def filter_queryset(self, queryset):
-        return queryset.filter(owner=self.request.user)
+        return filter_bbox(queryset.filter(owner=self.request.user), parse_bbox_param(self.request))
+
+    def get_etag_collections(self):
+        return [(LOCATIONS, self.request.user.id)]
+
+    def list(self, request, *args, **kwargs):
+        limit = parse_limit_param(request)
+        if limit is None:
+            return super().list(request, *args, **kwargs)
+        # one extra location is fetched, to tell if the list is truncated
+        locations = list(self.filter_queryset(self.get_queryset())[:limit + 1])
+        serializer = self.get_serializer(locations[:limit], many=True)
+        return Response({'truncated': len(locations) > limit, 'results': serializer.data})
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+
+def parse_id(value):
+    """
+    Returns an integer ID, or None if value isn't one.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class LocationsBulk(APIView):
+    """
+    View to create, update and delete many of the user's locations at once.
+    Only accepts POST requests, whose body may include a 'create' array of
+    location objects (as for LocationsListCreate), an 'update' array of
+    partial location objects including their 'id's, and a 'delete' array of
+    location IDs. Each ID may only be passed once across the 'update' and
+    'delete' arrays. At most settings.LOCATIONS_MAX_BULK_SIZE items may be
+    passed in total.
+
+    Either all items are written, in a single transaction, or none of them.
+    On success, returns an object with 'create' and 'update' arrays of the
+    resulting locations, and a 'delete' array of the deleted IDs, in the
+    order they were passed. Otherwise, returns an object with 'create',
+    'update' and 'delete' arrays holding each item's errors (an empty
+    object for valid items), with a 400 status code.
+
+    * Requires token authentication.
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        creates, updates, deletes = (self.get_items(request, name) for name in ('create', 'update', 'delete'))
+        if len(creates) + len(updates) + len(deletes) > settings.LOCATIONS_MAX_BULK_SIZE:
+            raise ValidationError(f'At most {settings.LOCATIONS_MAX_BULK_SIZE} items may be passed.')
+        user = request.user
+        # all items are validated against the same (cached) sets of valid
+        # icon and significance IDs
+        context = {'reference_ids': reference_ids(user.id)}
+        update_ids = [self.get_id(item) for item in updates]
+        delete_id_list = [parse_id(pk) for pk in deletes]
+        existing = Location.objects.filter(owner=user).in_bulk({*update_ids, *delete_id_list} - {None})
+
+        create_serializers = [LocationSerializer(data=item, context=context) for item in creates]
+        update_serializers = [
+            LocationSerializer(existing.get(pk), data=item, partial=True, context=context)
+            for pk, item in zip(update_ids, updates)
+        ]
+        update_conflicts = self.get_id_conflicts(update_ids, delete_id_list)
+        delete_conflicts = self.get_id_conflicts(delete_id_list, update_ids)
+        errors = {
+            'create': [{} if s.is_valid() else s.errors for s in create_serializers],
+            'update': [
+                update_conflicts.get(pk) or self.get_update_errors(s)
+                for pk, s in zip(update_ids, update_serializers)
+            ],
+            'delete': [
+                delete_conflicts.get(pk) or ({} if pk in existing else {'id': ['Not found.']})
+                for pk in delete_id_list
+            ],
+        }
+        if any(any(item_errors) for item_errors in errors.values()):
+            return Response(errors, status=400)
+
+        new_locations = [Location(owner=user, **s.validated_data) for s in create_serializers]
+        updated_locations = []
+        update_fields = set()
+        for s in update_serializers:
+            for field, value in s.validated_data.items():
+                setattr(s.instance, field, value)
+            update_fields.update(s.validated_data)
+            updated_locations.append(s.instance)
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Location.objects.bulk_create(new_locations)
+            else:
+                # IDs of bulk created entries are only set on some databases
+                for location in new_locations:
+                    location.save()
+            if update_fields:
+                Location.objects.bulk_update(updated_locations, update_fields)
+            delete_ids = set(delete_id_list)
+            if delete_ids:
+                # sends the post_delete signals that bump the version
+                Location.objects.filter(owner=user, id__in=delete_ids).delete()
+            # bulk creates and updates don't send the signals that normally
+            # bump the version
+            bump_version(LOCATIONS, user.id)
+        return Response({
+            'create': LocationSerializer(new_locations, many=True).data,
+            'update': LocationSerializer(updated_locations, many=True).data,
+            'delete': delete_id_list,
+        })
+
+    @staticmethod
+    def get_items(request, name):
+        if not isinstance(request.data, dict):
+            raise ValidationError('The request body must be an object.')
+        items = request.data.get(name, [])
+        if not isinstance(items, list):
+            raise ValidationError(f'{name} must be an array.')
+        return items
+
+    @staticmethod
+    def get_id(item):
+        return parse_id(item.get('id')) if isinstance(item, dict) else None
+
+    @staticmethod
+    def get_id_conflicts(ids, other_ids):
+        """
+        Returns a dict mapping IDs which are passed more than once in 'ids',
+        or which are also passed in 'other_ids', to errors.
+        """
+        counts = Counter(ids)
+        conflicts = {}
+        for pk in ids:
+            if pk is None:
+                continue
+            if counts[pk] > 1:
+                conflicts[pk] = {'id': ['ID is passed more than once.']}
+            elif pk in other_ids:
+                conflicts[pk] = {'id': ['ID is both updated and deleted.']}
+        return conflicts
+
+    @staticmethod
+    def get_update_errors(serializer):
+        if serializer.instance is None:
+            return {'id': ['Not found.']}
+        return {} if serializer.is_valid() else serializer.errors
+
+
+class LocationClusters(APIView):
+    """
+    View to list the user's locations grouped into clusters, for showing
+    a zoomed out map. Requires a 'zoom' query parameter, the map's zoom level
+    (0 to settings.LOCATION_CLUSTER_MAX_ZOOM), and optionally takes a 'bbox'
+    query parameter in the same format as for LocationsListCreate.
+
+    Returns an object with a 'clusters' array, holding objects with the
+    'latitude' and 'longitude' of a cluster's centroid, the 'count' of its
+    locations, and the most common 'significance' and 'icon' IDs among them
+    (see locations.clustering), and a 'locations' array, which is empty
+    except at the highest zoom level, where it holds the individual
+    locations (in the same format as for LocationsListCreate) instead.
+
+    * Requires token authentication.
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            zoom = int(request.query_params['zoom'])
+        except KeyError:
+            raise ValidationError('Missing required query parameter: zoom.')
+        except ValueError:
+            raise ValidationError('zoom must be an integer.')
+        if not 0 <= zoom <= settings.LOCATION_CLUSTER_MAX_ZOOM:
+            raise ValidationError(f'zoom must be between 0 and {settings.LOCATION_CLUSTER_MAX_ZOOM}.')
+        bbox = parse_bbox_param(request)
+
+        if zoom == settings.LOCATION_CLUSTER_MAX_ZOOM:
+            locations = filter_bbox(Location.objects.filter(owner=request.user), bbox)
+            return Response({
+                'clusters': [],
+                'locations': LocationSerializer(locations, many=True).data,
+            })
+
+        clusters = [
+            {'latitude': lat, 'longitude': lon, 'count': count, 'significance': sig, 'icon': icon}
+            for lat, lon, count, sig, icon in cached_clusters(request.user.id, zoom)
+            if bbox is None or bbox_contains(bbox, lat, lon)
+        ]
+        return Response({'clusters': clusters, 'locations': []})
+
+
 class LocationsRetrieveUpdateDestroy(RetrieveUpdateDestroyAPIView):
     """
     View to retrieve a single location, or update it,
@@ -102,7 +384,7 @@ class LocationsRetrieveUpdateDestroy(RetrieveUpdateDestroyAPIView):
         return queryset.filter(owner=self.request.user)
 
 
-class MarkerIconsList(ListAPIView):
+class MarkerIconsList(FastListMixin, ListAPIView):
     """
     View to list all marker icons (these will be the same
     for all users).
@@ -115,11 +397,12 @@ class MarkerIconsList(ListAPIView):
     permission_classes = [IsAuthenticated]
 
 
-class MarkerSignificancesListOrCreate(ListCreateAPIView):
+class MarkerSignificancesListOrCreate(CollectionETagMixin, FastListMixin, ListCreateAPIView):
     """
     View to list all of the user's marker significances,
     and significances where owner is set to NULL, or
-    create new user-bound significance.
+    create new user-bound significance. Lists carry an ETag, see
+    api.etags.CollectionETagMixin.
 
     * Requires token authentication.
     """
@@ -131,6 +414,10 @@ class MarkerSignificancesListOrCreate(ListCreateAPIView):
     def filter_queryset(self, queryset):
         return queryset.filter(Q(owner=self.request.user) | Q(owner__isnull=True))
 
+    def get_etag_collections(self):
+        # the user's own significances, and the default ones
+        return [(SIGNIFICANCES, None), (SIGNIFICANCES, self.request.user.id)]
+
     def perform_create(self, serializer):
         data = self.request.data
 
@@ -177,6 +464,37 @@ class MarkerSignificancesRetrieveUpdateDestroy(RetrieveUpdateDestroyAPIView):
     def filter_queryset(self, queryset):
         return queryset.filter(Q(owner=self.request.user) | Q(owner__isnull=True))
 
+
+def parse_coords_property(request):
+    """
+    Parses the 'coords' property of a forecast request's body, see
+    ForecastPointList and api.util.format.parse_coord_batch.
+    :return: tuple - A (coord_ls, index) tuple, of distinct rounded
+    coordinates and the position of each passed coordinate object's
+    coordinates among these.
+    """
+    try:
+        coord_ls = request.data['coords']
+    except:
+        raise ValidationError('Missing required property: coords.')
+    try:
+        if not isinstance(coord_ls, list):
+            parsed_coord_ls = json.loads(coord_ls)
+        else:
+            parsed_coord_ls = coord_ls
+    except:
+        raise ValidationError('coords data format is invalid.')
+    if not isinstance(parsed_coord_ls, list):
+        raise ValidationError('coords must be an array of coordinate objects.')
+    try:
+        coord_ls, coord_index = parse_coord_batch(
+            parsed_coord_ls, 4, max_size=settings.FORECAST_MAX_BATCH_SIZE
+        )
+    except ValueError as e:
+        raise ValidationError(str(e))
+    return coord_ls, coord_index
+
+
 class ForecastPointList(APIView):
     """
     View for retrieving forecast point data. Only accepts POST requests,
@@ -184,39 +502,276 @@ class ForecastPointList(APIView):
     is in the format {'lat': 123.4567, 'lon': 123.4567} ie lat/longitude
     coordinates with a maximum of four decimals. Returns a JSON array
     of serialized ForecastPoint instance/entry data, see
-    weather.models.ForecastPoint for more information on the model. Note that
-    the returned number of points might be less than the number of passed
-    coordinate tuples, depending on whether any of the coordinates are
-    very close to each other.
+    weather.models.ForecastPoint for more information on the model, with
+    one element for each passed coordinate object, in the same order.
+    Coordinates which are equal after rounding, or very close to each other,
+    share the same point, which is then repeated in the array. At most
+    settings.FORECAST_MAX_BATCH_SIZE coordinate objects may be passed.
+    While the weather API is unavailable, stored points that are due to be
+    updated are returned with an added '"stale": true' property, and
+    coordinates without stored points are returned with only their
+    coordinates and a '"unavailable": true' property. Points that can't be
+    fetched within the request's time budget
+    (settings.FORECAST_REQUEST_BUDGET) are returned with only their
+    coordinates and a '"pending": true' property. If the body includes
+    '"interpolate": true', coordinates surrounded by enough up to date points
+    get forecasts interpolated from these, with an added
+    '"interpolated": true' property, instead of fetching new forecasts.
+
+    If the request's Accept header is 'application/x-ndjson', the response
+    is instead streamed as newline delimited JSON, with one object per
+    distinct (rounded) coordinate, each with an added 'indices' property
+    holding the (0-based) positions of the passed coordinate objects it
+    belongs to.
+    Points that are already up to date are sent right away, and the rest
+    follow as they are fetched.
+
+    If the 'symbols' query parameter is 'codes' (JSON responses only),
+    weather symbols are sent as small integer codes under 'symbol_<N>h'
+    keys, and the array of points is wrapped in an object as its 'points'
+    property, next to a 'symbols' property mapping the used codes to names.
+    If the 'layout' query parameter is 'columns', each point's hourly
+    temperatures and symbols are sent as 't' and 'symbol' arrays instead.
     """
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer]
 
     def post(self, request, format=None):
-        try:
-            coord_ls = request.data['coords']
-        except:
-            raise ValidationError('Missing required property: coords.')
-        try:
-            if not isinstance(coord_ls, list):
-                parsed_coord_ls = json.loads(coord_ls)
-            else:
-                parsed_coord_ls = coord_ls
-        except:
-            raise ValidationError('coords data format is invalid.')
-        if not isinstance(parsed_coord_ls, list):
-            raise ValidationError('coords must be an array of coordinate objects.')
-        rounded_coords = []
-        for coord in parsed_coord_ls:
-            if ('lat' not in coord) or ('lon' not in coord):
-                raise ValidationError("All coordinate objects must have 'lat' and 'lon' properties")
-            if abs(float(coord['lat'])) > 90 or abs(float(coord['lon'])) > 180:
-                raise ValidationError(f"Invalid coordinates: ({coord['lat']}, {coord['lon']})")
-            r_c = round_coords([coord['lat'], coord['lon']], 4)
-            rounded_coords.append(r_c)
-
-        match_points = ForecastPoint.update_and_filter(rounded_coords)
-
-        serialized_points = ForecastPointSerializer(match_points, many=True)
-
-        return Response(serialized_points.data, status=201)
+        deadline = time.monotonic() + settings.FORECAST_REQUEST_BUDGET
+        coord_ls, coord_index = parse_coords_property(request)
+
+        fetch_kwargs = {
+            'deadline': deadline,
+            'hedge_after': hedge_delay(),
+            'interpolate': request.data.get('interpolate') in (True, 'true'),
+        }
+        columnar = request.query_params.get('layout') == 'columns'
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                self.stream_payloads(coord_ls, coord_index, fetch_kwargs, columnar),
+                content_type=NDJSONRenderer.media_type,
+                status=201
+            )
+
+        coord_points = ForecastPoint.update_and_map(coord_ls, **fetch_kwargs)
+        symbol_codes = request.query_params.get('symbols') == 'codes'
+
+        # each point carries its own pre-rendered JSON object, so the
+        # response body is simply formed by joining these, in the order
+        # of the passed coordinates
+        payloads = [
+            self.render_point(coord, coord_points[coord], symbol_codes, columnar)
+            for coord in coord_ls
+        ]
+        body = '[' + ','.join(payloads[i] for i in coord_index) + ']'
+        if symbol_codes:
+            symbols = {
+                code: WeatherSymbol.name_for_code(code)
+                for p in coord_points.values() if p is not None and not p.is_pending
+                for code in (getattr(p, f'symbol_{i}h_id') for i in range(NUM_HOURS))
+            }
+            body = '{"symbols":' + json.dumps(symbols, ensure_ascii=False) + ',"points":' + body + '}'
+
+        return HttpResponse(body, content_type='application/json', status=201)
+
+    @staticmethod
+    def render_point(coord, point, symbol_codes=False, columnar=False):
+        """
+        Returns the JSON object string for a point, or for a placeholder if
+        there is no point for the coordinates.
+        """
+        if point is None:
+            return render_placeholder_payload(*coord, unavailable=True)
+        return point.get_payload_json(symbol_codes, columnar)
+
+    def stream_payloads(self, coord_ls, coord_index, fetch_kwargs, columnar=False):
+        """
+        Yields newline delimited JSON objects for points as they become
+        available, see the class docstring.
+        """
+        indices = {coord: [] for coord in coord_ls}
+        for i, coord_i in enumerate(coord_index):
+            indices[coord_ls[coord_i]].append(i)
+        for coord, point in ForecastPoint.iter_update_and_map(coord_ls, **fetch_kwargs):
+            payload = add_payload_flags(
+                self.render_point(coord, point, columnar=columnar), indices=indices[coord]
+            )
+            yield payload + '\n'
+
+
+def parse_datetime_property(request, name, default=None):
+    """
+    Parses an ISO 8601 datetime property of a request's body, treating
+    datetimes without timezone information as UTC.
+    """
+    if name not in request.data:
+        return default
+    value = request.data[name]
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValidationError(f'{name} must be an ISO 8601 datetime.')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def parse_float_property(request, name, default, minimum):
+    try:
+        value = float(request.data.get(name, default))
+    except (TypeError, ValueError):
+        raise ValidationError(f'{name} must be a number.')
+    if not value >= minimum:
+        raise ValidationError(f'{name} must be at least {minimum}.')
+    return value
+
+
+class ForecastRoute(APIView):
+    """
+    View for retrieving forecasts along a route. Only accepts POST requests,
+    whose body should include either a 'polyline' property, holding a route
+    in the encoded polyline format (with 5 decimals), or 'visited_from' and
+    'visited_to' properties, holding ISO 8601 datetimes between which the
+    user's visited positions (see locations.models.VisitedGeoPosition) form
+    the route. Optional properties are 'spacing', the distance in meters
+    between the points at which the route is sampled (defaults to
+    settings.ROUTE_SAMPLE_SPACING), 'departure', an ISO 8601 datetime
+    (defaults to the current time), and for polylines 'speed', the travel
+    speed in km/h (defaults to settings.ROUTE_DEFAULT_SPEED). Recorded
+    trips are assumed to be travelled at the same pace as when recorded.
+
+    Returns a JSON array with an object for each sample, holding its
+    'latitude', 'longitude', 'distance' from the start of the route in
+    meters, 'eta' (the estimated time at which it is passed), the
+    'forecast' of the ~1km grid cell containing it (see ForecastPointList
+    for the format), and the 'hour' (0-6) of that forecast which is
+    closest to the estimated time, or null if it isn't covered.
+
+    * Requires token authentication.
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        deadline = time.monotonic() + settings.FORECAST_REQUEST_BUDGET
+        departure = parse_datetime_property(request, 'departure', timezone.now())
+        spacing = parse_float_property(
+            request, 'spacing', settings.ROUTE_SAMPLE_SPACING, settings.ROUTE_MIN_SAMPLE_SPACING
+        )
+        lats, lons, offsets = self.get_route(request)
+        if not len(lats):
+            raise ValidationError('The route has no positions.')
+
+        sample_lats, sample_lons, sample_dists = sample_path(lats, lons, spacing)
+        if len(sample_dists) > settings.FORECAST_MAX_BATCH_SIZE:
+            raise ValidationError(
+                f'The route has more than {settings.FORECAST_MAX_BATCH_SIZE} samples, '
+                'use a larger spacing.'
+            )
+        if offsets is None:
+            speed = parse_float_property(request, 'speed', settings.ROUTE_DEFAULT_SPEED, 0.1)
+            sample_offsets = sample_dists / (speed / 3.6)
+        else:
+            sample_offsets = np.interp(sample_dists, path_distances(lats, lons), offsets)
+
+        coord_ls, cell_index = sample_cells(sample_lats, sample_lons)
+        coord_points = ForecastPoint.update_and_map(
+            coord_ls, deadline=deadline, hedge_after=hedge_delay()
+        )
+        points = [coord_points[coord] for coord in coord_ls]
+        payloads = [ForecastPointList.render_point(coord, coord_points[coord]) for coord in coord_ls]
+
+        samples = []
+        for i, cell_i in enumerate(cell_index):
+            eta = departure + timedelta(seconds=float(sample_offsets[i]))
+            point = points[cell_i]
+            hour = None
+            if point is not None and not point.is_pending:
+                hour = forecast_hour(point, eta)
+            samples.append(
+                '{"latitude":"' + format_decimal(float(sample_lats[i]), 4) +
+                '","longitude":"' + format_decimal(float(sample_lons[i]), 4) +
+                '","distance":' + str(round(float(sample_dists[i]))) +
+                ',"eta":"' + format_datetime(eta) +
+                '","hour":' + json.dumps(hour) +
+                ',"forecast":' + payloads[cell_i] + '}'
+            )
+        return HttpResponse('[' + ','.join(samples) + ']', content_type='application/json', status=201)
+
+    def get_route(self, request):
+        """
+        Returns a (latitudes, longitudes, offsets) tuple for the route in the
+        request's body, where offsets are the numbers of seconds after the
+        start at which recorded positions were visited, or None for polylines.
+        """
+        if 'polyline' in request.data:
+            try:
+                coords = decode_polyline(str(request.data['polyline']))
+            except ValueError as e:
+                raise ValidationError(str(e))
+            if any(abs(lat) > 90 or abs(lon) > 180 for lat, lon in coords):
+                raise ValidationError('The polyline has invalid coordinates.')
+            return [lat for lat, _ in coords], [lon for _, lon in coords], None
+
+        visited_from = parse_datetime_property(request, 'visited_from')
+        visited_to = parse_datetime_property(request, 'visited_to')
+        if visited_from is None or visited_to is None:
+            raise ValidationError("Either polyline, or visited_from and visited_to, must be included.")
+        positions = list(
+            VisitedGeoPosition.objects
+            .filter(owner=request.user, utc_timestamp__range=(visited_from, visited_to))
+            .order_by('utc_timestamp')
+            .values_list('latitude', 'longitude', 'utc_timestamp')
+        )
+        if not positions:
+            return [], [], None
+        start = positions[0][2]
+        return (
+            [float(lat) for lat, _, _ in positions],
+            [float(lon) for _, lon, _ in positions],
+            [(ts - start).total_seconds() for _, _, ts in positions],
+        )
+
+
+class ForecastSubscription(APIView):
+    """
+    View for subscribing to forecast updates. Only accepts POST requests,
+    whose body should include a 'coords' property in the same format as
+    for ForecastPointList. Returns a signed subscription token, valid for
+    settings.FORECAST_SUBSCRIPTION_MAX_AGE seconds, and the URL of the
+    server-sent events stream which pushes forecast updates for points
+    near the passed coordinates, see api.streams.
+
+    * Requires token authentication.
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        coord_ls, _ = parse_coords_property(request)
+        token = create_subscription_token(request.user, coord_ls)
+        return Response(
+            {'token': token, 'url': request.build_absolute_uri(stream_url(token))},
+            status=201
+        )
+
+
+class Metrics(APIView):
+    """
+    View for retrieving server metrics (eg weather API request latencies
+    and database query counts), summed across all server processes, in
+    the Prometheus text exposition format. See instrumentation.metrics.
+
+    * Requires admin (staff) user authentication.
+    """
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        authentication.BasicAuthentication,
+    ]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return HttpResponse(
+            render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,85 @@
+"""
+Benchmark comparing listing 10k locations through LocationSerializer and
+JSONRenderer with the serializer-free read path of api.fastlist, both
+including the database query.
+
+Run from the project root, against a migrated database, with:
+    python -m benchmarks.bench_location_lists
+
+The benchmark's locations are created in a transaction which is rolled
+back afterwards.
+"""
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.fastlist import row_encoder  # noqa: E402
+from api.serializers import LocationSerializer  # noqa: E402
+from locations.models import Location, MarkerIcon, MarkerSignificance  # noqa: E402
+
+NUM_ROWS = 10000
+
+REPEATS = 5
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_locations(owner):
+    significance = MarkerSignificance.objects.filter(owner__isnull=True)[0]
+    icon = MarkerIcon.objects.all()[0]
+    Location.objects.bulk_create([
+        Location(
+            place_name=f'Place {i}',
+            address=f'Street {i}, Town' if i % 2 else None,
+            latitude=f'{-60 + i * 0.01:.7f}',
+            longitude=f'{-170 + i * 0.03:.7f}',
+            description='A place worth a visit' if i % 3 else None,
+            significance=significance,
+            icon=icon,
+            owner=owner,
+        )
+        for i in range(NUM_ROWS)
+    ], batch_size=500)
+
+
+def bench(label, fun):
+    best = min(timeit.repeat(fun, number=1, repeat=REPEATS))
+    print(f'{label:<28} {best * 1e3:8.1f} ms/list')
+
+
+def main():
+    try:
+        with transaction.atomic():
+            owner = get_user_model().objects.create_user(username='bench-location-lists')
+            create_locations(owner)
+            queryset = Location.objects.filter(owner=owner)
+            encoder = row_encoder(LocationSerializer)
+
+            def serializer_list():
+                return JSONRenderer().render(LocationSerializer(queryset.all(), many=True).data)
+
+            def fast_list():
+                return encoder.encode(queryset.values_list(*encoder.sources)).encode()
+
+            assert serializer_list() == fast_list(), 'Outputs differ.'
+            print(f'{NUM_ROWS} locations')
+            bench('LocationSerializer', serializer_list)
+            bench('api.fastlist', fast_list)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
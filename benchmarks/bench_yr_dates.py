@@ -0,0 +1,59 @@
+"""
+Microbenchmark comparing strptime-based parsing of YR API timestamps and
+HTTP header dates with the dedicated parsers in
+weather.api_request_functions.yr_api.
+
+Run from the project root with:
+    python -m benchmarks.bench_yr_dates
+"""
+import timeit
+
+from datetime import datetime
+
+from pytz import UTC
+
+from weather.api_request_functions.yr_api import (
+    parse_header_datetime,
+    parse_yr_datetime,
+    HEADER_DATE_FORMAT_SPEC,
+    YR_DATE_FORMAT_SPEC,
+)
+
+# roughly the number of timeseries steps in a full YR 'compact' response
+NUM_TIMESTAMPS = 90
+
+REPEATS = 5
+
+YR_TIMESTAMPS = [
+    f'2021-05-{21 + h // 24:02d}T{h % 24:02d}:00:00Z' for h in range(NUM_TIMESTAMPS)
+]
+
+HEADER_DATE = 'Fri, 21 May 2021 12:05:01 GMT'
+
+
+def strptime_yr(time_str):
+    return datetime.strptime(time_str, YR_DATE_FORMAT_SPEC).replace(tzinfo=UTC)
+
+
+def strptime_header(time_str):
+    return datetime.strptime(time_str, HEADER_DATE_FORMAT_SPEC).replace(tzinfo=UTC)
+
+
+def bench(label, fun, args, number):
+    best = min(timeit.repeat(
+        lambda: [fun(a) for a in args], number=number, repeat=REPEATS
+    ))
+    per_call_us = best / (number * len(args)) * 1e6
+    print(f'{label:<28} {per_call_us:8.3f} us/parse')
+
+
+def main():
+    number = 200
+    bench('strptime (YR timestamps)', strptime_yr, YR_TIMESTAMPS, number)
+    bench('parse_yr_datetime', parse_yr_datetime, YR_TIMESTAMPS, number)
+    bench('strptime (header dates)', strptime_header, [HEADER_DATE], number * 50)
+    bench('parse_header_datetime', parse_header_datetime, [HEADER_DATE], number * 50)
+
+
+if __name__ == '__main__':
+    main()
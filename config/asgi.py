@@ -9,8 +9,34 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+# only the forecast update stream is served through ASGI, by a process of
+# its own (see the Procfile), so that open streams don't each hold a worker
+# thread. Django itself is served as a WSGI application (see config.wsgi),
+# since Django 3.2's ASGI handler iterates streaming responses (see
+# api.views.ForecastPointList) within the event loop, where their database
+# queries and waiting for weather API requests aren't allowed
+django.setup(set_prefix=False)
+
+# imported once Django has been set up
+from api.streams import STREAM_PATH, forecast_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Serves the forecast update stream (see api.streams). Other requests
+    are meant to be routed to the WSGI application, and are answered with
+    404 responses.
+    """
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await forecast_stream(scope, receive, send)
+    elif scope['type'] == 'http':
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Not found.'})
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # import environment variables
@@ -63,6 +64,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'instrumentation.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -108,6 +110,23 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# the database cache is shared by all server processes, so that cached
+# data are invalidated everywhere at once (see locations.versions). its
+# table is created by 'python manage.py createcachetable'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        },
+    }
+}
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -155,6 +174,78 @@ REST_FRAMEWORK = {
     ]
 }
 
+# default and maximum numbers of locations per page, for paginated
+# location lists (see api.pagination.LocationKeysetPagination)
+LOCATIONS_PAGE_SIZE = int(os.getenv('LOCATIONS_PAGE_SIZE', '100'))
+LOCATIONS_MAX_PAGE_SIZE = int(os.getenv('LOCATIONS_MAX_PAGE_SIZE', '1000'))
+# maximum number of items per bulk location write (see api.views.LocationsBulk)
+LOCATIONS_MAX_BULK_SIZE = int(os.getenv('LOCATIONS_MAX_BULK_SIZE', '1000'))
+# location clustering settings (see locations.clustering): number of
+# cells per map tile side, zoom level from which individual locations are
+# returned instead of clusters, and number of seconds clusters are cached
+LOCATION_CLUSTER_CELLS_PER_TILE = int(os.getenv('LOCATION_CLUSTER_CELLS_PER_TILE', '4'))
+LOCATION_CLUSTER_MAX_ZOOM = int(os.getenv('LOCATION_CLUSTER_MAX_ZOOM', '16'))
+LOCATION_CLUSTER_CACHE_TIMEOUT = int(os.getenv('LOCATION_CLUSTER_CACHE_TIMEOUT', '86400'))
+
+# YR weather API client settings
+# number of seconds to wait for a response before giving up
+YR_REQUEST_TIMEOUT = float(os.getenv('YR_REQUEST_TIMEOUT', '5'))
+# circuit breaker settings (see weather.api_request_functions.circuit_breaker);
+# the breaker trips when at least half of the recent requests
+# failed or took longer than YR_SLOW_REQUEST_DURATION seconds, and
+# probes the API again after YR_BREAKER_RESET_TIMEOUT seconds
+YR_SLOW_REQUEST_DURATION = float(os.getenv('YR_SLOW_REQUEST_DURATION', '2'))
+YR_BREAKER_RESET_TIMEOUT = float(os.getenv('YR_BREAKER_RESET_TIMEOUT', '30'))
+# maximum average number of YR API requests per second, per server process
+YR_MAX_REQUESTS_PER_SECOND = float(os.getenv('YR_MAX_REQUESTS_PER_SECOND', '10'))
+# whether to make a duplicate request when a YR API request hasn't
+# finished after the 95th percentile of recent request durations
+YR_HEDGE_REQUESTS = os.getenv('YR_HEDGE_REQUESTS') == 'True'
+
+# weather provider used for fetching forecasts (see weather.providers), and
+# the forecast data file used by weather.providers.FixtureProvider
+FORECAST_PROVIDER = os.getenv('FORECAST_PROVIDER', 'weather.providers.YRProvider')
+FORECAST_FIXTURE_PATH = os.getenv(
+    'FORECAST_FIXTURE_PATH', os.path.join(BASE_DIR, 'weather', 'forecast_fixture.json')
+)
+
+# forecast fetching settings
+# number of seconds that forecast views may spend waiting for the
+# weather API; points that aren't fetched in time are returned as pending
+FORECAST_REQUEST_BUDGET = float(os.getenv('FORECAST_REQUEST_BUDGET', '8'))
+# maximum number of coordinates accepted in a single forecast request
+FORECAST_MAX_BATCH_SIZE = int(os.getenv('FORECAST_MAX_BATCH_SIZE', '500'))
+# whether to archive superseded forecasts (see weather.archive), and
+# archive write batch size and interval (seconds)
+FORECAST_ARCHIVE_ENABLED = os.getenv('FORECAST_ARCHIVE_ENABLED') == 'True'
+FORECAST_ARCHIVE_BATCH_SIZE = int(os.getenv('FORECAST_ARCHIVE_BATCH_SIZE', '500'))
+FORECAST_ARCHIVE_FLUSH_INTERVAL = float(os.getenv('FORECAST_ARCHIVE_FLUSH_INTERVAL', '10'))
+# default distance in meters between the points at which routes
+# are sampled for forecasts, and the smallest distance allowed
+ROUTE_SAMPLE_SPACING = float(os.getenv('ROUTE_SAMPLE_SPACING', '5000'))
+ROUTE_MIN_SAMPLE_SPACING = float(os.getenv('ROUTE_MIN_SAMPLE_SPACING', '500'))
+# default travel speed (km/h) used for estimating when routes' points are passed
+ROUTE_DEFAULT_SPEED = float(os.getenv('ROUTE_DEFAULT_SPEED', '60'))
+# number of seconds for which forecast subscription tokens are valid
+FORECAST_SUBSCRIPTION_MAX_AGE = int(os.getenv('FORECAST_SUBSCRIPTION_MAX_AGE', '86400'))
+# number of seconds between keepalive messages on idle forecast update streams
+FORECAST_STREAM_KEEPALIVE = float(os.getenv('FORECAST_STREAM_KEEPALIVE', '15'))
+# maximum number of concurrent weather API requests per server process
+FORECAST_FETCH_CONCURRENCY = int(os.getenv('FORECAST_FETCH_CONCURRENCY', '8'))
+# distance in meters within which an up to date forecast point is
+# used for requested coordinates without a point of their own
+# (0 disables this)
+FORECAST_REUSE_RADIUS = float(os.getenv('FORECAST_REUSE_RADIUS', '500'))
+# when clients ask for interpolated forecasts, forecasts for coordinates
+# with at least FORECAST_INTERPOLATION_MIN_NEIGHBOURS up to date points within
+# FORECAST_INTERPOLATION_RADIUS meters are interpolated from these points
+FORECAST_INTERPOLATION_RADIUS = float(os.getenv('FORECAST_INTERPOLATION_RADIUS', '5000'))
+FORECAST_INTERPOLATION_MIN_NEIGHBOURS = int(os.getenv('FORECAST_INTERPOLATION_MIN_NEIGHBOURS', '3'))
+
+# directory where each server process writes its metrics, for them to be
+# aggregated across processes (see instrumentation.metrics)
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'mapback-metrics'))
+
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 else:
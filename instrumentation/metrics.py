@@ -0,0 +1,320 @@
+"""
+Minimal metrics (counters and histograms), which can be aggregated across
+server worker processes and rendered in the Prometheus text exposition
+format.
+
+Each process keeps its metric values in memory, and periodically writes a
+snapshot of them to a file of its own in settings.METRICS_DIR (see flush).
+Collecting metrics (see collect) sums up the snapshots of all processes.
+The snapshots of processes that have exited are merged into a single
+aggregate file, so that they don't pile up across worker restarts, while
+the summed values keep increasing.
+"""
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# default histogram buckets, suitable for durations in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# minimum number of seconds between regular (non-forced) snapshot writes
+FLUSH_INTERVAL = 1.0
+
+# names of the files in settings.METRICS_DIR holding the summed snapshots of
+# exited processes, and serializing collect calls of all processes
+AGGREGATE_NAME = 'aggregate.json'
+LOCK_NAME = 'collect.lock'
+
+
+class Registry:
+    """
+    Holds all metrics of the process.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.dirty = False
+        self.last_flush = 0.0
+        self._pid = None
+        self._snapshot_name = None
+
+    @property
+    def snapshot_name(self):
+        """
+        Name of the process' snapshot file. Includes the time at which it was
+        first needed, so that a new process which happens to get the PID of
+        an exited one doesn't overwrite its snapshot. Checked against the
+        current PID, in case the registry was created before forking.
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._snapshot_name = f'{self._pid}-{time.time_ns()}.json'
+        return self._snapshot_name
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f'Metric {metric.name} is already registered.')
+            self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """
+        Returns a JSON-serializable snapshot of all metric values.
+        """
+        with self.lock:
+            return {
+                name: {
+                    'type': metric.type,
+                    'samples': [
+                        [dict(zip(metric.labelnames, key)), value]
+                        for key, value in metric.values.items()
+                    ],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        # maps tuples of label values to sample values
+        self.values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Metric {self.name} expects labels {self.labelnames}.')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """
+    A value that only ever increases, eg a number of requests.
+    """
+    type = COUNTER
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+
+
+class Histogram(Metric):
+    """
+    Counts observed values (eg request durations) in buckets, and keeps
+    track of their sum and count.
+    """
+    type = HISTOGRAM
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            # sample values are lists of per-bucket counts (not cumulative),
+            # followed by an overflow count, the sum and the count of values
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 3)
+            index = next(
+                (i for i, bound in enumerate(self.buckets) if value <= bound),
+                len(self.buckets)
+            )
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+            self.registry.dirty = True
+
+
+def flush(force=False, registry=REGISTRY):
+    """
+    Writes a snapshot of the process' metrics to its file in
+    settings.METRICS_DIR, if anything has changed since the last write
+    and (unless 'force' is set) at least FLUSH_INTERVAL seconds have passed.
+    """
+    now = time.monotonic()
+    if not registry.dirty or (not force and now - registry.last_flush < FLUSH_INTERVAL):
+        return
+    with registry.flush_lock:
+        registry.dirty = False
+        registry.last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_snapshot(registry.snapshot_name, registry.snapshot())
+
+
+def process_alive(pid):
+    """
+    Returns whether a process with the given PID exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # exists, but belongs to another user
+        return True
+    return True
+
+
+def add_snapshot(aggregated, snapshot):
+    """
+    Adds the metric values of a snapshot to the passed dict (see collect).
+    """
+    for name, metric in snapshot.items():
+        entry = aggregated.setdefault(name, {'type': metric['type'], 'samples': {}})
+        for labels, value in metric['samples']:
+            key = tuple(sorted(labels.items()))
+            if key not in entry['samples']:
+                entry['samples'][key] = value
+            elif metric['type'] == HISTOGRAM:
+                entry['samples'][key] = [a + b for a, b in zip(entry['samples'][key], value)]
+            else:
+                entry['samples'][key] += value
+
+
+def read_snapshot(file_name):
+    """
+    :return: dict - The snapshot in the passed file of settings.METRICS_DIR,
+    or None if it can't be read.
+    """
+    try:
+        with open(os.path.join(settings.METRICS_DIR, file_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(file_name, snapshot):
+    path = os.path.join(settings.METRICS_DIR, file_name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    # replacing is atomic, so readers never see partially written snapshots
+    os.replace(tmp_path, path)
+
+
+def merge_exited(file_names):
+    """
+    Adds the snapshots of exited processes to the aggregate file, and
+    removes them (and any temporary files of exited processes).
+    :param file_names: The names of the files in settings.METRICS_DIR.
+    :return: list - The names of the remaining snapshots of live processes.
+    """
+    live = []
+    exited = []
+    for file_name in file_names:
+        if not file_name.endswith(('.json', '.json.tmp')):
+            continue
+        try:
+            pid = int(file_name.split('-', 1)[0])
+        except ValueError:
+            continue
+        if process_alive(pid):
+            if file_name.endswith('.json'):
+                live.append(file_name)
+        else:
+            exited.append(file_name)
+    if exited:
+        aggregated = {}
+        add_snapshot(aggregated, read_snapshot(AGGREGATE_NAME) or {})
+        for file_name in exited:
+            if file_name.endswith('.json'):
+                add_snapshot(aggregated, read_snapshot(file_name) or {})
+        write_snapshot(AGGREGATE_NAME, {
+            name: {
+                'type': entry['type'],
+                'samples': [[dict(key), value] for key, value in entry['samples'].items()],
+            }
+            for name, entry in aggregated.items()
+        })
+        for file_name in exited:
+            os.remove(os.path.join(settings.METRICS_DIR, file_name))
+    return live
+
+
+def collect(registry=REGISTRY):
+    """
+    Sums up the metric snapshots of all processes, after merging the
+    snapshots of exited ones into the aggregate file (see merge_exited).
+    :return: dict - Maps metric names to dicts with 'type' and 'samples'
+    keys, where samples map tuples of (label name, label value) pairs to
+    summed sample values.
+    """
+    flush(force=True, registry=registry)
+    aggregated = {}
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, LOCK_NAME), 'w') as lock_file:
+        # keeps other processes from merging snapshots while they are read,
+        # which could have them counted twice or not at all
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        file_names = merge_exited(os.listdir(settings.METRICS_DIR))
+        for file_name in [AGGREGATE_NAME] + file_names:
+            snapshot = read_snapshot(file_name)
+            if snapshot is not None:
+                add_snapshot(aggregated, snapshot)
+    return aggregated
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_prometheus(registry=REGISTRY):
+    """
+    Returns all processes' summed metrics in the Prometheus text
+    exposition format (version 0.0.4).
+    """
+    lines = []
+    for name, entry in sorted(collect(registry).items()):
+        metric = registry.metrics.get(name)
+        if metric is None:
+            # left behind by a process running an older version of the code
+            continue
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {entry["type"]}')
+        for labels, value in sorted(entry['samples'].items()):
+            if entry['type'] != HISTOGRAM:
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), value[:-2]):
+                cumulative += count
+                bucket_labels = labels + (('le', format_value(bound)),)
+                lines.append(f'{name}_bucket{format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(value[-2])}')
+            lines.append(f'{name}_count{format_labels(labels)} {format_value(value[-1])}')
+    return '\n'.join(lines) + '\n'
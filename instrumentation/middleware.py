@@ -0,0 +1,62 @@
+import time
+
+from django.db import connection
+
+from .metrics import Counter, flush
+
+VIEW_REQUESTS = Counter(
+    'mapback_view_requests_total',
+    'Number of handled requests, per view.',
+    ['view']
+)
+DB_QUERIES = Counter(
+    'mapback_db_queries_total',
+    'Number of database queries made while handling requests, per view.',
+    ['view']
+)
+DB_QUERY_SECONDS = Counter(
+    'mapback_db_query_seconds_total',
+    'Time spent on database queries while handling requests, per view.',
+    ['view']
+)
+
+
+class QueryStats:
+    """
+    Database execute wrapper (see Django's connection.execute_wrapper) which
+    counts queries and the time spent on them.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records per-view request, database query and query time metrics, and
+    regularly writes the process' metrics to its snapshot file so that
+    they can be aggregated across worker processes
+    (see instrumentation.metrics).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        VIEW_REQUESTS.inc(view=view)
+        DB_QUERIES.inc(stats.count, view=view)
+        DB_QUERY_SECONDS.inc(stats.duration, view=view)
+        flush()
+        return response
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from .metrics import Counter, Histogram, Registry, collect, render_prometheus
+
+
+class MetricsTestCase(SimpleTestCase):
+    """
+    Tests of metrics aggregation and rendering.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(METRICS_DIR=self.tmp_dir.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def make_registry(self, snapshot_number):
+        registry = Registry()
+        counter = Counter('requests_total', 'Requests.', ['status'], registry=registry)
+        histogram = Histogram('duration_seconds', 'Durations.', buckets=(0.1, 1), registry=registry)
+        # stand in for separate processes
+        registry._pid = os.getpid()
+        registry._snapshot_name = f'{registry._pid}-{snapshot_number}.json'
+        return registry, counter, histogram
+
+    def test_aggregates_processes(self):
+        """
+        Metrics of separate processes' snapshots are summed up.
+        """
+        reg_1, counter_1, hist_1 = self.make_registry(1)
+        reg_2, counter_2, hist_2 = self.make_registry(2)
+        counter_1.inc(status=200)
+        counter_2.inc(2, status=200)
+        counter_2.inc(status=500)
+        hist_1.observe(0.05)
+        hist_2.observe(0.5)
+        hist_2.observe(5)
+        collect(reg_2)
+        aggregated = collect(reg_1)
+        self.assertEqual(aggregated['requests_total']['samples'][(('status', '200'),)], 3)
+        self.assertEqual(aggregated['duration_seconds']['samples'][()], [1, 1, 1, 5.55, 3])
+
+    def test_exited_processes(self):
+        """
+        Snapshots of processes that have exited are merged into the
+        aggregate file, so that the summed values don't drop.
+        """
+        worker = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+        self.addCleanup(worker.kill)
+        worker_snapshot = os.path.join(self.tmp_dir.name, f'{worker.pid}-1.json')
+        with open(worker_snapshot, 'w') as f:
+            json.dump({
+                'requests_total': {'type': 'counter', 'samples': [[{'status': '200'}, 5]]},
+                'duration_seconds': {'type': 'histogram', 'samples': [[{}, [1, 0, 0, 0.05, 1]]]},
+            }, f)
+        registry, counter, histogram = self.make_registry(1)
+        counter.inc(status=200)
+        self.assertEqual(collect(registry)['requests_total']['samples'][(('status', '200'),)], 6)
+        worker.kill()
+        worker.wait()
+        for _ in range(2):
+            aggregated = collect(registry)
+            self.assertEqual(aggregated['requests_total']['samples'][(('status', '200'),)], 6)
+            self.assertEqual(aggregated['duration_seconds']['samples'][()], [1, 0, 0, 0.05, 1])
+        self.assertFalse(os.path.exists(worker_snapshot))
+        counter.inc(status=200)
+        self.assertEqual(collect(registry)['requests_total']['samples'][(('status', '200'),)], 7)
+
+    def test_render_prometheus(self):
+        """
+        Metrics are rendered in Prometheus text format, with cumulative
+        histogram buckets.
+        """
+        registry, counter, histogram = self.make_registry(1)
+        counter.inc(status=200)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        text = render_prometheus(registry)
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{status="200"} 1', text)
+        self.assertIn('duration_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('duration_seconds_bucket{le="1"} 2', text)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('duration_seconds_count 2', text)
@@ -0,0 +1,102 @@
+"""
+Grid based clustering of users' locations, for showing zoomed out maps.
+
+Locations are grouped by the cells of a grid aligned with the map's tiles,
+so that a cluster's members don't depend on the viewport, and clusters
+for a whole collection can be computed once per zoom level and cached
+(see cached_clusters).
+"""
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Location
+from .versions import LOCATIONS, get_version
+
+# number of degrees longitude covered by a map tile at zoom level 0
+TILE_DEGREES = 360
+
+
+def cell_degrees(zoom):
+    """
+    Returns the size (in degrees) of the grid cells locations are clustered
+    by at a zoom level, with settings.LOCATION_CLUSTER_CELLS_PER_TILE cells
+    along each side of a map tile.
+    """
+    return TILE_DEGREES / 2 ** zoom / settings.LOCATION_CLUSTER_CELLS_PER_TILE
+
+
+def dominant_values(index, values):
+    """
+    Returns the most common value of each group, where index maps
+    each value to its group. Ties go to the smallest value.
+    :param index: numpy.ndarray - Group indices (0 to number of groups - 1).
+    :param values: numpy.ndarray - Integer values.
+    """
+    pairs, counts = np.unique(np.column_stack((index, values)), axis=0, return_counts=True)
+    # sorted by group, and by descending count within groups
+    order = np.lexsort((-counts, pairs[:, 0]))
+    _, first = np.unique(pairs[order, 0], return_index=True)
+    return pairs[order[first], 1]
+
+
+def cluster_locations(rows, zoom):
+    """
+    Groups locations into clusters by grid cell.
+    :param rows: list - (latitude, longitude, significance ID, icon ID)
+    tuples of the locations to cluster.
+    :param zoom: int - The map's zoom level.
+    :return: list - (latitude, longitude, count, significance ID, icon ID)
+    tuples, where the coordinates are those of the cluster's centroid and
+    the IDs are the most common ones among the cluster's locations.
+    """
+    if not rows:
+        return []
+    data = np.array(rows, dtype=float)
+    lats, lons = data[:, 0], data[:, 1]
+    cell = cell_degrees(zoom)
+    cells = np.column_stack((np.floor((lats + 90) / cell), np.floor((lons + 180) / cell)))
+    _, index, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    index = index.ravel()
+    center_lats = np.bincount(index, weights=lats) / counts
+    center_lons = np.bincount(index, weights=lons) / counts
+    significances = dominant_values(index, data[:, 2].astype(int))
+    icons = dominant_values(index, data[:, 3].astype(int))
+    return [
+        (round(float(lat), 7), round(float(lon), 7), int(count), int(sig), int(icon))
+        for lat, lon, count, sig, icon in zip(center_lats, center_lons, counts, significances, icons)
+    ]
+
+
+def cached_clusters(owner_id, zoom):
+    """
+    Returns the clusters (see cluster_locations) of all of a user's
+    locations at a zoom level, cached until the user's locations change.
+    """
+    key = f'locations:clusters:{owner_id}:{get_version(LOCATIONS, owner_id)}:{zoom}'
+    clusters = cache.get(key)
+    if clusters is None:
+        rows = list(
+            Location.objects
+            .filter(owner_id=owner_id)
+            .order_by()
+            .values_list('latitude', 'longitude', 'significance_id', 'icon_id')
+        )
+        clusters = cluster_locations(rows, zoom)
+        cache.set(key, clusters, timeout=settings.LOCATION_CLUSTER_CACHE_TIMEOUT)
+    return clusters
+
+
+def bbox_contains(bbox, lat, lon):
+    """
+    Tells if a (minlon, minlat, maxlon, maxlat) bounding box contains a point.
+    Boxes with a minimum longitude greater than the maximum longitude cross
+    the antimeridian.
+    """
+    minlon, minlat, maxlon, maxlat = bbox
+    if not minlat <= lat <= maxlat:
+        return False
+    if minlon <= maxlon:
+        return minlon <= lon <= maxlon
+    return lon >= minlon or lon <= maxlon
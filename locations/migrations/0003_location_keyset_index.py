@@ -0,0 +1,21 @@
+# Generated by Django 3.2.2 on 2026-10-19 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0002_insertdata_20210512_0747'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='location',
+            options={'ordering': ['place_name', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['owner', 'place_name', 'id'], name='locations_l_owner_i_ce6daf_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.2 on 2026-10-19 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_location_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['owner', 'latitude', 'longitude'], name='locations_l_owner_i_cda02e_idx'),
+        ),
+    ]
@@ -99,7 +99,14 @@ class Location(models.Model):
         return f'Location at: ({self.latitude}, {self.longitude})'
 
     class Meta:
-        ordering = ['place_name']
+        # 'id' makes the ordering stable, which keyset pagination relies
+        # on (see api.pagination.LocationKeysetPagination)
+        ordering = ['place_name', 'id']
+        indexes = [
+            models.Index(fields=['owner', 'place_name', 'id']),
+            # for map viewport (bounding box) queries
+            models.Index(fields=['owner', 'latitude', 'longitude']),
+        ]
 
     def place_name_shortened(self):
         if not self.place_name:
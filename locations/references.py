@@ -0,0 +1,44 @@
+"""
+Cached sets of the IDs of the marker icons and significances that a user's
+locations may refer to, ie all icons, and the user's own and the default
+significances. These let references of many written locations be
+validated against sets which are loaded once, rather than being looked up
+for each location.
+
+The sets are cached together with the versions (see locations.versions) of
+the icon and significance collections they were loaded from, and reloaded
+when any of these has changed.
+"""
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import MarkerIcon, MarkerSignificance
+from .versions import ICONS, SIGNIFICANCES, get_version, version_key
+
+
+def reference_ids(owner_id):
+    """
+    :return: dict - A dict with an 'icon' set of valid icon IDs, and a
+    'significance' set of valid significance IDs, for a user's locations.
+    """
+    version_keys = [version_key(ICONS), version_key(SIGNIFICANCES), version_key(SIGNIFICANCES, owner_id)]
+    ids_key = f'locations:reference_ids:{owner_id}'
+    # versions and cached sets are fetched in a single cache lookup
+    cached = cache.get_many(version_keys + [ids_key])
+    versions = [cached.get(key) for key in version_keys]
+    if ids_key in cached and None not in versions and cached[ids_key][0] == versions:
+        return cached[ids_key][1]
+
+    # versions are read before the sets are loaded, so that sets can't be
+    # cached under versions which are newer than them
+    versions = [get_version(ICONS), get_version(SIGNIFICANCES), get_version(SIGNIFICANCES, owner_id)]
+    ids = {
+        'icon': set(MarkerIcon.objects.values_list('id', flat=True)),
+        'significance': set(
+            MarkerSignificance.objects
+            .filter(Q(owner_id=owner_id) | Q(owner__isnull=True))
+            .values_list('id', flat=True)
+        ),
+    }
+    cache.set(ids_key, (versions, ids), timeout=None)
+    return ids
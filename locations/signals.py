@@ -0,0 +1,25 @@
+"""
+Signal handlers bumping collection versions (see locations.versions)
+whenever entries are saved or deleted. Bulk operations, which don't send
+signals, must bump versions explicitly.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Location, MarkerIcon, MarkerSignificance
+from .versions import ICONS, LOCATIONS, SIGNIFICANCES, bump_version
+
+
+@receiver([post_save, post_delete], sender=Location)
+def location_changed(sender, instance, **kwargs):
+    bump_version(LOCATIONS, instance.owner_id)
+
+
+@receiver([post_save, post_delete], sender=MarkerSignificance)
+def significance_changed(sender, instance, **kwargs):
+    bump_version(SIGNIFICANCES, instance.owner_id)
+
+
+@receiver([post_save, post_delete], sender=MarkerIcon)
+def icon_changed(sender, instance, **kwargs):
+    bump_version(ICONS)
@@ -1,3 +1,120 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .clustering import bbox_contains, cached_clusters, cluster_locations
+from .models import Location, MarkerIcon, MarkerSignificance
+from .references import reference_ids
+from .versions import LOCATIONS, bump_version_now, get_version
+
+
+class ClusteringTestCase(TestCase):
+    """
+    Tests for clustering locations, see locations.clustering.
+    """
+    @override_settings(LOCATION_CLUSTER_CELLS_PER_TILE=4)
+    def test_cluster_locations(self):
+        """
+        Locations within the same grid cell form a cluster at their centroid,
+        with the most common significance/icon IDs.
+        """
+        rows = [(10, 10, 1, 5), (10.2, 10.2, 2, 5), (10.4, 10.4, 2, 6), (-40, 100, 3, 7)]
+        # cells are 360 / 2**4 / 4 = 5.625 degrees wide at zoom 4
+        clusters = cluster_locations(rows, 4)
+        self.assertEqual(clusters, [(-40.0, 100.0, 1, 3, 7), (10.2, 10.2, 3, 2, 5)])
+        # at zoom 0, cells are 90 degrees wide
+        self.assertEqual(len(cluster_locations(rows, 0)), 2)
+        self.assertEqual(cluster_locations([], 4), [])
+
+    def test_bbox_contains(self):
+        self.assertTrue(bbox_contains((0, 0, 10, 10), 5, 5))
+        self.assertFalse(bbox_contains((0, 0, 10, 10), 5, 15))
+        self.assertTrue(bbox_contains((170, 0, -170, 10), 5, -175))
+        self.assertFalse(bbox_contains((170, 0, -170, 10), 5, 0))
+
+    def test_cached_clusters_invalidated(self):
+        """
+        Cached clusters are recomputed once the user's locations change.
+        """
+        user = get_user_model().objects.create_user(username='clusterer', password='foo')
+        significance = MarkerSignificance.objects.all()[0]
+        icon = MarkerIcon.objects.all()[0]
+        version = get_version(LOCATIONS, user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(
+                place_name='a', latitude=10, longitude=10,
+                significance=significance, icon=icon, owner=user
+            )
+        self.assertNotEqual(get_version(LOCATIONS, user.id), version)
+        self.assertEqual(cached_clusters(user.id, 4)[0][2], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(
+                place_name='b', latitude=10.1, longitude=10.1,
+                significance=significance, icon=icon, owner=user
+            )
+        self.assertEqual(cached_clusters(user.id, 4)[0][2], 2)
+
+
+class VersionsTestCase(TestCase):
+    """
+    Tests for collection versions, see locations.versions.
+    """
+    def test_concurrent_bumps(self):
+        """
+        Concurrent bumps, which both read the same current version,
+        still result in distinct new versions.
+        """
+        version = get_version(LOCATIONS, 1)
+        with mock.patch.object(cache, 'get', return_value=version):
+            versions = [bump_version_now(LOCATIONS, 1), bump_version_now(LOCATIONS, 1)]
+        self.assertEqual(len({version, *versions}), 3)
+        self.assertEqual(get_version(LOCATIONS, 1), versions[1])
+
+
+class ReferenceIdsTestCase(TestCase):
+    """
+    Tests for the cached sets of valid icon/significance IDs, see
+    locations.references.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='referrer', password='foo')
+        self.other_user = get_user_model().objects.create_user(username='other', password='foo')
+
+    def test_scoped_to_user(self):
+        """
+        Only the user's own significances and the default ones are valid.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            own = MarkerSignificance.objects.create(
+                significance_label='Own', hex_code='010101', color_name='own', owner=self.user
+            )
+            other = MarkerSignificance.objects.create(
+                significance_label='Other', hex_code='020202', color_name='other', owner=self.other_user
+            )
+        ids = reference_ids(self.user.id)
+        self.assertIn(own.id, ids['significance'])
+        self.assertNotIn(other.id, ids['significance'])
+        self.assertTrue(
+            set(MarkerSignificance.objects.filter(owner__isnull=True).values_list('id', flat=True))
+            <= ids['significance']
+        )
+        self.assertEqual(ids['icon'], set(MarkerIcon.objects.values_list('id', flat=True)))
+
+    def test_cached_and_invalidated(self):
+        """
+        Cached sets are served with a single cache lookup, and reloaded
+        once significances change.
+        """
+        reference_ids(self.user.id)
+        # the cache lookup is the only query, with the database cache
+        with self.assertNumQueries(1):
+            ids = reference_ids(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = MarkerSignificance.objects.create(
+                significance_label='New', hex_code='030303', color_name='new', owner=self.user
+            )
+        self.assertNotIn(new.id, ids['significance'])
+        self.assertIn(new.id, reference_ids(self.user.id)['significance'])
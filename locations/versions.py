@@ -0,0 +1,81 @@
+"""
+Versions of users' collections of locations, marker significances and
+marker icons, kept in the (shared) cache, and bumped whenever entries of
+a collection are written (see locations.signals). Data derived from a
+collection, eg location clusters, can then be cached under keys that
+include the collection's version, and are never served once it changes.
+
+Versions are random tokens, rather than counters, so that concurrent bumps
+never result in the same version (the cache has no atomic increment, eg
+with the database cache, incrementing is a read followed by a write), and
+a version which was evicted from the cache isn't reused.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+LOCATIONS = 'locations'
+SIGNIFICANCES = 'significances'
+ICONS = 'icons'
+
+
+def new_version():
+    return uuid.uuid4().hex
+
+
+def version_key(collection, owner_id=None):
+    """
+    Returns the cache key of a collection's version. Entries without
+    owners (eg default significances, and icons) are versioned as
+    a collection of their own.
+    """
+    return f'versions:{collection}:{"all" if owner_id is None else owner_id}'
+
+
+def get_version(collection, owner_id=None):
+    """
+    :return: str - The current version of a user's collection.
+    """
+    key = version_key(collection, owner_id)
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(collections):
+    """
+    Returns the current versions of several collections, with a single
+    cache lookup when all of them are cached.
+    :param collections: list - (collection, owner ID) tuples.
+    :return: list - The collections' versions, in the same order.
+    """
+    keys = [version_key(collection, owner_id) for collection, owner_id in collections]
+    cached = cache.get_many(keys)
+    return [
+        cached[key] if key in cached else get_version(collection, owner_id)
+        for key, (collection, owner_id) in zip(keys, collections)
+    ]
+
+
+def bump_version_now(collection, owner_id=None):
+    """
+    Replaces the version of a user's collection with a new one. Of
+    concurrent bumps, the last one to be written wins, but any version
+    they set is new.
+    """
+    version = new_version()
+    cache.set(version_key(collection, owner_id), version, timeout=None)
+    return version
+
+
+def bump_version(collection, owner_id=None):
+    """
+    Bumps the version of a user's collection, once the current transaction
+    (if any) is committed, so that data derived from the collection before
+    the commit can't be cached under the new version.
+    """
+    transaction.on_commit(lambda: bump_version_now(collection, owner_id))
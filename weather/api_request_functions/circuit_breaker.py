@@ -0,0 +1,155 @@
+import threading
+import time
+
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is attempted while a circuit breaker is open,
+    ie while calls are being rejected without being made.
+    """
+
+
+class CircuitBreaker:
+    """
+    Guards calls to an unreliable service (eg a weather API). The outcomes
+    of the most recent calls are tracked, and if too many of them failed or
+    were too slow, the breaker 'trips' (opens), after which calls are
+    rejected immediately by raising CircuitOpenError instead of being made.
+    Once 'reset_timeout' seconds have passed, the breaker becomes half-open
+    and lets a single probe call through. If the probe succeeds (and isn't
+    slow), the breaker closes again, otherwise it reopens.
+
+    Instances are safe to share between threads. Note that state is kept
+    per process, so each server worker process trips independently.
+    """
+    def __init__(
+        self,
+        failure_rate_threshold=0.5,
+        slow_call_duration=2.0,
+        slow_call_rate_threshold=0.5,
+        window_size=20,
+        min_calls=5,
+        reset_timeout=30.0,
+        clock=time.monotonic,
+    ):
+        """
+        :param failure_rate_threshold: float - Fraction (0-1) of failed
+        calls within the window at which the breaker trips.
+        :param slow_call_duration: float - Number of seconds after which a
+        successful call is still counted as slow.
+        :param slow_call_rate_threshold: float - Fraction (0-1) of slow
+        calls within the window at which the breaker trips.
+        :param window_size: int - Number of most recent calls to consider.
+        :param min_calls: int - Minimum number of recorded calls before
+        the breaker may trip.
+        :param reset_timeout: float - Number of seconds that the breaker
+        stays open before letting a probe call through.
+        :param clock: function - Returns current time in seconds, used for
+        measuring call durations and timeouts.
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        # each outcome is a (failed, slow) tuple of booleans
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._check_reset_timeout()
+            return self._state
+
+    def call(self, fun, *args, **kwargs):
+        """
+        Calls 'fun' with the passed arguments and returns the result, if
+        the breaker allows it. Any exception raised by 'fun' is recorded as a
+        failure and re-raised.
+        :raises CircuitOpenError: If the breaker is open.
+        """
+        self.before_call()
+        start = self.clock()
+        try:
+            result = fun(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(self.clock() - start)
+        return result
+
+    def before_call(self):
+        """
+        Checks whether a call may be made, and if the breaker is
+        half-open, registers the call as the probe call.
+        :raises CircuitOpenError: If the breaker is open, or half-open with
+        a probe call already underway.
+        """
+        with self._lock:
+            self._check_reset_timeout()
+            if self._state == OPEN:
+                raise CircuitOpenError('Circuit breaker is open.')
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError('Circuit breaker is half-open, probe underway.')
+                self._probing = True
+
+    def record_success(self, duration):
+        """
+        Records a successful call which took 'duration' seconds.
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if slow:
+                    self._open()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((False, slow))
+            self._check_thresholds()
+
+    def record_failure(self):
+        """
+        Records a failed call.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                self._open()
+                return
+            self._outcomes.append((True, False))
+            self._check_thresholds()
+
+    def _check_thresholds(self):
+        num_calls = len(self._outcomes)
+        if self._state != CLOSED or num_calls < self.min_calls:
+            return
+        num_failed = sum(1 for failed, _ in self._outcomes if failed)
+        num_slow = sum(1 for _, slow in self._outcomes if slow)
+        if (num_failed / num_calls >= self.failure_rate_threshold or
+                num_slow / num_calls >= self.slow_call_rate_threshold):
+            self._open()
+
+    def _check_reset_timeout(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probing = False
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
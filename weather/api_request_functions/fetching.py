@@ -0,0 +1,249 @@
+import math
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# maximum number of seconds between checks for calls to duplicate, while
+# there are calls which haven't started yet (see iter_fetch_concurrently)
+HEDGE_CHECK_INTERVAL = 0.05
+
+
+def get_executor():
+    """
+    Returns the thread pool shared by all concurrent weather API requests
+    made from this process, creating it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.FORECAST_FETCH_CONCURRENCY,
+                thread_name_prefix='forecast-fetch'
+            )
+    return _executor
+
+
+class LatencyTracker:
+    """
+    Keeps track of the durations of the most recent calls to a service,
+    so that eg the 95th percentile latency can be looked up. Instances
+    are safe to share between threads.
+    """
+    def __init__(self, window_size=200, min_samples=20):
+        """
+        :param window_size: int - Number of most recent durations to keep.
+        :param min_samples: int - Minimum number of recorded durations for
+        percentiles to be reported.
+        """
+        self.min_samples = min_samples
+        self._durations = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def record(self, duration):
+        with self._lock:
+            self._durations.append(duration)
+
+    def percentile(self, pct):
+        """
+        Returns the 'pct' (0-100) percentile of recorded durations, or
+        None if too few durations have been recorded.
+        """
+        with self._lock:
+            durations = sorted(self._durations)
+        if len(durations) < self.min_samples:
+            return None
+        index = min(len(durations) - 1, math.ceil(pct / 100 * len(durations)) - 1)
+        return durations[max(index, 0)]
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter, allowing at most 'rate' calls per second
+    on average, with bursts of up to 'burst' calls. Instances are safe to
+    share between threads.
+    """
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Waits until a call may be made.
+        :param timeout: (optional) float - Maximum number of seconds to wait.
+        :return: bool - True if the call may be made, False if it couldn't
+        be allowed within 'timeout' seconds.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            wait_time = max((1 - self._tokens) / self.rate, 0)
+            if timeout is not None and wait_time > timeout:
+                return False
+            # the token is taken right away, so that concurrent callers
+            # queue up behind this one
+            self._tokens -= 1
+        if wait_time > 0:
+            self.sleep(wait_time)
+        return True
+
+
+def remaining_time(deadline, clock=time.monotonic):
+    """
+    Returns the number of seconds left until 'deadline' (a time.monotonic
+    value), or None if there is no deadline.
+    """
+    if deadline is None:
+        return None
+    return max(deadline - clock(), 0)
+
+
+def call_before_deadline(fun, deadline):
+    """
+    Calls 'fun' with the number of seconds left until 'deadline' as its
+    'timeout', computed when the call starts, rather than when it was queued.
+    :raises TimeoutError: If the deadline has passed before the call starts.
+    """
+    timeout = remaining_time(deadline)
+    if timeout == 0:
+        raise TimeoutError('The deadline passed before the call started.')
+    return fun(timeout=timeout)
+
+
+def iter_fetch_concurrently(calls, deadline=None, hedge_after=None):
+    """
+    Makes calls concurrently using the shared thread pool, and yields their
+    outcomes as they finish, until at most 'deadline'.
+
+    If 'hedge_after' is passed, then for every call which hasn't finished
+    that many seconds after it started, a duplicate call is made, and the
+    result of whichever of the two finishes first is used. This cuts tail
+    latency when a small share of calls are very slow. Calls are timed from
+    when they start, rather than when they are submitted, since calls
+    waiting for a free thread aren't slow themselves.
+    :param calls: dict - Maps keys to functions, each of which accepts a
+    'timeout' keyword argument (the number of seconds left until the
+    deadline when the call starts, or None) and returns a result.
+    :param deadline: (optional) float - time.monotonic value after which
+    unfinished calls are given up on.
+    :param hedge_after: (optional) float - Number of seconds after which
+    duplicate calls are made.
+    :return: generator - Yields a (key, result, exception) tuple for each
+    call which finishes in time, where exception is None for successful
+    calls, and result is None for failed ones.
+    """
+    if not calls:
+        return
+    executor = get_executor()
+
+    # maps keys to the time.monotonic values at which their calls started
+    started_at = {}
+
+    def start_call(key):
+        started_at[key] = time.monotonic()
+        return call_before_deadline(calls[key], deadline)
+
+    def hedge_wait():
+        """
+        Returns the number of seconds until the next call is due to be
+        duplicated, or None if there are no calls left to duplicate.
+        """
+        unhedged = set(pending.values()) - hedged
+        if not unhedged:
+            return None
+        now = time.monotonic()
+        waits = [
+            max(started_at[key] + hedge_after - now, 0)
+            for key in unhedged if key in started_at
+        ]
+        if len(waits) < len(unhedged):
+            # calls which haven't started yet may do so at any time
+            waits.append(HEDGE_CHECK_INTERVAL)
+        return min(waits)
+
+    pending = {}
+    for key in calls:
+        future = executor.submit(start_call, key)
+        pending[future] = key
+    # keys of calls which have been duplicated
+    hedged = set()
+    finished = set()
+
+    try:
+        while pending:
+            wait_time = remaining_time(deadline)
+            if wait_time == 0:
+                break
+            if hedge_after is not None:
+                next_hedge = hedge_wait()
+                if next_hedge is not None:
+                    wait_time = next_hedge if wait_time is None else min(wait_time, next_hedge)
+            done, _ = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+            outcomes = []
+            for future in done:
+                key = pending.pop(future)
+                if key in finished:
+                    continue
+                exc = future.exception()
+                if exc is None:
+                    finished.add(key)
+                    outcomes.append((key, future.result(), None))
+                # only count a call as failed if its duplicate
+                # (if any) isn't still underway
+                elif key not in pending.values():
+                    finished.add(key)
+                    outcomes.append((key, None, exc))
+
+            # drop duplicates of calls that have already finished
+            for future, key in list(pending.items()):
+                if key in finished:
+                    future.cancel()
+                    del pending[future]
+
+            if hedge_after is not None:
+                now = time.monotonic()
+                # only calls which have started are duplicated, since
+                # queued ones are only slow because the pool is busy
+                for key in set(pending.values()) - hedged:
+                    if key in started_at and now >= started_at[key] + hedge_after:
+                        hedged.add(key)
+                        future = executor.submit(call_before_deadline, calls[key], deadline)
+                        pending[future] = key
+
+            yield from outcomes
+    finally:
+        # calls which are still queued when the deadline passes, or when
+        # the caller stops iterating, mustn't tie up the shared pool
+        for future in pending:
+            future.cancel()
+
+
+def fetch_concurrently(calls, deadline=None, hedge_after=None):
+    """
+    Makes calls concurrently and waits for them to finish, see
+    iter_fetch_concurrently.
+    :return: tuple - A (results, errors) tuple of dicts, mapping keys of
+    successful calls to results, and keys of failed calls to the raised
+    exceptions. Keys of calls which didn't finish in time are in neither.
+    """
+    results = {}
+    errors = {}
+    for key, result, exc in iter_fetch_concurrently(calls, deadline, hedge_after):
+        if exc is None:
+            results[key] = result
+        else:
+            errors[key] = exc
+    return results, errors
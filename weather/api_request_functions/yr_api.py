@@ -1,9 +1,19 @@
+import threading
+import time
+
 import requests
 
 from datetime import datetime
 
+from django.conf import settings
 from pytz import UTC
 
+from instrumentation.metrics import Counter, Histogram
+
+from ..serialization import NUM_HOURS
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .fetching import LatencyTracker, RateLimiter
+
 DEFAULT_USER_AGENT = "MyMap https://github.com/datalowe/mymap datalowe@posteo.de"
 
 YR_API_ENDPOINT = "https://api.met.no/weatherapi/locationforecast/2.0/compact"
@@ -12,20 +22,218 @@ YR_DATE_FORMAT_SPEC = '%Y-%m-%dT%H:%M:%SZ'
 
 HEADER_DATE_FORMAT_SPEC = "%a, %d %b %Y %H:%M:%S GMT"
 
+# month abbreviations used in HTTP header dates, mapped to month numbers
+HEADER_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+# created on first use (see get_yr_breaker, get_yr_rate_limiter), so that
+# importing this module doesn't require configured settings
+_yr_breaker = None
+_yr_rate_limiter = None
+_yr_lock = threading.Lock()
+
+# durations of successful requests made to the YR API from this process
+yr_latencies = LatencyTracker()
+
+YR_REQUESTS = Counter(
+    'mapback_yr_requests_total',
+    "Number of YR API requests, per response status code (or 'timeout', "
+    "'error' for other failed requests, 'malformed' for responses that "
+    "couldn't be parsed, 'rejected' for requests rejected "
+    "by the circuit breaker, 'rate_limited' for requests that couldn't be "
+    "made in time because of the rate limit).",
+    ['status']
+)
+YR_REQUEST_SECONDS = Histogram(
+    'mapback_yr_request_duration_seconds',
+    'Duration of YR API requests that were made.'
+)
+
+
+class ForecastUnavailableError(Exception):
+    """
+    Raised when forecast data can't be retrieved from the weather API,
+    eg because of a network error, a timeout, an error response, a
+    malformed response or the circuit breaker being open.
+    """
+
+
+class MalformedResponseError(Exception):
+    """
+    Raised when a YR API response lacks expected data or has data in an
+    unexpected format.
+    """
+
 def strptime_with_utc(time_str, format_spec):
     """
     Takes in a string that describes a timepoint and which is to be
     parsed, and a format specification string which says how the
     timepoint string is formatted. Returns the parsed time
     as a datetime object, with UTC set as the timezone.
+
+    For the fixed formats YR_DATE_FORMAT_SPEC and HEADER_DATE_FORMAT_SPEC,
+    the faster dedicated parsers below are used.
     """
+    if format_spec == YR_DATE_FORMAT_SPEC:
+        return parse_yr_datetime(time_str)
+    if format_spec == HEADER_DATE_FORMAT_SPEC:
+        return parse_header_datetime(time_str)
+    # the parsed times are UTC times, so the timezone is attached
+    # as is (astimezone would treat the naive datetime as being in
+    # the server's local timezone)
     naive_dt = datetime.strptime(time_str, format_spec)
-    aware_dt = naive_dt.astimezone(UTC)
-    return aware_dt
+    return naive_dt.replace(tzinfo=UTC)
 
-def get_forecast(lat, lon, if_modified_since = None, user_agent=None):
+def parse_yr_datetime(time_str):
+    """
+    Parses a timestamp in YR_DATE_FORMAT_SPEC format, eg
+    '2021-05-21T11:33:08Z', into a datetime object with UTC set as
+    the timezone. Raises ValueError for malformed strings.
     """
-    Queries the YR weather api and returns subset of data.
+    if len(time_str) != 20 or time_str[19] != 'Z' or time_str[10] != 'T':
+        raise ValueError(f'Invalid YR timestamp: {time_str!r}')
+    return datetime(
+        int(time_str[0:4]), int(time_str[5:7]), int(time_str[8:10]),
+        int(time_str[11:13]), int(time_str[14:16]), int(time_str[17:19]),
+        tzinfo=UTC
+    )
+
+def parse_header_datetime(time_str):
+    """
+    Parses an HTTP header date in HEADER_DATE_FORMAT_SPEC format, eg
+    'Fri, 21 May 2021 12:05:01 GMT', into a datetime object with UTC set
+    as the timezone. Raises ValueError for malformed strings.
+    """
+    if len(time_str) != 29 or not time_str.endswith(' GMT'):
+        raise ValueError(f'Invalid HTTP date: {time_str!r}')
+    try:
+        month = HEADER_MONTHS[time_str[8:11]]
+    except KeyError:
+        raise ValueError(f'Invalid HTTP date: {time_str!r}')
+    return datetime(
+        int(time_str[12:16]), month, int(time_str[5:7]),
+        int(time_str[17:19]), int(time_str[20:22]), int(time_str[23:25]),
+        tzinfo=UTC
+    )
+
+def get_yr_breaker():
+    """
+    Returns the circuit breaker shared by all requests made to the YR API
+    from this process, so that while the API is down or very slow,
+    requests fail fast instead of tying up server workers.
+    """
+    global _yr_breaker
+    with _yr_lock:
+        if _yr_breaker is None:
+            _yr_breaker = CircuitBreaker(
+                slow_call_duration=settings.YR_SLOW_REQUEST_DURATION,
+                reset_timeout=settings.YR_BREAKER_RESET_TIMEOUT,
+            )
+    return _yr_breaker
+
+def get_yr_rate_limiter():
+    """
+    Returns the rate limiter keeping requests made to the YR API from this
+    process within the API's terms of service.
+    """
+    global _yr_rate_limiter
+    with _yr_lock:
+        if _yr_rate_limiter is None:
+            _yr_rate_limiter = RateLimiter(settings.YR_MAX_REQUESTS_PER_SECOND)
+    return _yr_rate_limiter
+
+def hedge_delay():
+    """
+    Returns the number of seconds after which a duplicate YR API request
+    should be made if the first one hasn't finished (the 95th percentile
+    of recent request durations), or None if requests aren't to be
+    duplicated (hedged) or there isn't enough latency data yet.
+    """
+    if not settings.YR_HEDGE_REQUESTS:
+        return None
+    return yr_latencies.percentile(95)
+
+def request_yr_api(params, headers, timeout):
+    """
+    Makes a GET request to the YR API endpoint and returns the response.
+    :raises requests.RequestException: If the request fails or times out,
+    or if the response has an error status code.
+    """
+    resp = requests.get(
+        YR_API_ENDPOINT,
+        params=params,
+        headers=headers,
+        timeout=timeout
+    )
+    resp.raise_for_status()
+    return resp
+
+def parse_forecast_response(resp, if_modified_since=None):
+    """
+    Extracts the data returned by get_forecast from a YR API response.
+    :raises KeyError, IndexError, TypeError, ValueError: If the response
+    is malformed.
+    """
+    return_data = {}
+    if resp.status_code == 304:
+        # the forecast hasn't been updated since 'if_modified_since', so
+        # only timing information is returned
+        return_data['not_modified'] = True
+        return_data['last_forecast_update_datetime'] = (
+            parse_header_datetime(resp.headers['Last-Modified'])
+            if 'Last-Modified' in resp.headers else if_modified_since
+        )
+        return_data['new_req_allowed_datetime'] = parse_header_datetime(
+            resp.headers['Expires']
+        )
+        return return_data
+    resp_json = resp.json()
+    resp_props = resp_json['properties']
+    resp_ts = resp_props['timeseries']
+
+    return_data['last_forecast_update_datetime'] = parse_yr_datetime(
+        resp_props['meta']['updated_at']
+    )
+
+    return_data['forecast_start_datetime'] = parse_yr_datetime(
+        resp_ts[0]['time']
+    )
+
+    return_data['new_req_allowed_datetime'] = parse_header_datetime(
+        resp.headers['Expires']
+    )
+
+    return_data['latitude'] = resp_json['geometry']['coordinates'][1]
+    return_data['longitude'] = resp_json['geometry']['coordinates'][0]
+
+    for i in range(NUM_HOURS):
+        ts_data = resp_ts[i]['data']
+        return_data[f'symbol_name_{i}h'] = ts_data['next_1_hours']['summary']['symbol_code']
+        return_data[f't_{i}h'] = ts_data['instant']['details']['air_temperature']
+
+    return return_data
+
+def request_forecast(params, headers, timeout, if_modified_since=None):
+    """
+    Makes a GET request to the YR API endpoint and parses the response
+    (see parse_forecast_response).
+    :raises requests.RequestException: See request_yr_api.
+    :raises MalformedResponseError: If the response can't be parsed.
+    :return: tuple - The response's status code and the parsed data.
+    """
+    resp = request_yr_api(params, headers, timeout)
+    try:
+        return resp.status_code, parse_forecast_response(resp, if_modified_since)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise MalformedResponseError(repr(e)) from e
+
+def get_forecast(lat, lon, if_modified_since = None, user_agent=None, timeout=None):
+    """
+    Queries the YR weather api and returns subset of data. Requests
+    are made through the circuit breaker (see get_yr_breaker), and
+    limited by the rate limiter (see get_yr_rate_limiter).
     :param lat: float - Latitude, as a four-decimal value.
     :param lon: float - Longitude, as a four-decimal value.
     :param if_modified_since: datetime - Describes (in UTC)
@@ -33,6 +241,12 @@ def get_forecast(lat, lon, if_modified_since = None, user_agent=None):
     data to be returned by API.
     :param user_agent: (optional) str - String to include as
     value for 'User-Agent' header.
+    :param timeout: (optional) float - Number of seconds to wait for
+    a response, capped at (and defaulting to) settings.YR_REQUEST_TIMEOUT.
+    :raises ForecastUnavailableError: If the request fails, times out,
+    gets an error response or a malformed response, is rejected by the
+    circuit breaker, or can't be made within the timeout because of the
+    rate limit.
     :return: dict - Has the following keys:
     forecast_start_datetime
     last_forecast_update_datetime
@@ -46,6 +260,9 @@ def get_forecast(lat, lon, if_modified_since = None, user_agent=None):
     symbol_name_6h
     t_6h
     (see ForecastPoint model for info on these)
+    If 'if_modified_since' is passed and the forecast hasn't been updated
+    since, the dict instead only has the keys 'not_modified' (set to True),
+    'last_forecast_update_datetime' and 'new_req_allowed_datetime'.
     """
 
     if user_agent is None:
@@ -58,37 +275,48 @@ def get_forecast(lat, lon, if_modified_since = None, user_agent=None):
     if if_modified_since:
         modified_str = if_modified_since.strftime(HEADER_DATE_FORMAT_SPEC)
         headers["If-Modified-Since"] = modified_str
-    resp = requests.get(
-        YR_API_ENDPOINT,
-        params = {
-            "lat": lat,
-            "lon": lon,
-        },
-        headers = headers
-    )
-    return_data = {}
-    resp_json = resp.json()
-    resp_props = resp_json['properties']
-    resp_ts = resp_props['timeseries']
-
-    return_data['last_forecast_update_datetime'] = strptime_with_utc(
-        resp_props['meta']['updated_at'], YR_DATE_FORMAT_SPEC
-    )
-
-    return_data['forecast_start_datetime'] = strptime_with_utc(
-        resp_ts[0]['time'], YR_DATE_FORMAT_SPEC
-    )
-
-    return_data['new_req_allowed_datetime'] = strptime_with_utc(
-        resp.headers['Expires'], HEADER_DATE_FORMAT_SPEC
-    )
-
-    return_data['latitude'] = resp_json['geometry']['coordinates'][1]
-    return_data['longitude'] = resp_json['geometry']['coordinates'][0]
-
-    for i in range(7):
-        ts_data = resp_ts[i]['data']
-        return_data[f'symbol_name_{i}h'] = ts_data['next_1_hours']['summary']['symbol_code']
-        return_data[f't_{i}h'] = ts_data['instant']['details']['air_temperature']
-
+    if timeout is None:
+        timeout = settings.YR_REQUEST_TIMEOUT
+    else:
+        timeout = min(timeout, settings.YR_REQUEST_TIMEOUT)
+    if timeout <= 0:
+        raise ForecastUnavailableError('No time left for YR API request.')
+    if not get_yr_rate_limiter().acquire(timeout):
+        YR_REQUESTS.inc(status='rate_limited')
+        raise ForecastUnavailableError('YR API request rate limit reached.')
+    start = time.monotonic()
+    try:
+        # parsing is part of the call, so that malformed responses are
+        # counted as failures by the circuit breaker
+        status, return_data = get_yr_breaker().call(
+            request_forecast,
+            params = {
+                "lat": lat,
+                "lon": lon,
+            },
+            headers = headers,
+            timeout = timeout,
+            if_modified_since = if_modified_since
+        )
+    except CircuitOpenError as e:
+        YR_REQUESTS.inc(status='rejected')
+        raise ForecastUnavailableError('YR API requests are suspended.') from e
+    except requests.RequestException as e:
+        if e.response is not None:
+            status = e.response.status_code
+        elif isinstance(e, requests.Timeout):
+            status = 'timeout'
+        else:
+            status = 'error'
+        YR_REQUESTS.inc(status=status)
+        YR_REQUEST_SECONDS.observe(time.monotonic() - start)
+        raise ForecastUnavailableError(f'YR API request failed: {e}') from e
+    except MalformedResponseError as e:
+        YR_REQUESTS.inc(status='malformed')
+        YR_REQUEST_SECONDS.observe(time.monotonic() - start)
+        raise ForecastUnavailableError(f'YR API response is malformed: {e}') from e
+    duration = time.monotonic() - start
+    yr_latencies.record(duration)
+    YR_REQUESTS.inc(status=status)
+    YR_REQUEST_SECONDS.observe(duration)
     return return_data
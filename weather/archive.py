@@ -0,0 +1,134 @@
+"""
+Archiving of superseded forecasts (see weather.models.ForecastArchive), when
+settings.FORECAST_ARCHIVE_ENABLED is set.
+
+When a ForecastPoint entry gets new forecast data, its previous forecast is
+queued in the process' ArchiveWriter, which writes queued forecasts in
+batches from a background thread, so that requests don't wait for them.
+"""
+import atexit
+import logging
+import struct
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from .serialization import NUM_HOURS
+
+logger = logging.getLogger(__name__)
+
+# layout of archived forecast data: a weather symbol code for each hour,
+# followed by a temperature in tenths of a degree for each hour
+ARCHIVE_FORMAT = struct.Struct(f'<{NUM_HOURS}H{NUM_HOURS}h')
+
+
+def pack_forecast(point):
+    """
+    Packs the forecast data of a ForecastPoint instance into bytes.
+    """
+    codes = [getattr(point, f'symbol_{i}h_id') for i in range(NUM_HOURS)]
+    temps = [round(float(getattr(point, f't_{i}h')) * 10) for i in range(NUM_HOURS)]
+    return ARCHIVE_FORMAT.pack(*codes, *temps)
+
+
+def unpack_forecast(data):
+    """
+    :return: tuple - A (symbol codes, temperatures) tuple of lists, for
+    forecast data packed with pack_forecast.
+    """
+    values = ARCHIVE_FORMAT.unpack(bytes(data))
+    return list(values[:NUM_HOURS]), [t / 10 for t in values[NUM_HOURS:]]
+
+
+class ArchiveWriter:
+    """
+    Queues ForecastArchive instances, and writes them to the database in
+    batches, from a background thread. Writes are made every
+    settings.FORECAST_ARCHIVE_FLUSH_INTERVAL seconds, or as soon as
+    settings.FORECAST_ARCHIVE_BATCH_SIZE instances have been queued.
+    """
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            full = len(self._entries) >= settings.FORECAST_ARCHIVE_BATCH_SIZE
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='forecast-archive', daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Writes all queued instances. Returns the number of written instances.
+        """
+        from .models import ForecastArchive
+
+        with self._lock:
+            entries, self._entries = self._entries, []
+        if entries:
+            ForecastArchive.objects.bulk_create(entries, batch_size=settings.FORECAST_ARCHIVE_BATCH_SIZE)
+        return len(entries)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.FORECAST_ARCHIVE_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Writing archived forecasts failed.')
+            finally:
+                # the thread's connection is otherwise kept open indefinitely
+                connection.close()
+
+
+ARCHIVE_WRITER = ArchiveWriter()
+
+# queued forecasts are written when the process exits normally
+atexit.register(ARCHIVE_WRITER.flush)
+
+
+def archive_forecast(point):
+    """
+    Queues the current forecast of a ForecastPoint entry for archiving,
+    if archiving is enabled.
+    """
+    if not settings.FORECAST_ARCHIVE_ENABLED:
+        return
+    from .models import ForecastArchive
+
+    ARCHIVE_WRITER.add(ForecastArchive(
+        coord_key=point.coord_key,
+        forecast_start_datetime=point.forecast_start_datetime,
+        issued_datetime=point.last_forecast_update_datetime,
+        data=pack_forecast(point),
+    ))
+
+
+def prune_archive(older_than, chunk_size=5000):
+    """
+    Deletes archived forecasts which were archived before a point in time,
+    in chunks, so that no single statement holds locks for long.
+    :param older_than: datetime - Archiving time before which entries are deleted.
+    :param chunk_size: int - Maximum number of entries deleted per statement.
+    :return: int - The number of deleted entries.
+    """
+    from .models import ForecastArchive
+
+    num_deleted = 0
+    while True:
+        ids = list(
+            ForecastArchive.objects
+            .filter(archived_datetime__lt=older_than)
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return num_deleted
+        num_deleted += ForecastArchive.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class TenthsField(models.SmallIntegerField):
+    """
+    Stores a value with one decimal, eg a temperature, as a small integer
+    number of tenths (eg -5.8 as -58), and exposes it as a float.
+    """
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return value / 10
+
+    def to_python(self, value):
+        if value is None or isinstance(value, float):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return super().to_python(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        return round(float(value) * 10)
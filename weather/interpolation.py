@@ -0,0 +1,74 @@
+import numpy as np
+
+from .serialization import NUM_HOURS
+from .spatial import haversine_matrix
+
+# distances below this (in meters) are treated as this distance when
+# weighting, to avoid dividing by zero for neighbours at the target itself
+MIN_DISTANCE = 1.0
+
+
+def interpolate_forecasts(coord_ls, neighbours, radius, min_neighbours=3, power=2):
+    """
+    Estimates forecasts for coordinates based on forecasts of neighbouring
+    points, for a whole batch of coordinates at once. Temperatures are
+    interpolated using inverse distance weighting of neighbours within
+    'radius' meters, while weather symbols, as well as forecast times,
+    are taken from the nearest neighbour. Only neighbours whose forecasts
+    start at the same time as the nearest neighbour's are used.
+    :param coord_ls: A list of 2-element float tuples, where the first
+    value represents a latitude, and the second a longitude.
+    :param neighbours: A list of ForecastPoint instances.
+    :param radius: float - Maximum neighbour distance, in meters.
+    :param min_neighbours: int - Minimum number of neighbours within the
+    radius for a forecast to be interpolated.
+    :param power: float - Inverse distance weighting power parameter.
+    :return: dict - Maps coordinates to dicts of interpolated forecast data,
+    in the same format as .api_request_functions.yr_api.get_forecast
+    returns, for coordinates with enough neighbours.
+    """
+    if not coord_ls or not neighbours:
+        return {}
+
+    targets = np.asarray(coord_ls, dtype=float)
+    dists = haversine_matrix(
+        targets[:, 0], targets[:, 1],
+        [float(p.latitude) for p in neighbours],
+        [float(p.longitude) for p in neighbours],
+    )
+    within = dists <= radius
+
+    # neighbours are only comparable if their forecasts start at the same time
+    start_times = sorted({p.forecast_start_datetime for p in neighbours})
+    start_codes = np.array([start_times.index(p.forecast_start_datetime) for p in neighbours])
+    nearest = np.argmin(np.where(within, dists, np.inf), axis=1)
+    within &= start_codes[None, :] == start_codes[nearest][:, None]
+
+    enough = within.sum(axis=1) >= min_neighbours
+    if not enough.any():
+        return {}
+
+    temps = np.array(
+        [[float(getattr(p, f't_{i}h')) for i in range(NUM_HOURS)] for p in neighbours]
+    )
+    weights = np.where(within, 1 / np.maximum(dists, MIN_DISTANCE) ** power, 0)
+    weight_sums = weights.sum(axis=1)
+    weight_sums[~enough] = 1
+    interpolated = np.round(weights @ temps / weight_sums[:, None], 1)
+
+    results = {}
+    for row in np.flatnonzero(enough):
+        nearest_point = neighbours[nearest[row]]
+        coord = tuple(coord_ls[row])
+        data = {
+            'forecast_start_datetime': nearest_point.forecast_start_datetime,
+            'last_forecast_update_datetime': nearest_point.last_forecast_update_datetime,
+            'new_req_allowed_datetime': nearest_point.new_req_allowed_datetime,
+            'latitude': coord[0],
+            'longitude': coord[1],
+        }
+        for i in range(NUM_HOURS):
+            data[f'symbol_name_{i}h'] = getattr(nearest_point, f'symbol_name_{i}h')
+            data[f't_{i}h'] = float(interpolated[row, i])
+        results[coord] = data
+    return results
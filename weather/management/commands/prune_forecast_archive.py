@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from weather.archive import prune_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes archived forecasts which were superseded more than a given "
+        "number of days ago. Meant to be run periodically, eg daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=float,
+            default=30,
+            help='Number of days for which archived forecasts are kept.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Maximum number of archived forecasts deleted per statement.'
+        )
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options['days'])
+        num_deleted = prune_archive(older_than, chunk_size=options['chunk_size'])
+        self.stdout.write(f'Deleted {num_deleted} archived forecasts.')
@@ -0,0 +1,36 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from weather.warmup import warm_forecasts
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches missing or outdated forecasts for all users' saved locations, "
+        "so that they are ready when users open their maps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=None,
+            help='Maximum number of seconds to spend waiting for the weather API.'
+        )
+
+    def handle(self, *args, **options):
+        # warming up is best-effort, so errors mustn't fail eg the release phase
+        try:
+            stats = warm_forecasts(budget=options['budget'])
+        except Exception:
+            logger.exception('Warming up forecasts failed.')
+            self.stderr.write('Warming up forecasts failed.')
+            return
+        self.stdout.write(
+            f"Warmed forecasts for {stats['cells']} location cells "
+            f"({stats['stale']} left stale, {stats['pending']} pending, "
+            f"{stats['failed']} failed)."
+        )
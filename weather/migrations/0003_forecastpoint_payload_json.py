@@ -0,0 +1,18 @@
+# Generated by Django 3.2.2 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_insertdata_20210521_1110'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='payload_json',
+            field=models.TextField(default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.2 on 2026-10-19 04:31
+import math
+
+from django.db import migrations, models
+
+
+def set_grid_keys(app_registry, schema_editor):
+    # same computation as weather.spatial.grid_key, with 0.01 degree cells
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    for p in ForecastPoint.objects.all():
+        lat_i = min(int(math.floor((float(p.latitude) + 90) / 0.01)), 17999)
+        lon_i = int(math.floor((float(p.longitude) + 180) / 0.01)) % 36000
+        p.grid_key = lat_i * 36000 + lon_i
+        p.save(update_fields=['grid_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0003_forecastpoint_payload_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='grid_key',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_grid_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='grid_key',
+            field=models.BigIntegerField(db_index=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.2 on 2026-10-19 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0004_forecastpoint_grid_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='forecast_digest',
+            field=models.CharField(default='', editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.2 on 2026-10-19 09:12
+from django.db import migrations, models
+
+
+def set_coord_keys(app_registry, schema_editor):
+    # same computation as weather.spatial.coord_key
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    for p in ForecastPoint.objects.all():
+        lat_i = round(float(p.latitude) * 10000) + 900000
+        lon_i = round(float(p.longitude) * 10000) + 1800000
+        p.coord_key = (lat_i << 32) | lon_i
+        p.save(update_fields=['coord_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0005_forecastpoint_forecast_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='coord_key',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_coord_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='coord_key',
+            field=models.BigIntegerField(db_index=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,208 @@
+# Generated by Django 3.2.2 on 2026-10-19 10:05
+import django.db.models.deletion
+
+from django.db import migrations, models
+
+# symbol codes used by the YR weather API, see
+# https://api.met.no/weatherapi/weathericon/2.0/documentation
+SYMBOL_BASES = (
+    'clearsky', 'cloudy', 'fair', 'fog', 'heavyrain', 'heavyrainandthunder',
+    'heavyrainshowers', 'heavyrainshowersandthunder', 'heavysleet',
+    'heavysleetandthunder', 'heavysleetshowers', 'heavysleetshowersandthunder',
+    'heavysnow', 'heavysnowandthunder', 'heavysnowshowers',
+    'heavysnowshowersandthunder', 'lightrain', 'lightrainandthunder',
+    'lightrainshowers', 'lightrainshowersandthunder', 'lightsleet',
+    'lightsleetandthunder', 'lightsleetshowers', 'lightsnow',
+    'lightsnowandthunder', 'lightsnowshowers', 'lightssleetshowersandthunder',
+    'lightssnowshowersandthunder', 'partlycloudy', 'rain', 'rainandthunder',
+    'rainshowers', 'rainshowersandthunder', 'sleet', 'sleetandthunder',
+    'sleetshowers', 'sleetshowersandthunder', 'snow', 'snowandthunder',
+    'snowshowers', 'snowshowersandthunder',
+)
+# symbols which come in variants for the time of day
+VARIANT_BASES = ('clearsky', 'fair', 'partlycloudy')
+VARIANTS = ('day', 'night', 'polartwilight')
+
+
+def symbol_names():
+    for base in SYMBOL_BASES:
+        if base in VARIANT_BASES or 'showers' in base:
+            for variant in VARIANTS:
+                yield f'{base}_{variant}'
+        else:
+            yield base
+
+
+def set_symbol_codes(app_registry, schema_editor):
+    WeatherSymbol = app_registry.get_model('weather', 'WeatherSymbol')
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    WeatherSymbol.objects.bulk_create([WeatherSymbol(name=name) for name in symbol_names()])
+    codes = dict(WeatherSymbol.objects.values_list('name', 'id'))
+    for p in ForecastPoint.objects.all():
+        for i in range(7):
+            name = getattr(p, f'symbol_name_{i}h')
+            if name not in codes:
+                codes[name] = WeatherSymbol.objects.create(name=name).id
+            setattr(p, f'symbol_{i}h_id', codes[name])
+        p.save(update_fields=[f'symbol_{i}h' for i in range(7)])
+
+
+def set_symbol_names(app_registry, schema_editor):
+    WeatherSymbol = app_registry.get_model('weather', 'WeatherSymbol')
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    names = dict(WeatherSymbol.objects.values_list('id', 'name'))
+    for p in ForecastPoint.objects.all():
+        for i in range(7):
+            setattr(p, f'symbol_name_{i}h', names[getattr(p, f'symbol_{i}h_id')])
+        p.save(update_fields=[f'symbol_name_{i}h' for i in range(7)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0006_forecastpoint_coord_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherSymbol',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_0h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_1h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_2h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_3h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_4h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_5h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='symbol_6h',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_0h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_1h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_2h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_3h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_4h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_5h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_name_6h',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(set_symbol_codes, set_symbol_names),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_0h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_1h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_2h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_3h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_4h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_5h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='symbol_name_6h',
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_0h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_1h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_2h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_3h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_4h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_5h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='symbol_6h',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='weather.weathersymbol'),
+        ),
+    ]
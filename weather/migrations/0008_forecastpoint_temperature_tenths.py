@@ -0,0 +1,202 @@
+# Generated by Django 3.2.2 on 2026-10-19 11:20
+from django.db import migrations, models
+
+import weather.fields
+
+
+def copy_to_tenths(app_registry, schema_editor):
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    for p in ForecastPoint.objects.all():
+        for i in range(7):
+            setattr(p, f't_{i}h_tenths', float(getattr(p, f't_{i}h')))
+        # payloads are re-rendered (with temperatures as numbers) on first read
+        p.payload_json = ''
+        p.save()
+
+
+def copy_from_tenths(app_registry, schema_editor):
+    ForecastPoint = app_registry.get_model('weather', 'ForecastPoint')
+    for p in ForecastPoint.objects.all():
+        for i in range(7):
+            setattr(p, f't_{i}h', getattr(p, f't_{i}h_tenths'))
+        p.payload_json = ''
+        p.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0007_weathersymbol'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_0h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_1h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_2h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_3h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_4h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_5h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastpoint',
+            name='t_6h_tenths',
+            field=weather.fields.TenthsField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_0h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_1h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_2h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_3h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_4h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_5h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_6h',
+            field=models.DecimalField(decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.RunPython(copy_to_tenths, copy_from_tenths),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_0h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_1h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_2h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_3h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_4h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_5h',
+        ),
+        migrations.RemoveField(
+            model_name='forecastpoint',
+            name='t_6h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_0h_tenths',
+            new_name='t_0h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_1h_tenths',
+            new_name='t_1h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_2h_tenths',
+            new_name='t_2h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_3h_tenths',
+            new_name='t_3h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_4h_tenths',
+            new_name='t_4h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_5h_tenths',
+            new_name='t_5h',
+        ),
+        migrations.RenameField(
+            model_name='forecastpoint',
+            old_name='t_6h_tenths',
+            new_name='t_6h',
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_0h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_1h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_2h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_3h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_4h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_5h',
+            field=weather.fields.TenthsField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastpoint',
+            name='t_6h',
+            field=weather.fields.TenthsField(),
+        ),
+    ]
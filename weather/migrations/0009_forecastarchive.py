@@ -0,0 +1,28 @@
+# Generated by Django 3.2.2 on 2026-10-19 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0008_forecastpoint_temperature_tenths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coord_key', models.BigIntegerField()),
+                ('forecast_start_datetime', models.DateTimeField()),
+                ('issued_datetime', models.DateTimeField()),
+                ('archived_datetime', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='forecastarchive',
+            index=models.Index(fields=['coord_key', 'forecast_start_datetime'], name='weather_for_coord_k_fe103e_idx'),
+        ),
+    ]
@@ -1,8 +1,125 @@
-from django.db import models
+import threading
+
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils import timezone
 
-from .api_request_functions.yr_api import get_forecast
+from instrumentation.metrics import Counter, Histogram
+
+from .api_request_functions.yr_api import ForecastUnavailableError
+from .archive import archive_forecast, unpack_forecast
+from .serialization import (
+    render_payload,
+    render_pending_payload,
+    add_payload_flags,
+    forecast_digest,
+    FORECAST_DATA_FIELDS,
+)
+from .fields import TenthsField
+from .interpolation import interpolate_forecasts
+from .providers import ForecastRequest, resolve_provider
+from .spatial import coord_key, grid_key, grid_keys_within, haversine_matrix
+from .updates import publish_update
+
+FORECAST_BATCH_SIZE = Histogram(
+    'mapback_forecast_batch_size',
+    'Number of coordinates passed to ForecastPoint.update_and_filter.',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+FORECAST_LOOKUPS = Counter(
+    'mapback_forecast_lookups_total',
+    "Number of coordinates looked up by ForecastPoint.update_and_filter, per "
+    "result ('hit' for up to date entries, 'expired' for entries due to be "
+    "synced, 'nearby' for nearby entries used, 'interpolated' and 'miss').",
+    ['result']
+)
+FORECAST_ROWS = Counter(
+    'mapback_forecast_rows_total',
+    "Number of ForecastPoint entries written with weather API data, per "
+    "action ('created', 'refreshed', or 'unchanged' when only timing "
+    "columns were updated).",
+    ['action']
+)
+
+
+# columns which are updated even when synchronizing with the weather
+# API doesn't yield any new forecast data
+TIMING_FIELDS = ['last_forecast_update_datetime', 'new_req_allowed_datetime']
+
+
+class WeatherSymbol(models.Model):
+    """
+    Lookup table of weather symbol names, eg 'partlycloudy_day', which
+    ForecastPoint entries refer to by small integer codes (IDs).
+    """
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+
+    # in-process caches, mapping codes to names and names to codes. symbols
+    # are never changed or removed, so entries needn't be invalidated
+    _names = {}
+    _codes = {}
+    _cache_lock = threading.Lock()
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def load_cache(cls):
+        with cls._cache_lock:
+            for code, name in cls.objects.values_list('id', 'name'):
+                cls._names[code] = name
+                cls._codes[name] = code
+
+    @classmethod
+    def name_for_code(cls, code):
+        """
+        Returns the symbol name for a code, or None if code is None.
+        """
+        if code is None:
+            return None
+        if code not in cls._names:
+            cls.load_cache()
+        return cls._names[code]
+
+    @classmethod
+    def code_for_name(cls, name):
+        """
+        Returns the code for a symbol name, adding the name to the
+        lookup table if it's new. Returns None if name is None.
+        """
+        if name is None:
+            return None
+        if name not in cls._codes:
+            cls.load_cache()
+        if name in cls._codes:
+            return cls._codes[name]
+        symbol, _ = cls.objects.get_or_create(name=name)
+        # only cached once committed, in case the transaction is rolled back
+        transaction.on_commit(cls.load_cache)
+        return symbol.id
+
+
+def symbol_name_property(hour):
+    """
+    Returns a property exposing the name of a ForecastPoint's weather
+    symbol for an hour, and setting its code when a name is assigned.
+    """
+    code_attr = f'symbol_{hour}h_id'
+
+    def get_name(self):
+        return WeatherSymbol.name_for_code(getattr(self, code_attr))
+
+    def set_name(self, name):
+        setattr(self, code_attr, WeatherSymbol.code_for_name(name))
+
+    return property(get_name, set_name)
+
 
 class ForecastPoint(models.Model):
     """
@@ -33,126 +150,437 @@ class ForecastPoint(models.Model):
     # more fine-grained data than 4)
     latitude = models.DecimalField(max_digits=7, decimal_places=4)
     longitude = models.DecimalField(max_digits=7, decimal_places=4)
+    # key of the ~1km grid cell containing the point (see .spatial.grid_key),
+    # set automatically on save. used for finding nearby points
+    grid_key = models.BigIntegerField(db_index=True, editable=False)
+    # the point's coordinates packed into a single integer (see
+    # .spatial.coord_key), set automatically on save. used for looking up
+    # points by their exact coordinates
+    coord_key = models.BigIntegerField(db_index=True, editable=False)
 
-    # name of weather icon that represents the weather state at 0h
-    # from 
-    # (eg in YR weather API, 'symbol_code' values like 'partlycloudy_day'
-    # are used)
-    symbol_name_0h = models.CharField(max_length=50)
-    # forecasted temperature for same timepoint
-    t_0h = models.DecimalField(max_digits=4, decimal_places=1)
+    # weather icon that represents the weather state at 0h, stored as
+    # the code of a WeatherSymbol (eg in YR weather API, 'symbol_code'
+    # values like 'partlycloudy_day' are used). the name is exposed as
+    # symbol_name_0h, which can also be assigned to
+    symbol_0h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_0h = symbol_name_property(0)
+    # forecasted temperature for same timepoint, stored
+    # as tenths of a degree (see .fields.TenthsField)
+    t_0h = TenthsField()
 
     # there is a lot of redundancy below - an alternative would
     # be to create a separate model for symbol names and temperatures,
     # linked to this one with a foreign key. this would require adding
     # functionality for updating entries in this related model
-    symbol_name_1h = models.CharField(max_length=50)
-    t_1h = models.DecimalField(max_digits=4, decimal_places=1)
+    symbol_1h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_1h = symbol_name_property(1)
+    t_1h = TenthsField()
+
+    symbol_2h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_2h = symbol_name_property(2)
+    t_2h = TenthsField()
+
+    symbol_3h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_3h = symbol_name_property(3)
+    t_3h = TenthsField()
+
+    symbol_4h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_4h = symbol_name_property(4)
+    t_4h = TenthsField()
 
-    symbol_name_2h = models.CharField(max_length=50)
-    t_2h = models.DecimalField(max_digits=4, decimal_places=1)
+    symbol_5h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_5h = symbol_name_property(5)
+    t_5h = TenthsField()
 
-    symbol_name_3h = models.CharField(max_length=50)
-    t_3h = models.DecimalField(max_digits=4, decimal_places=1)
+    symbol_6h = models.ForeignKey(
+        WeatherSymbol, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    symbol_name_6h = symbol_name_property(6)
+    t_6h = TenthsField()
 
-    symbol_name_4h = models.CharField(max_length=50)
-    t_4h = models.DecimalField(max_digits=4, decimal_places=1)
+    # pre-rendered JSON object representing the point (see
+    # .serialization.render_payload), rebuilt whenever new forecast
+    # data are written so that reads needn't run a serializer. empty
+    # for entries created before the field was introduced, which
+    # get it filled in on first read (see get_payload_json)
+    payload_json = models.TextField(default='', editable=False)
 
-    symbol_name_5h = models.CharField(max_length=50)
-    t_5h = models.DecimalField(max_digits=4, decimal_places=1)
+    # digest of the forecast data (see .serialization.forecast_digest), used
+    # for skipping writes when synchronizing yields no new data. empty for
+    # entries created before the field was introduced
+    forecast_digest = models.CharField(max_length=40, default='', editable=False)
 
-    symbol_name_6h = models.CharField(max_length=50)
-    t_6h = models.DecimalField(max_digits=4, decimal_places=1)
+    # set (not stored) on instances whose forecast is due to be synced
+    # with the weather API, but couldn't be, eg because the API is down
+    is_stale = False
+    # set (not stored) on unsaved instances standing in for points whose
+    # forecast couldn't be fetched in time, see update_and_filter
+    is_pending = False
+    # set (not stored) on unsaved instances whose forecast was interpolated
+    # from neighbouring points, see update_and_filter
+    is_interpolated = False
 
     def __str__(self):
         return f'Forecast point at ({self.latitude}, {self.longitude})'
 
+    def save(self, *args, **kwargs):
+        """
+        Overrides default save method to keep the grid and coordinate
+        keys in sync with the point's coordinates.
+        """
+        self.grid_key = grid_key(self.latitude, self.longitude)
+        self.coord_key = coord_key(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def fresh_q():
+        """
+        Returns a query object matching entries which aren't due to be synced
+        with the weather API, ie the inverse of time_to_sync.
+        """
+        current_utc = timezone.now()
+        return (
+            Q(forecast_start_datetime__gte=current_utc - timedelta(seconds=1800)) |
+            Q(new_req_allowed_datetime__gte=current_utc)
+        )
+
     @classmethod
-    def update_and_filter(cls, coord_ls):
+    def fresh_points_near(cls, coord_ls, radius):
+        """
+        Returns a list of entries that aren't due to be synced with the weather
+        API, and that lie in grid cells within 'radius' meters of any of the
+        passed coordinates. Entries are looked up with a single query, through
+        their indexed grid keys.
+        :param coord_ls: A list of 2-element float tuples, where the first
+        value represents a latitude, and the second a longitude.
+        :param radius: float - Maximum distance in meters.
+        """
+        if not coord_ls or radius <= 0:
+            return []
+        keys = set().union(*(grid_keys_within(lat, lon, radius) for lat, lon in coord_ls))
+        return list(cls.objects.filter(cls.fresh_q(), grid_key__in=keys))
+
+    @classmethod
+    def find_nearest_fresh(cls, coord_ls, radius):
+        """
+        For each of the passed coordinates, finds the nearest entry within
+        'radius' meters that isn't due to be synced with the weather API.
+        :param coord_ls: A list of 2-element float tuples, where the first
+        value represents a latitude, and the second a longitude.
+        :param radius: float - Maximum distance in meters.
+        :return: dict - Maps coordinates to ForecastPoint instances, for
+        coordinates with any entry within the radius.
+        """
+        candidates = cls.fresh_points_near(coord_ls, radius)
+        if not candidates:
+            return {}
+        dists = haversine_matrix(
+            [lat for lat, _ in coord_ls],
+            [lon for _, lon in coord_ls],
+            [float(p.latitude) for p in candidates],
+            [float(p.longitude) for p in candidates],
+        )
+        nearest = np.argmin(dists, axis=1)
+        return {
+            coord: candidates[nearest[row]]
+            for row, coord in enumerate(coord_ls)
+            if dists[row, nearest[row]] <= radius
+        }
+
+    @classmethod
+    def update_and_filter(cls, coord_ls, **kwargs):
+        """
+        Like iter_update_and_map, but returns a list of the distinct ForecastPoint
+        instances for the passed coordinates, leaving out coordinates for
+        which the weather API couldn't be reached.
+        :param coord_ls: A list of 2-element float tuples, where the first
+        value represents a latitude, and the second a longitude.
+        :param kwargs: See iter_update_and_map.
+        :return: A list of ForecastPoint instances
+        """
+        match_points = []
+        seen = set()
+        for p in cls.update_and_map(coord_ls, **kwargs).values():
+            if p is None or id(p) in seen:
+                continue
+            seen.add(id(p))
+            match_points.append(p)
+        return match_points
+
+    @classmethod
+    def update_and_map(cls, coord_ls, **kwargs):
+        """
+        Like iter_update_and_map, but waits for all weather API requests to
+        finish (or the deadline to pass).
+        :param coord_ls: A list of 2-element float tuples, where the first
+        value represents a latitude, and the second a longitude.
+        :param kwargs: See iter_update_and_map.
+        :return: dict - Maps each of the passed coordinates (rounded to 4
+        decimals) to a ForecastPoint instance, or None, in the passed order.
+        """
+        coord_points = dict(cls.iter_update_and_map(coord_ls, **kwargs))
+        return {
+            coord: coord_points[coord]
+            for coord in ((round(lat, 4), round(lon, 4)) for lat, lon in coord_ls)
+        }
+
+    @classmethod
+    def iter_update_and_map(
+        cls, coord_ls, provider=None, api_getter=None, deadline=None, hedge_after=None,
+        interpolate=False
+    ):
         """
         Accepts a list of geographical coordinates. For each one, checks if
         there is a corresponding ForecastPoint entry already. Where there
         is none, a request to the weather API is made and a new entry is
         created. For entries where the forecast data are >1h old, and the time
         for when a new API request is allowed has passed, entries are updated
-        by requesting new data from the weather API.
+        by requesting new data from the weather API. All weather API requests
+        are passed to the weather provider as a batch, and results are
+        yielded as they become available.
+
+        If the weather API can't be reached (eg because it is down and the
+        circuit breaker is open), entries due to be updated are returned
+        as they are, marked with 'is_stale', and coordinates without
+        entries give None. Coordinates without entries, but within
+        settings.FORECAST_REUSE_RADIUS meters of another entry that is
+        up to date, get that entry instead of a new one. If 'interpolate'
+        is set, coordinates that have enough up to date entries within
+        settings.FORECAST_INTERPOLATION_RADIUS meters get forecasts
+        interpolated from these, in the form of unsaved instances marked
+        with 'is_interpolated', instead of new entries. If a deadline is
+        passed and requests haven't finished by then, entries due to be
+        updated are likewise marked as stale, and coordinates without
+        entries are represented by unsaved instances marked with 'is_pending'.
         :param coord_ls: A list of 2-element float tuples, where the first
         value represents a latitude, and the second a longitude.
-        :return: A list of ForecastPoint instances
+        :param provider: (optional) .providers.ForecastProvider - The weather
+        provider to use, instead of the default one.
+        :param api_getter: (optional) function - A function fetching single
+        points, to use instead of the default provider, see
+        .providers.ConcurrentProvider.
+        :param deadline: (optional) float - time.monotonic value by which
+        weather API requests must have finished.
+        :param hedge_after: (optional) float - Number of seconds after which
+        unfinished weather API requests may be duplicated, see
+        .api_request_functions.fetching.iter_fetch_concurrently.
+        :param interpolate: bool - Whether to interpolate forecasts from
+        neighbouring entries where possible, see .interpolation.interpolate_forecasts.
+        :return: generator - Yields a (coordinates, ForecastPoint instance or
+        None) tuple for each of the passed coordinates (rounded to 4 decimals).
+        Coordinates whose entries don't need to be updated come first, the
+        rest follow as weather API requests finish.
         """
         # check if an empty list was passed
         if not coord_ls:
-            return []
+            return
+
+        # 1) round all passed coordinates to 4 decimals, dropping duplicates
+        coord_ls = list(dict.fromkeys((round(lat, 4), round(lon, 4)) for lat, lon in coord_ls))
+        FORECAST_BATCH_SIZE.observe(len(coord_ls))
+
+        # 2) filter by the keys of all coordinates and force evaluation of the
+        # resulting queryset, mapping returned database entries to the coordinates
+        key_coords = {coord_key(*coord): coord for coord in coord_ls}
+        coord_points = {
+            key_coords[p.coord_key]: p
+            for p in cls.objects.filter(coord_key__in=key_coords)
+        }
+        num_exact = len(coord_points)
+
+        # 3) collect weather API requests for database entries which are out
+        # of sync with weather API
+        sync_coords = {coord for coord, p in coord_points.items() if p.time_to_sync()}
+        requests = {
+            ('sync', coord): ForecastRequest(
+                lat=coord_points[coord].latitude,
+                lon=coord_points[coord].longitude,
+                if_modified_since=coord_points[coord].last_forecast_update_datetime
+            )
+            for coord in sync_coords
+        }
+
+        # 4) find up to date entries nearby, or to interpolate from, for passed
+        # coordinates (coord_ls) which don't occur among the entries from step 2
+        new_coords = [coord for coord in coord_ls if coord not in coord_points]
+        nearby_points = cls.find_nearest_fresh(new_coords, settings.FORECAST_REUSE_RADIUS)
+        coord_points.update(nearby_points)
+        new_coords = [coord for coord in new_coords if coord not in nearby_points]
+        if interpolate and new_coords:
+            interpolated = interpolate_forecasts(
+                new_coords,
+                cls.fresh_points_near(new_coords, settings.FORECAST_INTERPOLATION_RADIUS),
+                settings.FORECAST_INTERPOLATION_RADIUS,
+                min_neighbours=settings.FORECAST_INTERPOLATION_MIN_NEIGHBOURS
+            )
+            for coord, data in interpolated.items():
+                interpolated_point = cls(**data)
+                interpolated_point.is_interpolated = True
+                coord_points[coord] = interpolated_point
+            new_coords = [coord for coord in new_coords if coord not in interpolated]
+            FORECAST_LOOKUPS.inc(len(interpolated), result='interpolated')
+        FORECAST_LOOKUPS.inc(num_exact - len(sync_coords), result='hit')
+        FORECAST_LOOKUPS.inc(len(sync_coords), result='expired')
+        FORECAST_LOOKUPS.inc(len(nearby_points), result='nearby')
+        FORECAST_LOOKUPS.inc(len(new_coords), result='miss')
+
+        # 5) yield the entries which are ready to be used
+        for coord, p in coord_points.items():
+            if coord not in sync_coords:
+                yield coord, p
+
+        # 6) collect weather API requests for the remaining coordinates, pass
+        # all requests to the provider, and update/create database entries using
+        # the fetched data as requests finish. failed updates leave stale
+        # entries, and failed creations give None
+        new_coords = dict.fromkeys(new_coords)
+        for coord in new_coords:
+            requests[('create', coord)] = ForecastRequest(lat=coord[0], lon=coord[1])
+        provider = resolve_provider(provider, api_getter)
+        for (action, coord), api_results, exc in provider.fetch_many(
+            requests, deadline=deadline, hedge_after=hedge_after
+        ):
+            # anything other than the weather API being unavailable is a bug
+            if exc is not None and not isinstance(exc, ForecastUnavailableError):
+                raise exc
+            if action == 'sync':
+                p = coord_points[coord]
+                if exc is None:
+                    p.apply_api_results(api_results)
+                else:
+                    p.is_stale = True
+                sync_coords.discard(coord)
+                yield coord, p
+            else:
+                del new_coords[coord]
+                yield coord, None if exc is not None else cls.create_from_api_results(api_results)
+
+        # 7) unfinished updates leave stale entries, and unfinished
+        # creations give 'pending' points
+        for coord in sync_coords:
+            coord_points[coord].is_stale = True
+            yield coord, coord_points[coord]
+        for coord in new_coords:
+            pending_point = cls(latitude=coord[0], longitude=coord[1])
+            pending_point.is_pending = True
+            yield coord, pending_point
 
-        # 1) round all passed coordinates to 4 decimals
-        coord_ls = [(round(lat, 4), round(lon, 4)) for lat, lon in coord_ls]
-
-        # 2) form a large query object, essentially a chain of OR checks for
-        # latitude/longitude pairs
-        super_q = Q(latitude=coord_ls[0][0]) & Q(longitude=coord_ls[0][1])
-
-        for coord in coord_ls[1:]:
-            super_q |= Q(latitude=coord_ls[0][0]) & Q(longitude=coord_ls[0][1])
-
-        # 3) filter by all coordinates and force evaluation of the resulting queryset
-        match_points = list(cls.objects.filter(super_q))
-
-        # 4) form a list of returned database entries' coordinates
-        db_coords = [(float(p.latitude), float(p.longitude)) for p in match_points]
-
-        # 5) update database entries which are out of sync with weather API
-        for p in match_points:
-            if p.time_to_sync():
-                p.sync_with_api()
-        
-        # 6) check if all passed coordinates (coord_ls) occur in list formed in step 4,
-        # and for any coordinates for which there is no matching database entry,
-        # create a new instance/entry by using weather API
-        for coord in coord_ls:
-            if coord not in db_coords:
-                new_point = cls.create_with_api(*coord)
-                match_points.append(new_point)
-        
-        return match_points
-    
     @classmethod
-    def create_with_api(cls, lat, lon, api_getter=get_forecast):
+    def create_with_api(cls, lat, lon, provider=None, api_getter=None):
         """
         Takes in lat/longitude coordinates, fetches corresponding data from weather API,
         and uses the data to form a new instance/database entry.
+        :param provider, api_getter: See iter_update_and_map.
         :returns: A ForecastPoint instance, referencing the newly created database entry.
         """
-        api_results = api_getter(lat=lat, lon=lon)
-        return cls.objects.create(**api_results)
+        api_results = resolve_provider(provider, api_getter).fetch(lat, lon)
+        return cls.create_from_api_results(api_results)
 
-    def sync_with_api(self, api_getter=get_forecast):
+    @classmethod
+    def create_from_api_results(cls, api_results):
+        """
+        Forms a new instance/database entry from data fetched from weather API,
+        and publishes it to subscribers, see .updates.
+        :param api_results: dict - See .api_request_functions.yr_api.get_forecast.
+        :returns: A ForecastPoint instance, referencing the newly created database entry.
+        """
+        new_point = cls.objects.create(
+            forecast_digest=forecast_digest(api_results), **api_results
+        )
+        FORECAST_ROWS.inc(action='created')
+        # the payload includes the entry's ID, so it can only be
+        # rendered once the entry has been inserted
+        new_point.update_payload_json()
+        publish_update(new_point)
+        return new_point
+
+    def sync_with_api(self, provider=None, api_getter=None):
         """
         Requests updated forecast data from API service and updates
         the points corresponding database entry accordingly.
-        :param api_getter: function - See .api_request_functions.yr_api.get_forecast
-        for an example which explains expected interface/output.
+        :param provider, api_getter: See iter_update_and_map.
         """
-        api_results = api_getter(
-            lat=self.latitude, 
-            lon=self.longitude, 
-            if_modified_since=self.last_forecast_update_datetime,
+        api_results = resolve_provider(provider, api_getter).fetch(
+            self.latitude, self.longitude, if_modified_since=self.last_forecast_update_datetime
         )
-        self.forecast_start_datetime = api_results['forecast_start_datetime']
+        self.apply_api_results(api_results)
+
+    def apply_api_results(self, api_results):
+        """
+        Updates the point's database entry using data fetched from weather API.
+        If the forecast itself is unchanged (the weather API responded with
+        'not modified', or the fetched data have the same digest as the stored
+        data), only the timing columns are updated. Otherwise, the previous
+        forecast is archived (see .archive), and the new data are published
+        to subscribers (see .updates).
+        :param api_results: dict - See .api_request_functions.yr_api.get_forecast.
+        """
+        digest = None if api_results.get('not_modified') else forecast_digest(api_results)
+        changed = digest is not None and digest != self.forecast_digest
+        if changed:
+            # the previous forecast is archived before being overwritten
+            archive_forecast(self)
         self.last_forecast_update_datetime = api_results['last_forecast_update_datetime']
         self.new_req_allowed_datetime = api_results['new_req_allowed_datetime']
-        self.symbol_name_0h = api_results['symbol_name_0h']
-        self.t_0h = api_results['t_0h']
-        self.symbol_name_1h = api_results['symbol_name_1h']
-        self.t_1h = api_results['t_1h']
-        self.symbol_name_2h = api_results['symbol_name_2h']
-        self.t_2h = api_results['t_2h']
-        self.symbol_name_3h = api_results['symbol_name_3h']
-        self.t_3h = api_results['t_3h']
-        self.symbol_name_4h = api_results['symbol_name_4h']
-        self.t_5h = api_results['t_5h']
-        self.symbol_name_6h = api_results['symbol_name_6h']
-        self.t_6h = api_results['t_6h']
-        self.save()
+        if changed:
+            self.forecast_start_datetime = api_results['forecast_start_datetime']
+            for field in FORECAST_DATA_FIELDS:
+                setattr(self, field, api_results[field])
+            self.forecast_digest = digest
+            self.payload_json = render_payload(self)
+            self.save()
+            FORECAST_ROWS.inc(action='refreshed')
+            publish_update(self)
+            return
+        self.save(update_fields=TIMING_FIELDS)
+        FORECAST_ROWS.inc(action='unchanged')
+
+    def update_payload_json(self):
+        """
+        Renders the point's JSON payload based on its current field values
+        and saves it to the database entry.
+        """
+        self.payload_json = render_payload(self)
+        self.save(update_fields=['payload_json'])
+
+    def get_payload_json(self, symbol_codes=False, columnar=False):
+        """
+        Returns the point's pre-rendered JSON payload, rendering and storing
+        it first if the entry doesn't have one yet. If the point is marked
+        as stale, a '"stale": true' property is included. For pending
+        points, only the coordinates and a '"pending": true' property
+        are included, and for interpolated points, the payload is rendered
+        on the fly with an added '"interpolated": true' property.
+        :param symbol_codes: bool - Whether to render the payload on the fly
+        with weather symbol codes rather than names.
+        :param columnar: bool - Whether to render the payload on the fly
+        with hourly data as arrays, see .serialization.render_payload.
+        """
+        if self.is_pending:
+            return render_pending_payload(self)
+        if self.is_interpolated:
+            return add_payload_flags(render_payload(self, symbol_codes, columnar), interpolated=True)
+        if symbol_codes or columnar:
+            payload = render_payload(self, symbol_codes, columnar)
+        else:
+            if not self.payload_json:
+                self.update_payload_json()
+            payload = self.payload_json
+        if self.is_stale:
+            return add_payload_flags(payload, stale=True)
+        return payload
 
     def time_to_sync(self):
         """
@@ -168,3 +596,38 @@ class ForecastPoint(models.Model):
         is_time = delta_since_start_time.total_seconds() > 1800
         is_allowed = current_utc > self.new_req_allowed_datetime
         return is_time and is_allowed
+
+
+class ForecastArchive(models.Model):
+    """
+    Append-only archive of superseded forecasts, one entry per forecast
+    point and issue time, in a compact layout (see .archive). Entries are
+    only written if settings.FORECAST_ARCHIVE_ENABLED is set.
+    """
+    # coordinate key of the forecast point (see .spatial.coord_key)
+    coord_key = models.BigIntegerField()
+    forecast_start_datetime = models.DateTimeField()
+    # date/time (UTC) at which the weather API issued the forecast
+    # (ie the point's last_forecast_update_datetime at the time)
+    issued_datetime = models.DateTimeField()
+    # date/time (UTC) at which the forecast was superseded. used for pruning
+    archived_datetime = models.DateTimeField(auto_now_add=True, db_index=True)
+    # weather symbol codes and temperatures for each hour, packed
+    # with .archive.pack_forecast
+    data = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['coord_key', 'forecast_start_datetime']),
+        ]
+
+    def __str__(self):
+        return f'Forecast archived at {self.archived_datetime}, issued at {self.issued_datetime}'
+
+    def unpack(self):
+        """
+        :return: tuple - A (weather symbol names, temperatures) tuple of lists.
+        """
+        codes, temps = unpack_forecast(self.data)
+        return [WeatherSymbol.name_for_code(code) for code in codes], temps
+
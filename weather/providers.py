@@ -0,0 +1,140 @@
+"""
+Weather providers, which fetch forecasts for batches of coordinates.
+
+The forecast pipeline (see weather.models.ForecastPoint) always fetches
+through a provider's fetch_many method, so that providers with an API which
+serves many points per request can fetch whole batches at once. Providers
+whose API serves single points (like the YR weather API) make concurrent
+requests instead, see ConcurrentProvider. The provider used by default is
+set by settings.FORECAST_PROVIDER.
+"""
+import json
+import threading
+
+from collections import namedtuple
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .api_request_functions.fetching import iter_fetch_concurrently
+from .api_request_functions.yr_api import get_forecast
+
+# a single point's forecast request. 'if_modified_since' is the datetime of
+# the stored forecast (if any), for providers supporting conditional requests
+ForecastRequest = namedtuple('ForecastRequest', ['lat', 'lon', 'if_modified_since'])
+ForecastRequest.__new__.__defaults__ = (None,)
+
+
+class ForecastProvider:
+    """
+    Base class of weather providers.
+    """
+    def fetch_many(self, requests, deadline=None, hedge_after=None):
+        """
+        Fetches forecasts for a batch of points.
+        :param requests: dict - Maps keys to ForecastRequest tuples.
+        :param deadline: (optional) float - time.monotonic value after which
+        unfinished requests are given up on.
+        :param hedge_after: (optional) float - Number of seconds after which
+        unfinished requests may be duplicated, for providers supporting it.
+        :return: iterable - (key, result, exception) tuples for requests which
+        finish in time (possibly as they finish), where results are dicts
+        in the format that .api_request_functions.yr_api.get_forecast
+        returns, exception is None for successful requests, and result is
+        None for failed ones.
+        """
+        raise NotImplementedError
+
+    def fetch(self, lat, lon, if_modified_since=None):
+        """
+        Fetches the forecast for a single point, raising any error.
+        """
+        for _, result, exc in self.fetch_many({0: ForecastRequest(lat, lon, if_modified_since)}):
+            if exc is not None:
+                raise exc
+            return result
+
+
+class ConcurrentProvider(ForecastProvider):
+    """
+    Provider making concurrent requests for single points, using a function
+    with the same interface as .api_request_functions.yr_api.get_forecast.
+    """
+    def __init__(self, getter):
+        self.getter = getter
+
+    def fetch_many(self, requests, deadline=None, hedge_after=None):
+        calls = {
+            key: partial(self.getter, lat=req.lat, lon=req.lon, if_modified_since=req.if_modified_since)
+            for key, req in requests.items()
+        }
+        return iter_fetch_concurrently(calls, deadline=deadline, hedge_after=hedge_after)
+
+
+class YRProvider(ConcurrentProvider):
+    """
+    Provider using the YR weather API.
+    """
+    def __init__(self):
+        super().__init__(get_forecast)
+
+
+class FixtureProvider(ForecastProvider):
+    """
+    Provider serving the same forecast for all points, read from a JSON file
+    (settings.FORECAST_FIXTURE_PATH, by default) holding 'symbol_name_<N>h'
+    and 't_<N>h' values. Forecasts start at the current hour, and are
+    considered issued now. Meant for tests, benchmarks and local development.
+    """
+    def __init__(self, path=None, data=None):
+        if data is None:
+            with open(path or settings.FORECAST_FIXTURE_PATH) as f:
+                data = json.load(f)
+        self.data = data
+
+    def forecast(self, lat, lon):
+        now = timezone.now()
+        return {
+            **self.data,
+            'latitude': round(lat, 4),
+            'longitude': round(lon, 4),
+            'forecast_start_datetime': now.replace(minute=0, second=0, microsecond=0),
+            'last_forecast_update_datetime': now,
+            'new_req_allowed_datetime': now + timedelta(minutes=30),
+        }
+
+    def fetch_many(self, requests, deadline=None, hedge_after=None):
+        for key, req in requests.items():
+            yield key, self.forecast(float(req.lat), float(req.lon)), None
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Returns the process' instance of the provider class set by
+    settings.FORECAST_PROVIDER.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None or type(_provider) is not import_string(settings.FORECAST_PROVIDER):
+            _provider = import_string(settings.FORECAST_PROVIDER)()
+    return _provider
+
+
+def resolve_provider(provider=None, api_getter=None):
+    """
+    Returns the provider to use for a call to the forecast pipeline, given
+    an explicitly passed provider or single point getter function (see
+    ConcurrentProvider), if any, or else the default provider.
+    """
+    if provider is not None:
+        return provider
+    if api_getter is not None:
+        return ConcurrentProvider(api_getter)
+    return get_provider()
@@ -0,0 +1,105 @@
+"""
+Helpers for looking up forecasts along a route, eg a planned trip given as
+an encoded polyline, or a trip recorded as locations.models.VisitedGeoPosition
+entries.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from .serialization import NUM_HOURS
+from .spatial import grid_cell_centers, haversine_array
+
+
+def decode_polyline(encoded, precision=5):
+    """
+    Decodes a polyline in the 'encoded polyline algorithm format' (as
+    used by eg Google Maps and OSRM).
+    :param encoded: str - The encoded polyline.
+    :param precision: int - Number of decimals of encoded coordinates.
+    :return: list - 2-element float tuples of latitudes/longitudes.
+    :raises ValueError: If the polyline is malformed.
+    """
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        if not 0 <= byte < 64:
+            raise ValueError('Invalid character in polyline.')
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    if shift or len(values) % 2:
+        raise ValueError('Polyline ends unexpectedly.')
+    factor = 10 ** precision
+    deltas = np.array(values, dtype=float).reshape(-1, 2)
+    coords = np.cumsum(deltas, axis=0) / factor
+    return [(float(lat), float(lon)) for lat, lon in coords]
+
+
+def path_distances(lats, lons):
+    """
+    Returns an array of the distances (in meters) of a path's points from
+    the start of the path, measured along the path.
+    :param lats, lons: array-like - Coordinates of the path's points, in degrees.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    steps = haversine_array(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    return np.concatenate(([0], np.cumsum(steps)))
+
+
+def sample_path(lats, lons, spacing):
+    """
+    Samples a path at (roughly) regular distances along it, always
+    including its first and last points. Positions between a path's
+    points are interpolated linearly.
+    :param lats, lons: array-like - Coordinates of the path's points, in degrees.
+    :param spacing: float - Distance between samples, in meters.
+    :return: tuple - A (latitudes, longitudes, distances) tuple of
+    numpy.ndarrays, where distances are the samples' distances from the
+    start of the path, in meters.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    path_dists = path_distances(lats, lons)
+    total = path_dists[-1]
+    sample_dists = np.append(np.arange(0, total, spacing), total)
+    if len(sample_dists) > 1 and sample_dists[-1] == sample_dists[-2]:
+        sample_dists = sample_dists[:-1]
+    # longitudes are unwrapped, so that segments crossing the antimeridian
+    # are interpolated the short way around
+    unwrapped_lons = np.degrees(np.unwrap(np.radians(lons)))
+    sample_lons = (np.interp(sample_dists, path_dists, unwrapped_lons) + 180) % 360 - 180
+    return np.interp(sample_dists, path_dists, lats), sample_lons, sample_dists
+
+
+def sample_cells(lats, lons):
+    """
+    Maps samples to the grid cells containing them, so that forecasts
+    needn't be looked up separately for nearby samples.
+    :param lats, lons: array-like - Coordinates of the samples, in degrees.
+    :return: tuple - A (coord_ls, index) tuple, where coord_ls is a list of
+    2-element float tuples of the distinct cells' center coordinates, and
+    index is a list mapping each sample to its cell's position in coord_ls.
+    """
+    center_lats, center_lons = grid_cell_centers(lats, lons)
+    cells, index = np.unique(np.column_stack((center_lats, center_lons)), axis=0, return_inverse=True)
+    coord_ls = [(round(float(lat), 4), round(float(lon), 4)) for lat, lon in cells]
+    return coord_ls, index.ravel().tolist()
+
+
+def forecast_hour(point, eta):
+    """
+    Returns the index (0-6) of the hourly forecast of a ForecastPoint
+    instance that is closest to a time, or None if the time isn't
+    covered by the point's forecast.
+    :param point: A ForecastPoint instance.
+    :param eta: datetime - A timezone aware datetime.
+    """
+    hour = round((eta - point.forecast_start_datetime) / timedelta(hours=1))
+    if 0 <= hour < NUM_HOURS:
+        return hour
+    return None
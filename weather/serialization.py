@@ -0,0 +1,158 @@
+import hashlib
+import json
+
+from decimal import Decimal
+
+from pytz import UTC
+
+# number of hourly forecast steps stored per ForecastPoint (defined here
+# rather than in .models, since .models imports this module)
+NUM_HOURS = 7
+
+# fields included in the JSON representation of a ForecastPoint, in the
+# same order as api.serializers.ForecastPointSerializer renders them
+PAYLOAD_FIELDS = (
+    'id',
+    'forecast_start_datetime',
+    'latitude',
+    'longitude',
+    'symbol_name_0h',
+    't_0h',
+    'symbol_name_1h',
+    't_1h',
+    'symbol_name_2h',
+    't_2h',
+    'symbol_name_3h',
+    't_3h',
+    'symbol_name_4h',
+    't_4h',
+    'symbol_name_5h',
+    't_5h',
+    'symbol_name_6h',
+    't_6h',
+)
+
+# forecast data fields, ie symbol names and temperatures for each hour
+FORECAST_DATA_FIELDS = tuple(
+    field for i in range(NUM_HOURS) for field in (f'symbol_name_{i}h', f't_{i}h')
+)
+
+# number of decimals used when rendering decimal fields
+# (see field definitions in weather.models.ForecastPoint)
+DECIMAL_PLACES = {
+    'latitude': 4,
+    'longitude': 4,
+}
+
+# temperature fields, which are rendered as numbers with one decimal
+TEMPERATURE_FIELDS = tuple(f't_{i}h' for i in range(NUM_HOURS))
+
+
+def format_decimal(value, num_dec):
+    """
+    Formats a Decimal/float value as a fixed-point string with the
+    specified number of decimals, eg 5.81 -> '5.8100' for 4 decimals.
+    """
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return '{:f}'.format(value.quantize(Decimal('.1') ** num_dec))
+
+
+def format_datetime(value):
+    """
+    Formats a datetime as an ISO 8601 string in UTC, using the 'Z'
+    suffix rather than '+00:00'.
+    """
+    value = value.astimezone(UTC).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def render_payload(point, symbol_codes=False, columnar=False):
+    """
+    Renders a ForecastPoint instance as a JSON object string, equivalent
+    to what DRF's JSONRenderer produces for ForecastPointSerializer data.
+    Only attribute access is used, so the instance need not have been
+    re-read from the database (ie API results stored as floats work too).
+    If 'symbol_codes' is set, weather symbols are rendered as their codes
+    (see weather.models.WeatherSymbol) under 'symbol_<N>h' keys, instead
+    of as names under 'symbol_name_<N>h' keys. If 'columnar' is set, the
+    hourly temperatures and symbols are instead rendered as 't' and
+    'symbol' arrays.
+    """
+    data = {}
+    for field in PAYLOAD_FIELDS:
+        if field.startswith('symbol_name_'):
+            if symbol_codes:
+                value = getattr(point, field.replace('symbol_name_', 'symbol_') + '_id')
+            else:
+                value = getattr(point, field)
+            if columnar:
+                data.setdefault('symbol', []).append(value)
+            elif symbol_codes:
+                data[field.replace('symbol_name_', 'symbol_')] = value
+            else:
+                data[field] = value
+            continue
+        value = getattr(point, field)
+        if field in TEMPERATURE_FIELDS:
+            value = round(float(value), 1)
+            if columnar:
+                data.setdefault('t', []).append(value)
+                continue
+        elif field in DECIMAL_PLACES:
+            value = format_decimal(value, DECIMAL_PLACES[field])
+        elif field == 'forecast_start_datetime':
+            value = format_datetime(value)
+        data[field] = value
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def render_placeholder_payload(latitude, longitude, **flags):
+    """
+    Renders a JSON object string for coordinates without a forecast,
+    including only the coordinates and the passed flags, eg
+    render_placeholder_payload(1, 2, pending=True) ->
+    '{"id":null,"latitude":"1.0000","longitude":"2.0000","pending":true}'.
+    """
+    data = {
+        'id': None,
+        'latitude': format_decimal(latitude, DECIMAL_PLACES['latitude']),
+        'longitude': format_decimal(longitude, DECIMAL_PLACES['longitude']),
+        **flags
+    }
+    return json.dumps(data, separators=(',', ':'))
+
+
+def render_pending_payload(point):
+    """
+    Renders a JSON object string for a point whose forecast hasn't been
+    fetched yet, including only its coordinates and a 'pending' flag.
+    """
+    return render_placeholder_payload(point.latitude, point.longitude, pending=True)
+
+
+def add_payload_flags(payload, **flags):
+    """
+    Adds properties to a rendered payload, without parsing it, eg
+    add_payload_flags('{"id":1}', stale=True) -> '{"id":1,"stale":true}'.
+    """
+    extra = json.dumps(flags, separators=(',', ':'))
+    return payload[:-1] + ',' + extra[1:]
+
+
+def forecast_digest(api_results):
+    """
+    Returns a digest (hex string) of the forecast start time and forecast
+    data in weather API results, for cheaply checking if new results
+    differ from stored ones.
+    :param api_results: dict - See weather.api_request_functions.yr_api.get_forecast.
+    """
+    parts = [format_datetime(api_results['forecast_start_datetime'])]
+    for field in FORECAST_DATA_FIELDS:
+        value = api_results[field]
+        if field in TEMPERATURE_FIELDS:
+            value = format_decimal(value, 1)
+        parts.append(value)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+
+# mean earth radius, in meters
+EARTH_RADIUS = 6371008.8
+
+# size (in degrees latitude/longitude) of the grid cells used for
+# looking up ForecastPoint entries by proximity
+GRID_CELL_DEGREES = 0.01
+
+# number of grid cells along a full circle of longitude
+NUM_LON_CELLS = round(360 / GRID_CELL_DEGREES)
+
+NUM_LAT_CELLS = round(180 / GRID_CELL_DEGREES)
+
+# scale of the integers which coordinates (with 4 decimals) are stored
+# as in coordinate keys, and offsets making these non-negative
+COORD_SCALE = 10000
+LAT_OFFSET = 90 * COORD_SCALE
+LON_OFFSET = 180 * COORD_SCALE
+
+
+def grid_indices(lat, lon):
+    """
+    Returns the (row, column) indices of the grid cell which contains
+    the passed coordinates.
+    """
+    lat_i = min(int(math.floor((float(lat) + 90) / GRID_CELL_DEGREES)), NUM_LAT_CELLS - 1)
+    lon_i = int(math.floor((float(lon) + 180) / GRID_CELL_DEGREES)) % NUM_LON_CELLS
+    return lat_i, lon_i
+
+
+def grid_key(lat, lon):
+    """
+    Returns an integer which identifies the grid cell that contains
+    the passed coordinates.
+    """
+    lat_i, lon_i = grid_indices(lat, lon)
+    return lat_i * NUM_LON_CELLS + lon_i
+
+
+def coord_key(lat, lon):
+    """
+    Returns an integer which identifies the passed coordinates (rounded to
+    4 decimals), by packing their scaled values into a single 64-bit integer.
+    """
+    lat_i = round(float(lat) * COORD_SCALE) + LAT_OFFSET
+    lon_i = round(float(lon) * COORD_SCALE) + LON_OFFSET
+    return (lat_i << 32) | lon_i
+
+
+def grid_cell_centers(lats, lons):
+    """
+    Returns the coordinates (rounded to 4 decimals) of the centers of the
+    grid cells which contain the passed coordinates.
+    :param lats, lons: array-like - Coordinates, in degrees.
+    :return: tuple - A (latitudes, longitudes) tuple of numpy.ndarrays.
+    """
+    lat_i = np.minimum(np.floor((np.asarray(lats, dtype=float) + 90) / GRID_CELL_DEGREES), NUM_LAT_CELLS - 1)
+    lon_i = np.floor((np.asarray(lons, dtype=float) + 180) / GRID_CELL_DEGREES) % NUM_LON_CELLS
+    return (
+        np.round((lat_i + 0.5) * GRID_CELL_DEGREES - 90, 4),
+        np.round((lon_i + 0.5) * GRID_CELL_DEGREES - 180, 4),
+    )
+
+
+def grid_keys_within(lat, lon, radius):
+    """
+    Returns a set of keys of all grid cells which (partly) lie within
+    'radius' meters of the passed coordinates.
+    """
+    lat, lon = float(lat), float(lon)
+    lat_delta = math.degrees(radius / EARTH_RADIUS)
+    # longitude degrees get shorter towards the poles, so more cells
+    # need to be covered there
+    cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90)))
+    if cos_lat < 1e-6:
+        lon_delta = 180
+    else:
+        lon_delta = min(math.degrees(radius / (EARTH_RADIUS * cos_lat)), 180)
+    min_lat_i, min_lon_i = grid_indices(max(lat - lat_delta, -90), lon - lon_delta)
+    max_lat_i, _ = grid_indices(min(lat + lat_delta, 90), lon)
+    num_lon = min(int(math.ceil(2 * lon_delta / GRID_CELL_DEGREES)) + 1, NUM_LON_CELLS)
+    return {
+        lat_i * NUM_LON_CELLS + (min_lon_i + j) % NUM_LON_CELLS
+        for lat_i in range(min_lat_i, max_lat_i + 1)
+        for j in range(num_lon)
+    }
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance, in meters, between two
+    pairs of coordinates.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, map(float, (lat1, lon1, lat2, lon2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(math.sqrt(a), 1))
+
+
+def haversine_array(lats1, lons1, lats2, lons2):
+    """
+    Returns an array of great-circle distances, in meters, where element i
+    is the distance between point i of the first set of coordinates and
+    point i of the second (or between points with any shapes that NumPy
+    can broadcast together).
+    :param lats1, lons1: array-like - Coordinates (in degrees) of the first
+    set of points.
+    :param lats2, lons2: array-like - Coordinates (in degrees) of the second
+    set of points.
+    :return: numpy.ndarray
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lon1 = np.radians(np.asarray(lons1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    lon2 = np.radians(np.asarray(lons2, dtype=float))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(np.sqrt(a), 1))
+
+
+def haversine_matrix(lats1, lons1, lats2, lons2):
+    """
+    Returns a matrix of great-circle distances, in meters, where element
+    (i, j) is the distance between point i of the first set of coordinates
+    and point j of the second.
+    :param lats1, lons1: array-like - Coordinates (in degrees) of the first
+    set of points.
+    :param lats2, lons2: array-like - Coordinates (in degrees) of the second
+    set of points.
+    :return: numpy.ndarray - Matrix of shape (len(lats1), len(lats2)).
+    """
+    return haversine_array(
+        np.asarray(lats1, dtype=float)[:, None],
+        np.asarray(lons1, dtype=float)[:, None],
+        np.asarray(lats2, dtype=float)[None, :],
+        np.asarray(lons2, dtype=float)[None, :],
+    )
@@ -1,8 +1,32 @@
 import random
+import threading
+import time
 
-from django.test import TestCase
+from datetime import datetime
+from functools import partial
+from unittest import mock
 
-from ..api_request_functions.yr_api import get_forecast
+from pytz import UTC
+
+from django.test import TestCase, override_settings
+
+from ..api_request_functions import fetching, yr_api
+from ..api_request_functions.circuit_breaker import CircuitBreaker, OPEN
+from ..api_request_functions.fetching import (
+    fetch_concurrently,
+    iter_fetch_concurrently,
+    LatencyTracker,
+    RateLimiter,
+)
+from ..api_request_functions.yr_api import (
+    get_forecast,
+    ForecastUnavailableError,
+    parse_header_datetime,
+    parse_yr_datetime,
+    strptime_with_utc,
+    HEADER_DATE_FORMAT_SPEC,
+    YR_DATE_FORMAT_SPEC,
+)
 
 
 class YrApiTestCase(TestCase):
@@ -12,10 +36,210 @@ class YrApiTestCase(TestCase):
     @staticmethod
     def get_rand_coord():
         return round(random.choice([-1, 1]) * random.random() * 90, 4)
+
+    def test_parse_yr_datetime(self):
+        """
+        YR timestamps are parsed into UTC datetimes, matching strptime results.
+        """
+        time_str = '2021-05-21T11:33:08Z'
+        expected = datetime(2021, 5, 21, 11, 33, 8, tzinfo=UTC)
+        self.assertEqual(parse_yr_datetime(time_str), expected)
+        self.assertEqual(
+            datetime.strptime(time_str, YR_DATE_FORMAT_SPEC).replace(tzinfo=UTC),
+            expected
+        )
+
+    def test_parse_header_datetime(self):
+        """
+        HTTP header dates are parsed into UTC datetimes, matching strptime results.
+        """
+        time_str = 'Fri, 21 May 2021 12:05:01 GMT'
+        expected = datetime(2021, 5, 21, 12, 5, 1, tzinfo=UTC)
+        self.assertEqual(parse_header_datetime(time_str), expected)
+        self.assertEqual(strptime_with_utc(time_str, HEADER_DATE_FORMAT_SPEC), expected)
+        self.assertEqual(
+            datetime.strptime(time_str, HEADER_DATE_FORMAT_SPEC).replace(tzinfo=UTC),
+            expected
+        )
+
+    def test_parse_malformed_datetimes(self):
+        """
+        Malformed timestamps provoke a ValueError.
+        """
+        with self.assertRaises(ValueError):
+            parse_yr_datetime('2021-05-21 11:33:08')
+        with self.assertRaises(ValueError):
+            parse_header_datetime('Fri, 21 Foo 2021 12:05:01 GMT')
+
+    def test_get_forecast_malformed(self):
+        """
+        Malformed responses provoke a ForecastUnavailableError, and are
+        counted as failures by the circuit breaker.
+        """
+        breaker = CircuitBreaker(min_calls=1)
+        resp = mock.Mock(status_code=200, headers={'Expires': 'Fri, 21 May 2021 12:05:01 GMT'})
+        resp.json.return_value = {'properties': {'timeseries': []}}
+        with mock.patch.object(yr_api, '_yr_breaker', breaker):
+            with mock.patch.object(yr_api.requests, 'get', return_value=resp):
+                with self.assertRaises(ForecastUnavailableError):
+                    get_forecast(57.7, 11.9667)
+        self.assertEqual(breaker.state, OPEN)
     
     # DISABLED usually, to keep from making unneccessary requests to YR API
     # def test_get_forecast(self):
     #     lat = YrApiTestCase.get_rand_coord()
     #     lon = YrApiTestCase.get_rand_coord()
     #     resp = get_forecast(lat, lon)
-    #     self.assertTrue('new_req_allowed_datetime' in resp)
\ No newline at end of file
+    #     self.assertTrue('new_req_allowed_datetime' in resp)
+
+
+class FetchConcurrentlyTestCase(TestCase):
+    """
+    Tests of concurrent weather API request functions.
+    """
+    def test_results_and_errors(self):
+        """
+        Results of successful calls and exceptions of failed calls
+        are returned separately.
+        """
+        def failing_call(timeout=None):
+            raise ValueError('Failed')
+        results, errors = fetch_concurrently({
+            'a': lambda timeout=None: 1,
+            'b': failing_call,
+        })
+        self.assertEqual(results, {'a': 1})
+        self.assertIsInstance(errors['b'], ValueError)
+
+    def test_hedged_call(self):
+        """
+        A duplicate call is made when a call is slow, and the result of
+        the first call to finish is used.
+        """
+        num_calls = []
+        lock = threading.Lock()
+        def sometimes_slow_call(timeout=None):
+            with lock:
+                num_calls.append(1)
+                is_first = len(num_calls) == 1
+            if is_first:
+                time.sleep(0.5)
+                return 'slow'
+            return 'fast'
+        start = time.monotonic()
+        results, _ = fetch_concurrently({'a': sometimes_slow_call}, hedge_after=0.05)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(results, {'a': 'fast'})
+        self.assertEqual(len(num_calls), 2)
+
+    @override_settings(FORECAST_FETCH_CONCURRENCY=1)
+    def test_timeout_computed_when_call_starts(self):
+        """
+        Calls are passed the time left until the deadline when they start,
+        so that calls queued behind others don't overrun the deadline.
+        """
+        timeouts = []
+        def slow_call(timeout=None):
+            timeouts.append(timeout)
+            time.sleep(0.2)
+        with mock.patch.object(fetching, '_executor', None):
+            fetch_concurrently({'a': slow_call, 'b': slow_call}, deadline=time.monotonic() + 1)
+            fetching.get_executor().shutdown(wait=True)
+        self.assertEqual(len(timeouts), 2)
+        # the second call only starts once the first has finished
+        self.assertLess(timeouts[1], 0.85)
+
+    @override_settings(FORECAST_FETCH_CONCURRENCY=1)
+    def test_queued_calls_cancelled(self):
+        """
+        Calls that are still queued when the caller stops iterating over
+        the outcomes are cancelled.
+        """
+        calls = []
+        def call(timeout=None, name=None, duration=0):
+            calls.append(name)
+            time.sleep(duration)
+            return name
+        with mock.patch.object(fetching, '_executor', None):
+            outcomes = iter_fetch_concurrently({
+                'a': partial(call, name='a'),
+                'b': partial(call, name='b', duration=0.1),
+                'c': partial(call, name='c'),
+            })
+            self.assertEqual(next(outcomes), ('a', 'a', None))
+            outcomes.close()
+            fetching.get_executor().shutdown(wait=True)
+        self.assertEqual(calls, ['a', 'b'])
+
+    @override_settings(FORECAST_FETCH_CONCURRENCY=1)
+    def test_queued_calls_not_hedged(self):
+        """
+        Only calls which have started are duplicated, not queued ones.
+        """
+        def call(timeout=None, duration=0):
+            time.sleep(duration)
+        with mock.patch.object(fetching, '_executor', None):
+            executor = fetching.get_executor()
+            with mock.patch.object(executor, 'submit', wraps=executor.submit) as submit:
+                fetch_concurrently({'a': partial(call, duration=0.2), 'b': call}, hedge_after=0.05)
+            executor.shutdown(wait=True)
+        # both calls, and a duplicate of the first
+        self.assertEqual(submit.call_count, 3)
+
+    @override_settings(FORECAST_FETCH_CONCURRENCY=2)
+    def test_late_call_hedged(self):
+        """
+        Calls which start late, after waiting for a free thread, are
+        duplicated once they have been slow for 'hedge_after' seconds.
+        """
+        num_calls = []
+        release = threading.Event()
+        def call(timeout=None, duration=0):
+            time.sleep(duration)
+        def sometimes_slow_call(timeout=None):
+            num_calls.append(1)
+            if len(num_calls) == 1:
+                release.wait(1)
+                return 'slow'
+            return 'fast'
+        with mock.patch.object(fetching, '_executor', None):
+            start = time.monotonic()
+            # 'c' only starts once 'a' and 'b' have finished
+            results, _ = fetch_concurrently({
+                'a': partial(call, duration=0.15),
+                'b': partial(call, duration=0.15),
+                'c': sometimes_slow_call,
+            }, hedge_after=0.1)
+            elapsed = time.monotonic() - start
+            release.set()
+            fetching.get_executor().shutdown(wait=True)
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(results['c'], 'fast')
+
+    def test_latency_percentile(self):
+        """
+        Latency percentiles are only reported once enough durations are recorded.
+        """
+        tracker = LatencyTracker(min_samples=10)
+        for i in range(1, 10):
+            tracker.record(i / 10)
+        self.assertIsNone(tracker.percentile(95))
+        tracker.record(1.0)
+        self.assertEqual(tracker.percentile(95), 1.0)
+        self.assertEqual(tracker.percentile(50), 0.5)
+
+
+    def test_rate_limiter(self):
+        """
+        Calls beyond the burst size have to wait for the rate limit, and
+        are refused if they'd have to wait longer than the timeout.
+        """
+        now = [0.0]
+        waits = []
+        limiter = RateLimiter(2, burst=2, clock=lambda: now[0], sleep=waits.append)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertEqual(waits, [])
+        self.assertFalse(limiter.acquire(timeout=0.1))
+        self.assertTrue(limiter.acquire(timeout=1))
+        self.assertEqual(waits, [0.5])
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..archive import ARCHIVE_WRITER, prune_archive
+from ..models import ForecastArchive, ForecastPoint
+from .test_models import fake_get_forecast
+
+
+@override_settings(
+    FORECAST_ARCHIVE_ENABLED=True,
+    FORECAST_ARCHIVE_BATCH_SIZE=1000,
+    FORECAST_ARCHIVE_FLUSH_INTERVAL=3600
+)
+class ForecastArchiveTestCase(TestCase):
+    """
+    Tests of archiving superseded forecasts.
+    """
+    def test_sync_archives_previous_forecast(self):
+        """
+        Synchronizing with changed forecast data archives the previous
+        forecast, once the queued archive entries are written.
+        """
+        fp = ForecastPoint.objects.get(latitude=-5.8100, longitude=-3.0000)
+        previous_symbols = [getattr(fp, f'symbol_name_{i}h') for i in range(7)]
+        previous_temps = [getattr(fp, f't_{i}h') for i in range(7)]
+        fp.sync_with_api(api_getter=fake_get_forecast)
+        self.assertEqual(ForecastArchive.objects.count(), 0)
+        self.assertEqual(ARCHIVE_WRITER.flush(), 1)
+
+        entry = ForecastArchive.objects.get()
+        self.assertEqual(entry.coord_key, fp.coord_key)
+        self.assertEqual(entry.unpack(), (previous_symbols, previous_temps))
+        # unchanged forecasts aren't archived again
+        fp.sync_with_api(api_getter=fake_get_forecast)
+        self.assertEqual(ARCHIVE_WRITER.flush(), 0)
+
+    def test_prune_archive(self):
+        """
+        Only entries archived before the passed time are deleted,
+        across several chunks.
+        """
+        for fp in ForecastPoint.objects.all():
+            fp.sync_with_api(api_getter=fake_get_forecast)
+        ARCHIVE_WRITER.flush()
+        ForecastArchive.objects.update(archived_datetime=timezone.now() - timedelta(days=2))
+        ForecastArchive.objects.filter(id=ForecastArchive.objects.first().id).update(archived_datetime=timezone.now())
+        self.assertEqual(prune_archive(timezone.now() - timedelta(days=1), chunk_size=1), 1)
+        self.assertEqual(ForecastArchive.objects.count(), 1)
@@ -0,0 +1,83 @@
+from django.test import SimpleTestCase
+
+from ..api_request_functions.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+)
+
+
+class FakeClock:
+    """
+    Clock whose time only changes when explicitly advanced.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing_call():
+    raise ConnectionError('Upstream down')
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    """
+    Tests of CircuitBreaker class.
+    """
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            window_size=4, min_calls=4, reset_timeout=30, clock=self.clock
+        )
+
+    def trip(self):
+        for _ in range(4):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(failing_call)
+
+    def test_trips_on_failures(self):
+        """
+        Breaker opens once the failure rate threshold is reached, after which
+        calls are rejected without being made.
+        """
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.trip()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'ok')
+
+    def test_trips_on_slow_calls(self):
+        """
+        Breaker opens when too many calls are slow, even if they succeed.
+        """
+        def slow_call():
+            self.clock.now += 5
+            return 'ok'
+        for _ in range(4):
+            self.breaker.call(slow_call)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe_success_closes(self):
+        """
+        After the reset timeout a single probe call is let through, and
+        if it succeeds, the breaker closes.
+        """
+        self.trip()
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        """
+        A failed probe call reopens the breaker.
+        """
+        self.trip()
+        self.clock.now += 30
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(failing_call)
+        self.assertEqual(self.breaker.state, OPEN)
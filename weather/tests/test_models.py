@@ -1,16 +1,209 @@
-from datetime import datetime
+import time
+
+from datetime import datetime, timedelta
 
 from pytz import UTC
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import ForecastPointSerializer
 
-from ..models import ForecastPoint
+from ..api_request_functions.yr_api import ForecastUnavailableError
+from ..models import ForecastPoint, WeatherSymbol
+
+
+def fake_get_forecast(lat, lon, if_modified_since=None, user_agent=None, timeout=None):
+    """
+    Stands in for .api_request_functions.yr_api.get_forecast, returning
+    data in the same format without making any requests.
+    """
+    return_data = {
+        'forecast_start_datetime': datetime(2021, 5, 21, 12, 0, 0, tzinfo=UTC),
+        'last_forecast_update_datetime': datetime(2021, 5, 21, 11, 33, 8, tzinfo=UTC),
+        'new_req_allowed_datetime': datetime(2021, 5, 21, 12, 5, 1, tzinfo=UTC),
+        'latitude': lat,
+        'longitude': lon,
+    }
+    for i in range(7):
+        return_data[f'symbol_name_{i}h'] = 'partlycloudy_day'
+        return_data[f't_{i}h'] = 10.3 - i
+    return return_data
+
+
+def unavailable_get_forecast(lat, lon, if_modified_since=None, user_agent=None, timeout=None):
+    """
+    Stands in for .api_request_functions.yr_api.get_forecast while the
+    weather API is unreachable.
+    """
+    raise ForecastUnavailableError('YR API requests are suspended.')
 
 
 class ForecastPointTestCase(TestCase):
     """
     Tests of ForecastPoint class.
     """
+    def test_payload_matches_serializer(self):
+        """
+        Pre-rendered payloads are identical to what the DRF serializer
+        produces for the same entries.
+        """
+        for fp in ForecastPoint.objects.all():
+            serialized = JSONRenderer().render(ForecastPointSerializer(fp).data)
+            self.assertEqual(fp.get_payload_json(), serialized.decode())
+
+    def test_create_with_api_renders_payload(self):
+        """
+        Creating a point from API data stores a payload rendered from
+        the new entry.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        fp.refresh_from_db()
+        serialized = JSONRenderer().render(ForecastPointSerializer(fp).data)
+        self.assertEqual(fp.payload_json, serialized.decode())
+
+    def test_update_and_filter_api_unavailable(self):
+        """
+        When the weather API is unavailable, update_and_filter returns
+        preexisting entries marked as stale, and skips coordinates
+        without entries.
+        """
+        res = ForecastPoint.update_and_filter(
+            [(-59.3103, -14.4888), (-5.8100, -3.0000), (57.7, 11.9667)],
+            api_getter=unavailable_get_forecast
+        )
+        self.assertEqual(len(res), 2)
+        self.assertTrue(all(fp.is_stale for fp in res))
+        self.assertIn('"stale":true', res[0].get_payload_json())
+        self.assertEqual(ForecastPoint.objects.count(), 2)
+
+    def test_update_and_map_api_unavailable(self):
+        """
+        update_and_map maps each passed coordinate to its entry, and
+        coordinates without entries to None while the weather API is
+        unavailable.
+        """
+        res = ForecastPoint.update_and_map(
+            [(-59.3103, -14.4888), (57.7, 11.9667)],
+            api_getter=unavailable_get_forecast
+        )
+        self.assertEqual(list(res), [(-59.3103, -14.4888), (57.7, 11.9667)])
+        self.assertTrue(res[(-59.3103, -14.4888)].is_stale)
+        self.assertIsNone(res[(57.7, 11.9667)])
+
+    def test_update_and_filter_deadline(self):
+        """
+        When weather API requests don't finish before the deadline,
+        update_and_filter returns preexisting entries marked as stale and
+        pending points for coordinates without entries, without waiting
+        for the requests.
+        """
+        def slow_get_forecast(*args, **kwargs):
+            time.sleep(0.5)
+            return fake_get_forecast(*args, **kwargs)
+        start = time.monotonic()
+        res = ForecastPoint.update_and_filter(
+            [(-59.3103, -14.4888), (57.7, 11.9667)],
+            api_getter=slow_get_forecast,
+            deadline=start + 0.05
+        )
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(len(res), 2)
+        self.assertTrue(res[0].is_stale)
+        self.assertTrue(res[1].is_pending)
+        self.assertIn('"pending":true', res[1].get_payload_json())
+
+    @override_settings(FORECAST_REUSE_RADIUS=500)
+    def test_update_and_filter_reuses_nearby(self):
+        """
+        Coordinates close to an up to date entry get that entry, rather
+        than a new one, while coordinates further away get new entries.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        fp.new_req_allowed_datetime = timezone.now() + timedelta(minutes=30)
+        fp.save()
+        # ~300m and ~2km north of the entry, respectively
+        res = ForecastPoint.update_and_filter(
+            [(57.7027, 11.9667), (57.718, 11.9667)],
+            api_getter=fake_get_forecast
+        )
+        self.assertEqual(len(res), 2)
+        self.assertEqual(res[0].id, fp.id)
+        self.assertNotEqual(res[1].id, fp.id)
+        self.assertEqual(ForecastPoint.objects.count(), 4)
+
+    @override_settings(
+        FORECAST_REUSE_RADIUS=0,
+        FORECAST_INTERPOLATION_RADIUS=5000,
+        FORECAST_INTERPOLATION_MIN_NEIGHBOURS=3
+    )
+    def test_update_and_filter_interpolates(self):
+        """
+        Coordinates surrounded by enough up to date entries get forecasts
+        interpolated from these, without weather API requests.
+        """
+        for lat, lon in ((57.71, 11.96), (57.69, 11.96), (57.70, 11.98)):
+            fp = ForecastPoint.create_with_api(lat, lon, api_getter=fake_get_forecast)
+            fp.new_req_allowed_datetime = timezone.now() + timedelta(minutes=30)
+            fp.t_0h = {57.71: 10.0, 57.69: 12.0, 57.70: 14.0}[lat]
+            fp.save()
+        res = ForecastPoint.update_and_filter(
+            [(57.70, 11.96)],
+            api_getter=unavailable_get_forecast,
+            interpolate=True
+        )
+        self.assertEqual(len(res), 1)
+        self.assertTrue(res[0].is_interpolated)
+        # nearest two neighbours are equally far away, the third further
+        self.assertTrue(11.0 < res[0].t_0h < 12.0)
+        self.assertEqual(res[0].symbol_name_0h, 'partlycloudy_day')
+        self.assertIn('"interpolated":true', res[0].get_payload_json())
+
+    def test_sync_with_api_changed(self):
+        """
+        Synchronizing with changed forecast data updates all forecast fields.
+        """
+        fp = ForecastPoint.objects.get(latitude=-5.8100, longitude=-3.0000)
+        fp.sync_with_api(api_getter=fake_get_forecast)
+        fp.refresh_from_db()
+        for i in range(7):
+            self.assertEqual(getattr(fp, f'symbol_name_{i}h'), 'partlycloudy_day')
+            self.assertAlmostEqual(float(getattr(fp, f't_{i}h')), 10.3 - i)
+        self.assertIn('"t_4h":6.3', fp.payload_json)
+
+    def test_sync_with_api_unchanged(self):
+        """
+        Synchronizing with unchanged forecast data only updates timing fields.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        ForecastPoint.objects.filter(id=fp.id).update(payload_json='untouched')
+
+        def later_get_forecast(*args, **kwargs):
+            api_results = fake_get_forecast(*args, **kwargs)
+            api_results['new_req_allowed_datetime'] += timedelta(hours=1)
+            return api_results
+        fp.sync_with_api(api_getter=later_get_forecast)
+        fp.refresh_from_db()
+        self.assertEqual(fp.payload_json, 'untouched')
+        self.assertEqual(
+            fp.new_req_allowed_datetime,
+            datetime(2021, 5, 21, 13, 5, 1, tzinfo=UTC)
+        )
+
+    # relies on the database migration '0002_insertdata_2021...' having been run
+    def test_new_weather_symbol(self):
+        """
+        Assigning a symbol name missing from the lookup table adds it,
+        and stores its code.
+        """
+        fp = ForecastPoint.objects.get(latitude=-5.81)
+        fp.symbol_name_3h = 'acidrain_day'
+        fp.save()
+        fp = ForecastPoint.objects.get(latitude=-5.81)
+        self.assertEqual(fp.symbol_name_3h, 'acidrain_day')
+        self.assertEqual(WeatherSymbol.objects.get(id=fp.symbol_3h_id).name, 'acidrain_day')
 
     # DISABLED usually, to keep from making unneccessary requests to YR API.
     # relies on the database migration '0002_insertdata_2021...' having been run
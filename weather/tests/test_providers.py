@@ -0,0 +1,51 @@
+from django.test import TestCase, override_settings
+
+from ..models import ForecastPoint
+from ..providers import FixtureProvider, ForecastProvider, get_provider
+from .test_models import fake_get_forecast
+
+
+class RecordingProvider(ForecastProvider):
+    """
+    Batch provider recording the batches it is passed.
+    """
+    def __init__(self):
+        self.batches = []
+
+    def fetch_many(self, requests, deadline=None, hedge_after=None):
+        self.batches.append(requests)
+        return [
+            (key, fake_get_forecast(req.lat, req.lon, req.if_modified_since), None)
+            for key, req in requests.items()
+        ]
+
+
+class ProviderTestCase(TestCase):
+    """
+    Tests of fetching forecasts through weather providers.
+    """
+    def test_pipeline_fetches_one_batch(self):
+        """
+        All of a call's weather API requests, for both new and outdated
+        entries, are passed to the provider as a single batch.
+        """
+        provider = RecordingProvider()
+        res = ForecastPoint.update_and_filter(
+            [(-59.3103, -14.4888), (57.7, 11.9667), (40.0, 10.0)], provider=provider
+        )
+        self.assertEqual(len(res), 3)
+        self.assertEqual(len(provider.batches), 1)
+        self.assertEqual(
+            sorted(action for action, _ in provider.batches[0]), ['create', 'create', 'sync']
+        )
+
+    @override_settings(FORECAST_PROVIDER='weather.providers.FixtureProvider')
+    def test_fixture_provider(self):
+        """
+        The fixture provider serves forecasts from its data file, which are
+        up to date, and can be set as the default provider.
+        """
+        self.assertIsInstance(get_provider(), FixtureProvider)
+        fp = ForecastPoint.create_with_api(57.7, 11.9667)
+        self.assertEqual(fp.symbol_name_3h, 'lightrain')
+        self.assertFalse(fp.time_to_sync())
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from pytz import UTC
+
+from django.test import SimpleTestCase
+
+from ..routes import decode_polyline, forecast_hour, sample_cells, sample_path
+from ..spatial import haversine
+
+
+class RoutesTestCase(SimpleTestCase):
+    """
+    Tests of route sampling helper functions.
+    """
+    def test_decode_polyline(self):
+        """
+        Polylines are decoded as in the format's documentation example.
+        """
+        coords = decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        expected = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        for (lat, lon), (exp_lat, exp_lon) in zip(coords, expected):
+            self.assertAlmostEqual(lat, exp_lat)
+            self.assertAlmostEqual(lon, exp_lon)
+        with self.assertRaises(ValueError):
+            decode_polyline('_p~iF~ps|U_ulL')
+
+    def test_sample_path(self):
+        """
+        Samples are spaced regularly along the path, and include its
+        first and last points.
+        """
+        lats, lons, dists = sample_path([57.0, 57.0, 57.1], [12.0, 12.1, 12.1], 1000)
+        total = haversine(57.0, 12.0, 57.0, 12.1) + haversine(57.0, 12.1, 57.1, 12.1)
+        self.assertEqual(len(dists), int(total // 1000) + 2)
+        self.assertEqual((lats[0], lons[0]), (57.0, 12.0))
+        self.assertAlmostEqual(lats[-1], 57.1)
+        self.assertAlmostEqual(lons[-1], 12.1)
+        self.assertAlmostEqual(dists[-1], total)
+        for i in range(1, len(dists) - 1):
+            self.assertAlmostEqual(dists[i] - dists[i - 1], 1000)
+        # within a segment, samples are also 1000m apart in a straight line
+        self.assertAlmostEqual(haversine(lats[0], lons[0], lats[3], lons[3]), 3000, delta=5)
+
+    def test_sample_cells(self):
+        """
+        Samples within the same grid cell share a cell.
+        """
+        coord_ls, index = sample_cells([57.7011, 57.7049, 57.7151], [11.9611, 11.9649, 11.9651])
+        self.assertEqual(coord_ls, [(57.705, 11.965), (57.715, 11.965)])
+        self.assertEqual(index, [0, 0, 1])
+
+    def test_forecast_hour(self):
+        class Point:
+            forecast_start_datetime = datetime(2021, 5, 21, 12, tzinfo=UTC)
+        self.assertEqual(forecast_hour(Point, Point.forecast_start_datetime + timedelta(minutes=100)), 2)
+        self.assertIsNone(forecast_hour(Point, Point.forecast_start_datetime + timedelta(hours=8)))
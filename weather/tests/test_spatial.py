@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from ..spatial import coord_key, grid_key, grid_keys_within, haversine
+
+
+class SpatialTestCase(SimpleTestCase):
+    """
+    Tests of spatial lookup helper functions.
+    """
+    def test_haversine(self):
+        """
+        Distances match known great-circle distances.
+        """
+        # one degree of latitude is ~111.2km
+        self.assertAlmostEqual(haversine(0, 0, 1, 0), 111195, delta=10)
+        # Stockholm - Gothenburg, ~398km
+        self.assertAlmostEqual(haversine(59.3293, 18.0686, 57.7089, 11.9746), 398000, delta=2000)
+
+    def test_grid_keys_within_covers_radius(self):
+        """
+        The cells within a radius include the cells of all points
+        within that radius, also across the antimeridian and near poles.
+        """
+        for lat, lon in ((57.7, 11.9667), (0.0, 179.999), (-89.99, 45.0)):
+            keys = grid_keys_within(lat, lon, 1000)
+            for dlat, dlon in ((0.008, 0), (-0.008, 0), (0, 0.002), (0, -0.002)):
+                other_lat = max(min(lat + dlat, 90), -90)
+                other_lon = (lon + dlon + 180) % 360 - 180
+                if haversine(lat, lon, other_lat, other_lon) <= 1000:
+                    self.assertIn(grid_key(other_lat, other_lon), keys)
+
+    def test_coord_key(self):
+        """
+        Coordinate keys are equal for equal coordinates, whether passed as
+        floats or Decimals, and distinct for coordinates differing in the
+        4th decimal, including negative ones.
+        """
+        self.assertEqual(coord_key(59.3103, -14.4888), coord_key(Decimal('59.3103'), Decimal('-14.4888')))
+        keys = {
+            coord_key(lat, lon)
+            for lat in (-90, -0.0001, 0, 0.0001, 90)
+            for lon in (-180, -0.0001, 0, 0.0001, 180)
+        }
+        self.assertEqual(len(keys), 25)
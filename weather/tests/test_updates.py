@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase, TestCase
+
+from ..models import ForecastPoint
+from ..spatial import grid_key
+from ..updates import BROKER, UpdateBroker
+from .test_models import fake_get_forecast
+
+
+class UpdateBrokerTestCase(SimpleTestCase):
+    """
+    Tests of passing forecast updates to subscribers.
+    """
+    def test_dispatch_to_cell_subscribers(self):
+        """
+        Messages are only passed to subscribers of their cell, and not
+        after unsubscribing.
+        """
+        broker = UpdateBroker()
+        received = []
+        subscription = broker.subscribe([1, 2], lambda cell, payload: received.append((cell, payload)))
+        broker.dispatch(2, '{"id":1}')
+        broker.dispatch(3, '{"id":2}')
+        broker.unsubscribe(subscription)
+        broker.dispatch(1, '{"id":3}')
+        self.assertEqual(received, [(2, '{"id":1}')])
+
+
+class PublishUpdateTestCase(TestCase):
+    def test_create_publishes_update(self):
+        """
+        Creating an entry with weather API data publishes its payload
+        to subscribers of its cell.
+        """
+        received = []
+        subscription = BROKER.subscribe(
+            [grid_key(57.7, 11.9667)], lambda cell, payload: received.append(payload)
+        )
+        try:
+            fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        finally:
+            BROKER.unsubscribe(subscription)
+        self.assertEqual(received, [fp.payload_json])
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from locations.models import Location
+
+from ..models import ForecastPoint
+from ..warmup import location_cells, warm_forecasts
+from .test_models import fake_get_forecast, unavailable_get_forecast
+
+
+class WarmupTestCase(TestCase):
+    """
+    Tests of forecast warmup for saved locations.
+    """
+    def test_location_cells(self):
+        """
+        Saved locations' coordinates are rounded to forecast cells.
+        """
+        self.assertEqual(
+            location_cells(),
+            [(56.1611, 15.5849), (59.3103, 14.4889)]
+        )
+
+    def test_warm_forecasts(self):
+        """
+        Forecasts are created for all saved locations' cells.
+        """
+        stats = warm_forecasts(api_getter=fake_get_forecast)
+        self.assertEqual(stats, {'cells': 2, 'stale': 0, 'pending': 0, 'failed': 0})
+        for lat, lon in location_cells():
+            self.assertTrue(
+                ForecastPoint.objects.filter(latitude=lat, longitude=lon).exists()
+            )
+
+    def test_warm_forecasts_failed(self):
+        """
+        Cells for which the weather API couldn't be reached are counted as
+        failed.
+        """
+        stats = warm_forecasts(api_getter=unavailable_get_forecast)
+        self.assertEqual(stats, {'cells': 2, 'stale': 0, 'pending': 0, 'failed': 2})
+
+    @override_settings(FORECAST_REUSE_RADIUS=500)
+    def test_warm_forecasts_shared_point(self):
+        """
+        Cells which get the same nearby point aren't counted as failed.
+        """
+        fp = ForecastPoint.create_with_api(57.7, 11.9667, api_getter=fake_get_forecast)
+        fp.new_req_allowed_datetime = timezone.now() + timedelta(minutes=30)
+        fp.save()
+        # ~300m north and south of the point, respectively
+        Location.objects.update(latitude=57.7027, longitude=11.9667)
+        Location.objects.filter(pk=Location.objects.first().pk).update(latitude=57.6973)
+        stats = warm_forecasts(api_getter=fake_get_forecast)
+        self.assertEqual(stats, {'cells': 2, 'stale': 0, 'pending': 0, 'failed': 0})
+
+    def test_warm_forecasts_errors(self):
+        """
+        Batches failing with other errors than the weather API being
+        unavailable are counted as failed, rather than raising.
+        """
+        def malformed_get_forecast(lat, lon, **kwargs):
+            raise KeyError('properties')
+
+        with self.assertLogs('weather.warmup', 'ERROR'):
+            stats = warm_forecasts(api_getter=malformed_get_forecast)
+        self.assertEqual(stats, {'cells': 2, 'stale': 0, 'pending': 0, 'failed': 2})
+
+    def test_command(self):
+        """
+        The management command runs the warmup and reports the results
+        (here without saved locations, to avoid weather API requests).
+        """
+        Location.objects.all().delete()
+        out = StringIO()
+        call_command('warm_forecasts', stdout=out)
+        self.assertIn('Warmed forecasts for 0 location cells', out.getvalue())
+
+    def test_command_errors(self):
+        """
+        The management command doesn't fail on errors, since warming up is
+        best-effort.
+        """
+        err = StringIO()
+        command_module = 'weather.management.commands.warm_forecasts'
+        with mock.patch(f'{command_module}.warm_forecasts', side_effect=KeyError):
+            with self.assertLogs(command_module, 'ERROR'):
+                call_command('warm_forecasts', stdout=StringIO(), stderr=err)
+        self.assertIn('Warming up forecasts failed.', err.getvalue())
@@ -0,0 +1,143 @@
+"""
+Publishing of forecast updates to subscribers, eg clients connected to
+api.streams.forecast_stream.
+
+Subscribers register for a set of grid cells (see .spatial.grid_key), and
+are passed update messages for ForecastPoint entries in these cells
+whenever new forecast data are stored. On PostgreSQL, messages are sent
+with NOTIFY, so that they reach subscribers in all server processes, each
+of which runs a listener thread (see ensure_listener) once it has
+subscribers. On other databases, messages only reach subscribers in the
+publishing process.
+"""
+import logging
+import select
+import threading
+import time
+
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY channel used for forecast updates
+CHANNEL = 'forecast_updates'
+
+# number of seconds to wait before reconnecting after the listener's
+# database connection fails
+LISTENER_RETRY_DELAY = 5
+
+
+class Subscription:
+    def __init__(self, cells, callback):
+        self.cells = frozenset(cells)
+        self.callback = callback
+
+
+class UpdateBroker:
+    """
+    Passes update messages to the subscribers of their cells, within the
+    process. Instances are safe to share between threads.
+    """
+    def __init__(self):
+        # maps cells to sets of subscriptions
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, cells, callback):
+        """
+        :param cells: iterable - Grid cell keys to subscribe to.
+        :param callback: function - Called with the cell key and the point's
+        JSON payload for each update, from the publishing (or listener) thread.
+        :return: A Subscription, to be passed to unsubscribe.
+        """
+        subscription = Subscription(cells, callback)
+        with self._lock:
+            for cell in subscription.cells:
+                self._subscriptions.setdefault(cell, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for cell in subscription.cells:
+                subs = self._subscriptions.get(cell)
+                if subs is not None:
+                    subs.discard(subscription)
+                    if not subs:
+                        del self._subscriptions[cell]
+
+    def dispatch(self, cell, payload):
+        with self._lock:
+            subs = list(self._subscriptions.get(cell, ()))
+        for subscription in subs:
+            try:
+                subscription.callback(cell, payload)
+            except Exception:
+                logger.exception('Forecast update subscriber failed.')
+
+
+BROKER = UpdateBroker()
+
+
+def format_message(cell, payload):
+    return f'{cell}:{payload}'
+
+
+def parse_message(message):
+    cell, payload = message.split(':', 1)
+    return int(cell), payload
+
+
+def publish_update(point):
+    """
+    Publishes the stored forecast data of a ForecastPoint entry to
+    subscribers of its cell. On PostgreSQL, the message is sent when the
+    current transaction (if any) is committed.
+    """
+    payload = point.get_payload_json()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, format_message(point.grid_key, payload)])
+    else:
+        BROKER.dispatch(point.grid_key, payload)
+
+
+def listen(stop_event=None):
+    """
+    Passes messages sent with NOTIFY on CHANNEL to BROKER, until
+    'stop_event' (if any) is set. Uses a dedicated database connection,
+    which is re-established if it fails.
+    """
+    db = connections['default']
+    while stop_event is None or not stop_event.is_set():
+        try:
+            pg_conn = db.get_new_connection(db.get_connection_params())
+            pg_conn.autocommit = True
+            with pg_conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while stop_event is None or not stop_event.is_set():
+                if select.select([pg_conn], [], [], 5) == ([], [], []):
+                    continue
+                pg_conn.poll()
+                while pg_conn.notifies:
+                    BROKER.dispatch(*parse_message(pg_conn.notifies.pop(0).payload))
+        except Exception:
+            logger.exception('Forecast update listener failed, reconnecting.')
+            time.sleep(LISTENER_RETRY_DELAY)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """
+    Starts the process' listener thread (see listen) on PostgreSQL, unless
+    it is already running.
+    """
+    global _listener
+    if connections['default'].vendor != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=listen, name='forecast-updates', daemon=True)
+            _listener.start()
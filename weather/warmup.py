@@ -0,0 +1,58 @@
+import logging
+import time
+
+from locations.models import Location
+
+from .models import ForecastPoint
+
+logger = logging.getLogger(__name__)
+
+# number of coordinates passed to ForecastPoint.update_and_map at a time
+WARMUP_BATCH_SIZE = 100
+
+
+def location_cells():
+    """
+    Returns a sorted list of the distinct forecast cells, ie coordinates
+    rounded to 4 decimals, of all users' saved locations.
+    """
+    coords = Location.objects.values_list('latitude', 'longitude').distinct()
+    return sorted({(round(float(lat), 4), round(float(lon), 4)) for lat, lon in coords})
+
+
+def warm_forecasts(budget=None, batch_size=WARMUP_BATCH_SIZE, provider=None, api_getter=None):
+    """
+    Makes sure that there are up to date forecasts for all users' saved
+    locations, fetching missing or outdated forecasts from the weather API
+    (in batches, within the API rate limit). Meant to be run after
+    deploys and eg overnight, so that users' first map loads needn't
+    wait for the weather API. Can be called from a Procfile release
+    phase, through the 'warm_forecasts' management command. Warming up
+    is best-effort, so batches which fail with errors are logged and
+    counted as failed, rather than raising.
+    :param budget: (optional) float - Maximum number of seconds to spend.
+    :param batch_size: int - Number of locations to process at a time.
+    :param provider, api_getter: See ForecastPoint.iter_update_and_map.
+    :return: dict - Numbers of 'cells' processed, of cells whose forecasts
+    were left 'stale' or 'pending' (see ForecastPoint.iter_update_and_map),
+    and of cells which 'failed', ie for which the weather API couldn't be
+    reached.
+    """
+    deadline = time.monotonic() + budget if budget is not None else None
+    cells = location_cells()
+    stats = {'cells': len(cells), 'stale': 0, 'pending': 0, 'failed': 0}
+    for i in range(0, len(cells), batch_size):
+        batch = cells[i:i + batch_size]
+        try:
+            # cells may share nearby points, so points are counted per cell
+            points = ForecastPoint.update_and_map(
+                batch, provider=provider, api_getter=api_getter, deadline=deadline
+            ).values()
+        except Exception:
+            logger.exception('Warming up forecasts failed.')
+            stats['failed'] += len(batch)
+            continue
+        stats['stale'] += sum(1 for p in points if p is not None and p.is_stale)
+        stats['pending'] += sum(1 for p in points if p is not None and p.is_pending)
+        stats['failed'] += sum(1 for p in points if p is None)
+    return stats